@@ -102,6 +102,17 @@ classdef configuration
         %% hidden layer config for ANN
         hiddenlayers = [256 256 256 128 32 32 ];
         
+        %% transcription hop: the TDNN is run on every hop-th frame and the
+        %% probabilities in between are interpolated ('linear' or 'hold')
+        transcription_hop = 1;
+        transcription_interp = 'linear';
+        %% transcription engine: 'window' runs the whole network on every
+        %% window; 'shared' runs the TDNN layers once per recording
+        transcription_engine = 'window';
+        %% transcribe all recordings with one long-lived python process that
+        %% builds the model once, instead of one process per recording
+        transcription_server = 0;
+        
        
         %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% Parameters that
         %%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%% doesn't change
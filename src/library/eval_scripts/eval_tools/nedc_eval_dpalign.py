@@ -21,12 +21,18 @@ import os
 import sys
 from collections import OrderedDict
 
+# import required numerical modules
+#
+import numpy as np
+
 # import required NEDC modules
 #
 import sys_tools.nedc_file_tools as nft
 import sys_tools.nedc_ann_tools as nat
 import sys_tools.nedc_text_tools as ntt
 import sys_tools.nedc_display_tools as ndt
+import sys_tools.nedc_pool_tools as npt
+import sys_tools.nedc_roc_tools as nrt
 
 #------------------------------------------------------------------------------
 #
@@ -52,6 +58,17 @@ PENALTY_DEL = float(1.0)
 PENALTY_INS = float(1.0)
 PENALTY_SUB = float(1.0)
 
+# define the half-width of the band used for banded alignment:
+#  zero means the full grid is always used
+#
+DPALIGN_BAND = int(0)
+
+# define the relative margin by which the best path in the band must be
+# cheaper than any path outside it: the costs are float sums, so a path
+# whose exact cost ties the bound can compare as cheaper
+#
+DPALIGN_BAND_MARGIN = float(1e-9)
+
 #------------------------------------------------------------------------------
 #                                                                              
 # the main interface method
@@ -67,6 +84,8 @@ PENALTY_SUB = float(1.0)
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  band: the half-width of the alignment band (0 = full grid)
+#  jobs: the number of processes used to score the files
 #
 # return: a logical value indicating status
 #
@@ -75,12 +94,14 @@ PENALTY_SUB = float(1.0)
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
+def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a,
+        band_a = DPALIGN_BAND, jobs_a = npt.DEF_JOBS):
 
     # define local variables
     #
     status = True
     ndpalign = NedcDPAlignment()
+    ndpalign.band_d = band_a
 
     # check the reference and hyp file lists
     #
@@ -96,7 +117,7 @@ def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
     # run dp alignment scoring
     #
     status = ndpalign.init_score(map_a)
-    status = ndpalign.score(reflist_a, hyplist_a, map_a, rfile_a)
+    status = ndpalign.score(reflist_a, hyplist_a, map_a, rfile_a, jobs_a)
     if status == False:
         print("%s (%s: %s): error during scoring" % \
             (sys.argv[0], __name__, "run"))
@@ -152,6 +173,7 @@ class NedcDPAlignment():
         self.penalty_del_d = PENALTY_DEL
         self.penalty_ins_d = PENALTY_INS
         self.penalty_sub_d = PENALTY_SUB
+        self.band_d = DPALIGN_BAND
 
         # declare a variable to hold a permuted map
         #
@@ -362,93 +384,116 @@ class NedcDPAlignment():
     #  files_hyp: a hypothesis file list
     #  map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  jobs: the number of processes used to score the files
     #
     # return: a logical value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a):
-        
+    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a,
+              jobs_a = npt.DEF_JOBS):
+
         # declare local variables
         #
         status = True
 
-        # create the results file
+        # score each file
+        #
+        reports = npt.score_files(self, files_ref_a, files_hyp_a, jobs_a)
+        if reports is None:
+            print("%s (%s: %s): error scoring files" % \
+                (sys.argv[0], __name__, "score"))
+            return False
+
+        # create the results file and write the per file results
         #
         self.rfile_d = nft.make_fp(rfile_a)
+        for report in reports:
+            self.rfile_d.write(report)
 
-        # for each fname
+        # close the file
         #
-        for i, fname in enumerate(files_ref_a):
+        self.rfile_d.close()
 
-            # get the ref events
-            #
-            events_ref = files_ref_a.get(fname, None)
-            if events_ref == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_ref_a[i]))
-                return False
+        # exit gracefully
+        # 
+        return True
+    #
+    # end of method
 
-            # get the hyp events
-            #
-            events_hyp = files_hyp_a.get(fname, None)
-            if events_hyp == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_hyp_a[i]))
-                return False
+    # method: score_file
+    #
+    # arguments:
+    #  i: the index of the file in the file list
+    #  fname: the file to be scored
+    #  files_ref: a reference file list
+    #  files_hyp: a hypothesis file list
+    #
+    # return: the per file results as a string, or None on error
+    #
+    # This method adds one file to the confusion matrix.
+    #
+    def score_file(self, i_a, fname_a, files_ref_a, files_hyp_a):
 
-            # update the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
+        # declare local variables
+        #
+        report = ""
 
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
-                
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
+        # get the ref events
+        #
+        events_ref = files_ref_a.get(fname_a, None)
+        if events_ref == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # add this to the confusion matrix
-            #
-            refo, hypo = self.compute(ann_ref, ann_hyp)
-            if refo == None:
-                print("%s (%s: %s): error computing confusion matrix (%s %s)" \
-                    % (sys.argv[0], __name__, "score", \
-                       files_ref_a[i], files_hyp_a[i]))
-                return False
+        # get the hyp events
+        #
+        events_hyp = files_hyp_a.get(fname_a, None)
+        if events_hyp == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # output the files to the per file results file
-            #
-            ref_fm, hyp_fm, hits, subs, inss, dels = \
-		ndt.format_hyp(refo, hypo)
+        # update the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-            # output the files to the per file results file
-            #
-            self.rfile_d.write("%5d: %s.tse\n" % (i, fname))
-            self.rfile_d.write("%5s  %s.hyp\n" % ("", fname))
-            self.rfile_d.write("  Ref: %s\n" % ' '.join(refo))
-            self.rfile_d.write("  Hyp: %s\n" % ' '.join(hypo))
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
+        #
+        ann_ref = nat.map_events(events_ref, self.pmap_d)
+        ann_hyp = nat.map_events(events_hyp, self.pmap_d)
 
-            self.rfile_d.write("%7s (Hits: %d  Sub: %d  Ins: %d  Del: %d  Total: %d)\n" \
-                               % ("", hits, subs, inss, dels, \
-                                  subs + inss + dels))
-            self.rfile_d.write("\n")
+        # add this to the confusion matrix
+        #
+        refo, hypo = self.compute(ann_ref, ann_hyp)
+        if refo == None:
+            print("%s (%s: %s): error computing confusion matrix (%s %s)" \
+                % (sys.argv[0], __name__, "score_file", \
+                   fname_a, fname_a))
+            return None
 
-        # close the file
+        # output the files to the per file results file
         #
-        self.rfile_d.close()
+        ref_fm, hyp_fm, hits, subs, inss, dels = \
+		ndt.format_hyp(refo, hypo)
+
+        # output the files to the per file results file
+        #
+        report += ("%5d: %s.tse\n" % (i_a, fname_a))
+        report += ("%5s  %s.hyp\n" % ("", fname_a))
+        report += ("  Ref: %s\n" % ' '.join(refo))
+        report += ("  Hyp: %s\n" % ' '.join(hypo))
+
+        report += ("%7s (Hits: %d  Sub: %d  Ins: %d  Del: %d  Total: %d)\n" \
+                   % ("", hits, subs, inss, dels, \
+                        subs + inss + dels))
+        report += ("\n")
 
         # exit gracefully
-        # 
-        return True
+        #
+        return report
     #
     # end of method
 
@@ -481,60 +526,21 @@ class NedcDPAlignment():
             hyp.append(value[2])
         hyp.append(ntt.NULL_CLASS)
 
-        # compute the lengths and clear temp variables
+        # compute the lengths
         #
         m = len(ref)
         n = len(hyp)
-        d = []
-        etypes = []
-
-        # zero out the cost matrix and initialize the edges with the
-        # correct error types (backpointers)
-        #
-        for i in range(m):
-            d.append([])
-            etypes.append([])
-            for j in range(n):
-                d[i].append(float(0))
-                etypes[i].append(DPALIGN_ETYPES_NULL)
-
-        for i in range(1,n):
-            d[0][i] = d[0][i-1] + self.penalty_ins_d
-            etypes[0][i] = DPALIGN_ETYPES_INS
 
-        for i in range(1,m):
-            d[i][0] = d[i-1][0] + self.penalty_del_d
-            etypes[i][0] = DPALIGN_ETYPES_DEL
-        etypes[0][0] = DPALIGN_ETYPES_SUB
-
-        # iterate over the interior nodes:
-        #  cols (j) correspond to the reference. rows (i) correspond
-        #  to the hypothesis. iterate over a column first (j), matching
-        #  ref to a specific event in a hypothesis, and then over rows (i)
-        #  next (iterating over events in the reference).
+        # fill the matrix of error types (backpointers):
+        #  when a band is used, node (i, j) is stored in column
+        #  (j - i - offset) of a banded matrix
         #
-        for j in range(1,n):
-            for i in range(1,m):
-
-                # compute the node penalties
-                #
-                d_del = d[i-1][j] + self.penalty_del_d
-                d_ins = d[i][j-1] + self.penalty_ins_d
-                d_sub = d[i-1][j-1]
-                if ref[i] != hyp[j]:
-                    d_sub += self.penalty_sub_d
-
-                # update the best path and save the error type
-                #
-                min_dist = d_sub
-                etypes[i][j] = DPALIGN_ETYPES_SUB
-                if (d_ins < min_dist):
-                    min_dist = d_ins
-                    etypes[i][j] = DPALIGN_ETYPES_INS
-                if (d_del < min_dist):
-                    min_dist = d_del
-                    etypes[i][j] = DPALIGN_ETYPES_DEL
-                d[i][j] = min_dist
+        etypes = None
+        if self.band_d > 0:
+            etypes, offset = self.compute_etypes_banded(ref, hyp, self.band_d)
+        if etypes is None:
+            etypes = self.compute_etypes(ref, hyp)
+            offset = None
 
         # the last node (m-1, n-1) is where the best path terminates. backtrack
         # to get the best path. start at (m-1, n-1) and end at (0,0).
@@ -545,15 +551,20 @@ class NedcDPAlignment():
         hypt = []
 
         while (True):
-            if etypes[i][j] == DPALIGN_ETYPES_DEL:
+            if offset is None:
+                etype = etypes[i][j]
+            else:
+                etype = etypes[i][j - i - offset]
+
+            if etype == DPALIGN_ETYPES_DEL:
                 reft.append(ref[i])
                 hypt.append(ntt.NULL_CLASS)
                 i -= 1
-            elif etypes[i][j] == DPALIGN_ETYPES_INS:
+            elif etype == DPALIGN_ETYPES_INS:
                 reft.append(ntt.NULL_CLASS)
                 hypt.append(hyp[j])
                 j -= 1
-            elif etypes[i][j] == DPALIGN_ETYPES_SUB:
+            elif etype == DPALIGN_ETYPES_SUB:
                 reft.append(ref[i])
                 hypt.append(hyp[j])
                 i -= 1
@@ -604,6 +615,271 @@ class NedcDPAlignment():
         #
         return [refo, hypo]
 
+    # method: compute_etypes
+    #
+    # arguments:
+    #  ref: the reference labels, including the dummy symbols
+    #  hyp: the hypothesis labels, including the dummy symbols
+    #
+    # return:
+    #  etypes: an (m x n) int8 matrix of error types (backpointers)
+    #
+    # This method fills the dynamic programming grid. Every node on an
+    # anti-diagonal (i + j = k) depends only on the two previous
+    # anti-diagonals, so each anti-diagonal is computed as one vector
+    # operation. Only three anti-diagonals of costs are kept. The costs
+    # are the same float64 sums as a node-by-node loop, and ties are
+    # broken in the same order: substitution, then insertion, then
+    # deletion.
+    #
+    def compute_etypes(self, ref_a, hyp_a):
+
+        # convert the labels to integer codes so they can be compared
+        # as arrays
+        #
+        codes = {}
+        for lbl in ref_a + hyp_a:
+            if lbl not in codes:
+                codes[lbl] = len(codes)
+        ref = np.array([codes[lbl] for lbl in ref_a], dtype = np.int64)
+        hyp = np.array([codes[lbl] for lbl in hyp_a], dtype = np.int64)
+
+        # compute the lengths and clear temp variables
+        #
+        m = len(ref)
+        n = len(hyp)
+        etypes = np.full((m, n), DPALIGN_ETYPES_NULL, dtype = np.int8)
+
+        # initialize the edges of the cost matrix: these are accumulated
+        # one node at a time to match the node-by-node sums
+        #
+        d_row = [float(0)]
+        for j in range(1, n):
+            d_row.append(d_row[j-1] + self.penalty_ins_d)
+        d_col = [float(0)]
+        for i in range(1, m):
+            d_col.append(d_col[i-1] + self.penalty_del_d)
+
+        etypes[0, 1:] = DPALIGN_ETYPES_INS
+        etypes[1:, 0] = DPALIGN_ETYPES_DEL
+        etypes[0, 0] = DPALIGN_ETYPES_SUB
+
+        # the anti-diagonals are indexed by the row (i). prime them with
+        # k = 0 (diag2) and k = 1 (diag1).
+        #
+        diag2 = np.full(m, np.inf)
+        diag1 = np.full(m, np.inf)
+        diag2[0] = d_row[0]
+        if n > 1:
+            diag1[0] = d_row[1]
+        if m > 1:
+            diag1[1] = d_col[1]
+
+        # iterate over the anti-diagonals
+        #
+        for k in range(2, m + n - 1):
+
+            # find the interior nodes on this anti-diagonal
+            #
+            i_lo = max(1, k - n + 1)
+            i_hi = min(m - 1, k - 1)
+            diag = np.full(m, np.inf)
+
+            if i_lo <= i_hi:
+                rows = np.arange(i_lo, i_hi + 1)
+                cols = k - rows
+
+                # compute the node penalties
+                #
+                d_del = diag1[rows - 1] + self.penalty_del_d
+                d_ins = diag1[rows] + self.penalty_ins_d
+                d_sub = diag2[rows - 1] + \
+                        np.where(ref[rows] != hyp[cols],
+                                 self.penalty_sub_d, float(0))
+
+                # update the best path and save the error type
+                #
+                min_dist = d_sub
+                etype = np.full(len(rows), DPALIGN_ETYPES_SUB, dtype = np.int8)
+                mask = d_ins < min_dist
+                min_dist = np.where(mask, d_ins, min_dist)
+                etype[mask] = DPALIGN_ETYPES_INS
+                mask = d_del < min_dist
+                min_dist = np.where(mask, d_del, min_dist)
+                etype[mask] = DPALIGN_ETYPES_DEL
+
+                diag[rows] = min_dist
+                etypes[rows, cols] = etype
+
+            # add the edge nodes
+            #
+            if k < n:
+                diag[0] = d_row[k]
+            if k < m:
+                diag[k] = d_col[k]
+
+            # shift the anti-diagonals
+            #
+            diag2 = diag1
+            diag1 = diag
+
+        # exit gracefully
+        #
+        return etypes
+    #
+    # end of method
+
+    # method: compute_etypes_banded
+    #
+    # arguments:
+    #  ref: the reference labels, including the dummy symbols
+    #  hyp: the hypothesis labels, including the dummy symbols
+    #  band: the half-width of the band
+    #
+    # return:
+    #  etypes: an int8 matrix of error types for the nodes in the band,
+    #          or None if the full grid must be used
+    #  offset: the lowest diagonal (j - i) in the band
+    #
+    # This method fills only the nodes whose diagonal (j - i) lies
+    # within band of the diagonals between (0,0) and (m-1, n-1), so
+    # memory grows with the length times the band, not with m x n.
+    #
+    # A path that leaves the band needs at least |n - m| + 2 * band + 2
+    # insertions and deletions. If the best path in the band is cheaper
+    # than that, the full grid would backtrack along the same path with
+    # the same error types, so the alignment is identical. A tie would
+    # let the full grid pick a path outside the band, and rounding can
+    # hide one, so the best path must be cheaper by more than
+    # DPALIGN_BAND_MARGIN of the bound. If not, the band is doubled, and
+    # once it covers the grid, None is returned.
+    #
+    def compute_etypes_banded(self, ref_a, hyp_a, band_a):
+
+        # convert the labels to integer codes so they can be compared
+        # as arrays
+        #
+        codes = {}
+        for lbl in ref_a + hyp_a:
+            if lbl not in codes:
+                codes[lbl] = len(codes)
+        ref = np.array([codes[lbl] for lbl in ref_a], dtype = np.int64)
+        hyp = np.array([codes[lbl] for lbl in hyp_a], dtype = np.int64)
+
+        # compute the lengths and the diagonal on which the path ends
+        #
+        m = len(ref)
+        n = len(hyp)
+        delta = n - m
+        min_penalty = min(self.penalty_ins_d, self.penalty_del_d)
+
+        # initialize the edges of the cost matrix: these are accumulated
+        # one node at a time to match the node-by-node sums
+        #
+        d_row = [float(0)]
+        for j in range(1, n):
+            d_row.append(d_row[j-1] + self.penalty_ins_d)
+        d_col = [float(0)]
+        for i in range(1, m):
+            d_col.append(d_col[i-1] + self.penalty_del_d)
+
+        # widen the band until the optimum is guaranteed
+        #
+        band = int(band_a)
+        while True:
+
+            # find the diagonals in the band: if it covers the whole
+            # grid, there is nothing to gain
+            #
+            lo = min(0, delta) - band
+            hi = max(0, delta) + band
+            if (lo <= -(m - 1)) and (hi >= n - 1):
+                return None, None
+            width = hi - lo + 1
+
+            # the anti-diagonals are indexed by diagonal (t = j - i) with
+            # one padding node at each end: node t is at index t - lo + 1
+            #
+            etypes = np.full((m, width), DPALIGN_ETYPES_NULL, dtype = np.int8)
+            diag2 = np.full(width + 2, np.inf)
+            diag1 = np.full(width + 2, np.inf)
+            diag2[1 - lo] = d_row[0]
+            etypes[0, -lo] = DPALIGN_ETYPES_SUB
+            if (n > 1) and (hi >= 1):
+                diag1[2 - lo] = d_row[1]
+                etypes[0, 1 - lo] = DPALIGN_ETYPES_INS
+            if (m > 1) and (lo <= -1):
+                diag1[-lo] = d_col[1]
+                etypes[1, -1 - lo] = DPALIGN_ETYPES_DEL
+
+            # iterate over the anti-diagonals
+            #
+            for k in range(2, m + n - 1):
+                diag = np.full(width + 2, np.inf)
+
+                # find the interior nodes in the band on this anti-diagonal:
+                #  t has the same parity as k, and 1 <= i, j
+                #
+                t_lo = max(lo, 2 - k, k - 2 * (m - 1))
+                t_hi = min(hi, k - 2, 2 * (n - 1) - k)
+                if (t_lo - k) % 2 != 0:
+                    t_lo += 1
+
+                if t_lo <= t_hi:
+                    ts = np.arange(t_lo, t_hi + 1, 2)
+                    rows = (k - ts) // 2
+                    cols = (k + ts) // 2
+                    index = ts - lo + 1
+
+                    # compute the node penalties
+                    #
+                    d_del = diag1[index + 1] + self.penalty_del_d
+                    d_ins = diag1[index - 1] + self.penalty_ins_d
+                    d_sub = diag2[index] + \
+                            np.where(ref[rows] != hyp[cols],
+                                     self.penalty_sub_d, float(0))
+
+                    # update the best path and save the error type
+                    #
+                    min_dist = d_sub
+                    etype = np.full(len(ts), DPALIGN_ETYPES_SUB,
+                                    dtype = np.int8)
+                    mask = d_ins < min_dist
+                    min_dist = np.where(mask, d_ins, min_dist)
+                    etype[mask] = DPALIGN_ETYPES_INS
+                    mask = d_del < min_dist
+                    min_dist = np.where(mask, d_del, min_dist)
+                    etype[mask] = DPALIGN_ETYPES_DEL
+
+                    diag[index] = min_dist
+                    etypes[rows, ts - lo] = etype
+
+                # add the edge nodes that are in the band
+                #
+                if (k < n) and (k <= hi):
+                    diag[k - lo + 1] = d_row[k]
+                    etypes[0, k - lo] = DPALIGN_ETYPES_INS
+                if (k < m) and (-k >= lo):
+                    diag[-k - lo + 1] = d_col[k]
+                    etypes[k, -k - lo] = DPALIGN_ETYPES_DEL
+
+                # shift the anti-diagonals
+                #
+                diag2 = diag1
+                diag1 = diag
+
+            # check that no path outside the band can do as well
+            #
+            bound = min_penalty * (abs(delta) + 2 * band + 2)
+            if bound - diag1[delta - lo + 1] > DPALIGN_BAND_MARGIN * bound:
+                return etypes, lo
+
+            # widen the band
+            #
+            band = max(2 * band, 1)
+    #
+    # end of method
+
     # method: compute_performance
     #
     # arguments: none
@@ -981,18 +1257,18 @@ class NedcDPAlignment():
     #
     def score_roc(self, events_ref_a, events_hyp_a):
         
-        # declare local variables
-        #
-        status = True
-        ann = nat.Annotations()
-
         # loop over all event lists (corresponding to files)
         #
-        for ann_ref, ann_hyp in zip(events_ref_a, events_hyp_a):
+        for events_ref, events_hyp in zip(events_ref_a, events_hyp_a):
 
             # update the total duration
             #
-            self.total_dur_d += ann_ref[-1][1]
+            self.total_dur_d += events_ref[-1][1]
+
+            # map the annotations before scoring
+            #
+            ann_ref = nat.map_events(events_ref, self.pmap_d)
+            ann_hyp = nat.map_events(events_hyp, self.pmap_d)
 
             # add this to the confusion matrix
             #
@@ -1008,6 +1284,27 @@ class NedcDPAlignment():
     #
     # end of method
 
+    # method: score_roc_sweep
+    #
+    # arguments:
+    #  events_ref: a reference list
+    #  events_hyp: a hypothesis list
+    #  thresholds: the thresholds at which the curve is computed
+    #  key: the class to be scored
+    #
+    # return: a logical value indicating status
+    #
+    # This method computes an roc/det curve for key by thresholding the
+    # confidences of the hypothesis events (see nrt.sweep). Afterwards,
+    # get_roc and get_det return one point per threshold.
+    #
+    def score_roc_sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                        key_a):
+        return nrt.sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                         key_a)
+    #
+    # end of method
+
     # method: compute_performance_roc
     #
     # arguments:
@@ -20,14 +20,22 @@
 #
 import os
 import sys
+import bisect
 from collections import OrderedDict
 
+# import required numerical modules
+#
+import numpy as np
+
 # import required NEDC modules
 #
 import sys_tools.nedc_file_tools as nft
 import sys_tools.nedc_ann_tools as nat
 import sys_tools.nedc_text_tools as ntt
 import sys_tools.nedc_display_tools as ndt
+import sys_tools.nedc_pool_tools as npt
+import sys_tools.nedc_roc_tools as nrt
+import sys_tools.nedc_stream_tools as nst
 
 #------------------------------------------------------------------------------
 #
@@ -44,6 +52,11 @@ NEDC_EPOCH = "NEDC_EPOCH"
 EPOCH_DURATION = 0.25
 NULL_CLASS = "BCKG"
 
+# define whether all epochs in a file are sampled in one batch:
+#  this gives the same results as sampling one epoch at a time
+#
+EPOCH_BATCH = True
+
 #------------------------------------------------------------------------------
 #                                                                              
 # the main interface method
@@ -59,6 +72,7 @@ NULL_CLASS = "BCKG"
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  jobs: the number of processes used to score the files
 #
 # return: a logical value indicating status
 #
@@ -67,7 +81,8 @@ NULL_CLASS = "BCKG"
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
+def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a,
+        jobs_a = npt.DEF_JOBS):
 
     # define local variables
     #
@@ -88,7 +103,7 @@ def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
     # run epoch scoring
     #
     status = nepoch.init_score(map_a)
-    status = nepoch.score(reflist_a, hyplist_a, map_a, rfile_a)
+    status = nepoch.score(reflist_a, hyplist_a, map_a, rfile_a, jobs_a)
     if status == False:
         print("%s (%s: %s): error during scoring" % \
             (sys.argv[0], __name__, "run"))
@@ -118,6 +133,50 @@ def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
 #
 # end of function
 
+# method: run_sweep
+#
+# arguments:
+#  reflist: the reference file list
+#  scores: a dictionary mapping of files and frame scores
+#  map: a mapping used to collapse classes during scoring
+#  frame_dur: the duration of a frame in secs
+#  thresholds: the thresholds at which the curve is computed
+#  key: the class the frame scores detect
+#
+# return: the scoring object (see get_roc and get_det), or None on error
+#
+# This method computes an epoch-based roc/det curve from frame scores
+# in a single pass (see NedcEpoch.score_sweep).
+#
+def run_sweep(reflist_a, scores_a, map_a, frame_dur_a, thresholds_a, key_a):
+
+    # define local variables
+    #
+    nepoch = NedcEpoch()
+
+    # check the reference file list
+    #
+    if len(reflist_a) < 1:
+        print("%s (%s: %s): file list error (%s)" % \
+            (sys.argv[0], __name__, "run_sweep", reflist_a))
+        return None
+
+    # compute the curve
+    #
+    status = nepoch.init_score(map_a)
+    status = nepoch.score_sweep(reflist_a, scores_a, frame_dur_a,
+                                thresholds_a, key_a)
+    if status == False:
+        print("%s (%s: %s): error during scoring" % \
+            (sys.argv[0], __name__, "run_sweep"))
+        return None
+
+    # exit gracefully
+    #
+    return nepoch
+#
+# end of function
+
 #------------------------------------------------------------------------------
 #
 # classes are listed here
@@ -144,6 +203,7 @@ class NedcEpoch():
         #
         self.epoch_dur_d = EPOCH_DURATION
         self.null_class_d = NULL_CLASS.lower()
+        self.batch_d = EPOCH_BATCH
 
         # declare a variable to hold a permuted map
         #
@@ -348,93 +408,119 @@ class NedcEpoch():
     #  files_hyp: a hypothesis file list
     #  map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  jobs: the number of processes used to score the files
     #
     # return: a logical value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a):
-        
+    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a,
+              jobs_a = npt.DEF_JOBS):
 
         # declare local variables
         #
         status = True
 
-        # create the results file
+        # score each file
+        #
+        reports = npt.score_files(self, files_ref_a, files_hyp_a, jobs_a)
+        if reports is None:
+            print("%s (%s: %s): error scoring files" % \
+                (sys.argv[0], __name__, "score"))
+            return False
+
+        # create the results file and write the per file results
         #
         self.rfile_d = nft.make_fp(rfile_a)
+        for report in reports:
+            self.rfile_d.write(report)
 
-        # for each fname
+        # close the file
         #
-        for i, fname in enumerate(files_ref_a):
+        self.rfile_d.close()
 
-            # get the ref events
-            #
-            events_ref = files_ref_a.get(fname, None)
-            if events_ref == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_ref_a[i]))
-                return False
+        # exit gracefully
+        # 
+        return True
+    #
+    # end of method
 
-            # get the hyp events
-            #
-            events_hyp = files_hyp_a.get(fname, None)
-            if events_hyp == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_hyp_a[i]))
-                return False
+    # method: score_file
+    #
+    # arguments:
+    #  i: the index of the file in the file list
+    #  fname: the file to be scored
+    #  files_ref: a reference file list
+    #  files_hyp: a hypothesis file list
+    #
+    # return: the per file results as a string, or None on error
+    #
+    # This method adds one file to the confusion matrix.
+    #
+    def score_file(self, i_a, fname_a, files_ref_a, files_hyp_a):
 
-            # update the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
+        # declare local variables
+        #
+        report = ""
 
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
-                
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
+        # get the ref events
+        #
+        events_ref = files_ref_a.get(fname_a, None)
+        if events_ref == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # add this to the confusion matrix
-            #
+        # get the hyp events
+        #
+        events_hyp = files_hyp_a.get(fname_a, None)
+        if events_hyp == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
+
+        # update the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
+
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
+        #
+        ann_ref = nat.map_events(events_ref, self.pmap_d)
+        ann_hyp = nat.map_events(events_hyp, self.pmap_d)
+
+        # add this to the confusion matrix
+        #
+        if self.batch_d:
+            refo, hypo = self.compute_batch(ann_ref, ann_hyp,
+                                            self.epoch_dur_d)
+        else:
             refo, hypo = self.compute(ann_ref, ann_hyp, self.epoch_dur_d)
-            if refo == None:
-                print("%s (%s: %s): error computing confusion matrix (%s %s)" \
-                    % (sys.argv[0], __name__, "score", \
-                       files_ref_a[i], files_hyp_a[i]))
-                return False
+        if refo == None:
+            print("%s (%s: %s): error computing confusion matrix (%s %s)" \
+                % (sys.argv[0], __name__, "score_file", \
+                   fname_a, fname_a))
+            return None
 
-            # output the files to the per file results file
-            #
-            ref_fm, hyp_fm, hits, subs, inss, dels = \
+        # output the files to the per file results file
+        #
+        ref_fm, hyp_fm, hits, subs, inss, dels = \
 		ndt.format_hyp(refo, hypo)
 
-            # output the files to the per file results file
-            #
-            self.rfile_d.write("%5d: %s.tse\n" % (i, fname))
-            self.rfile_d.write("%5s  %s.hyp\n" % ("", fname))
-            self.rfile_d.write("  Ref: %s\n" % ref_fm)
-            self.rfile_d.write("  Hyp: %s\n" % hyp_fm)
-            self.rfile_d.write("%7s (Hits: %d  Sub: %d  Ins: %d  Del: %d  Total: %d)\n" \
-                               % ("", hits, subs, inss, dels, \
-                                  subs + inss + dels))
-            self.rfile_d.write("\n")
-
-        # close the file
+        # output the files to the per file results file
         #
-        self.rfile_d.close()
+        report += ("%5d: %s.tse\n" % (i_a, fname_a))
+        report += ("%5s  %s.hyp\n" % ("", fname_a))
+        report += ("  Ref: %s\n" % ref_fm)
+        report += ("  Hyp: %s\n" % hyp_fm)
+        report += ("%7s (Hits: %d  Sub: %d  Ins: %d  Del: %d  Total: %d)\n" \
+                   % ("", hits, subs, inss, dels, \
+                        subs + inss + dels))
+        report += ("\n")
 
         # exit gracefully
-        # 
-        return True
+        #
+        return report
     #
     # end of method
 
@@ -478,12 +564,21 @@ class NedcEpoch():
         stop_time = ref_a[-1][1]
         i = 0
 
+        # index both annotations by their stop times once per file:
+        #  the sample times increase monotonically, so each search can
+        #  start from the last index found
+        #
+        ref_stops = self.index_stops(ref_a)
+        hyp_stops = self.index_stops(hyp_a)
+        j = int(0)
+        k = int(0)
+
         while curr_time <= stop_time:
 
             # convert time to an index
             #
-            j = self.time_to_index(curr_time, ref_a)
-            k = self.time_to_index(curr_time, hyp_a)
+            j = self.time_to_index(curr_time, ref_a, ref_stops, max(j, 0))
+            k = self.time_to_index(curr_time, hyp_a, hyp_stops, max(k, 0))
 
             # increment the substitution matrix
             #
@@ -522,17 +617,210 @@ class NedcEpoch():
     #
     # end of method
 
+    # method: compute_batch
+    #
+    # arguments:
+    #  ref: reference annotation
+    #  hyp: hypothesis annotation
+    #  dur: the duration of time used to sample the annotations
+    #  
+    # return:
+    #  refo: the output aligned ref string
+    #  hypo: the output aligned hyp string
+    #
+    # This method is a vectorized version of compute. All the sample
+    # times for a file are generated at once, converted to event indices
+    # with a single search, and the labels are converted to integer codes
+    # so the confusion matrix can be filled with a histogram. The results
+    # are identical to compute.
+    #
+    def compute_batch(self, ref_a, hyp_a, dur_a):
+
+        # check to make sure the annotations match:
+        #  since these are floating point values for times, we
+        #  do a simple sanity check to make sure the end times
+        #  are close (within 1 microsecond)
+        #
+        if round(ref_a[-1][1], 3) != round(hyp_a[-1][1], 3):
+            return False
+
+        # assign an integer code to each label in the order of the
+        # scoring map. the null class gets the last code.
+        #
+        labels = list(self.sub_d.keys())
+        codes = {lbl: i for i, lbl in enumerate(labels)}
+        num_labels = len(labels)
+        labels.append(ntt.NULL_CLASS)
+
+        # generate the sample times
+        #
+        times = self.epoch_times(ref_a[-1][1], dur_a)
+
+        # convert the sample times to label codes
+        #
+        rcodes = self.times_to_codes(times, ref_a, codes)
+        hcodes = self.times_to_codes(times, hyp_a, codes)
+
+        # increment the substitution matrix and count the number of
+        # reference events
+        #
+        cnf = np.bincount(rcodes * num_labels + hcodes,
+                          minlength = num_labels * num_labels)
+        cnf = cnf.reshape(num_labels, num_labels)
+        tgt = cnf.sum(axis = 1)
+
+        for i in range(num_labels):
+            for j in range(num_labels):
+                self.sub_d[labels[i]][labels[j]] += int(cnf[i][j])
+            self.tgt_d[labels[i]] += int(tgt[i])
+
+        # add null characters at the input and output
+        #
+        reft = np.concatenate(([num_labels], rcodes, [num_labels]))
+        hypt = np.concatenate(([num_labels], hcodes, [num_labels]))
+
+        # remove duplicate matches
+        #
+        keep = np.ones(len(reft), dtype = bool)
+        keep[1:] = (reft[1:] != reft[:-1]) | (hypt[1:] != hypt[:-1])
+
+        refo = [labels[i] for i in reft[keep]]
+        hypo = [labels[i] for i in hypt[keep]]
+
+        # exit gracefully
+        #
+        return (refo, hypo)
+    #
+    # end of method
+
+    # method: epoch_times
+    #
+    # arguments:
+    #  stop_time: the stop time of the last event in a file
+    #  dur: the duration of time used to sample the annotations
+    #
+    # return: an array of sample times
+    #
+    # This method returns the time at the center of each epoch. The number
+    # of samples uses the same expression for time as compute so the last
+    # sample is the same.
+    #
+    def epoch_times(self, stop_time_a, dur_a):
+
+        # count the number of samples
+        #
+        dur_by_2 = dur_a / float(2.0)
+        num_samples = max(int((stop_time_a - dur_by_2) // dur_a) + 1, 0)
+        while dur_by_2 + num_samples * dur_a <= stop_time_a:
+            num_samples += 1
+        while (num_samples > 0) and \
+              (dur_by_2 + (num_samples - 1) * dur_a > stop_time_a):
+            num_samples -= 1
+
+        # exit gracefully
+        #
+        return dur_by_2 + np.arange(num_samples, dtype = np.float64) * dur_a
+    #
+    # end of method
+
+    # method: times_to_codes
+    #
+    # arguments:
+    #  times: an array of sample times in secs
+    #  ann: a list of annotation events
+    #  codes: a mapping of labels to integer codes
+    #
+    # return: an array of label codes, one per sample time
+    #
+    # This method is a vectorized version of time_to_index that returns
+    # the code of the label found at each time. As in compute, a time
+    # that does not fall in any event gets the label of the last event.
+    #
+    def times_to_codes(self, times_a, ann_a, codes_a):
+
+        # convert the labels to codes
+        #
+        ann_codes = np.array([codes_a[entry[2]] for entry in ann_a],
+                             dtype = np.int64)
+
+        # search the stop times if they are sorted
+        #
+        stops = self.index_stops(ann_a)
+        if stops is not None:
+            starts = np.array([entry[0] for entry in ann_a],
+                              dtype = np.float64)
+            index = np.searchsorted(np.array(stops, dtype = np.float64),
+                                    times_a, side = "left")
+            found = index < len(ann_a)
+            found[found] = times_a[found] >= starts[index[found]]
+            index[~found] = int(-1)
+
+        # otherwise, fall back to a linear search per sample
+        #
+        else:
+            index = np.array([self.time_to_index(val, ann_a) \
+                              for val in times_a.tolist()], dtype = np.int64)
+
+        # exit gracefully
+        #
+        return ann_codes[index]
+    #
+    # end of method
+
+    # method: index_stops
+    #
+    # arguments:
+    #  ann: a list of annotation events
+    #
+    # return: a list of stop times (or None)
+    #
+    # This method collects the stop times of an annotation so that
+    # time_to_index can use a binary search. Events are sorted by start
+    # time, so the stop times are sorted too unless events are nested.
+    # In that case, None is returned and a linear search must be used.
+    #
+    def index_stops(self, ann_a):
+
+        # collect the stop times
+        #
+        stops = [entry[1] for entry in ann_a]
+
+        # make sure they are in order
+        #
+        for i in range(1, len(stops)):
+            if stops[i] < stops[i-1]:
+                return None
+
+        # exit gracefully
+        #
+        return stops
+    #
+    # end of method
+
     # method: time_to_index
     #
     # arguments:
     #  val: a floating point value of time in secs
     #  ann: a list of annotation events
+    #  stops: the sorted stop times of ann (optional)
+    #  lo: the index at which to start searching (optional)
     #
     # return: an integer index
     #
     # This method finds the annotation corresponding to a value of time.
+    # If the stop times are supplied, the first event that stops at or
+    # after val is found by a binary search. This is the same event a
+    # linear search would find, since no earlier event can contain val.
     #
-    def time_to_index(self, val_a, ann_a):
+    def time_to_index(self, val_a, ann_a, stops_a = None, lo_a = int(0)):
+
+        # search the stop times if they are available
+        #
+        if stops_a is not None:
+            index = bisect.bisect_left(stops_a, val_a, lo_a)
+            if (index < len(ann_a)) and (val_a >= ann_a[index][0]):
+                return index
+            return int(-1)
 
         # loop over the annotation
         #
@@ -966,6 +1254,276 @@ class NedcEpoch():
         return True
     #
     # end of method
+
+    # method: open_stream
+    #
+    # arguments: none
+    #
+    # return: a new stream
+    #
+    # This method starts incremental scoring of one recording (see
+    # nedc_stream_tools). Any number of streams can be open at once; they
+    # all update this object's counters.
+    #
+    def open_stream(self):
+        return nst.EventStream()
+    #
+    # end of method
+
+    # method: score_stream
+    #
+    # arguments:
+    #  stream: a stream returned by open_stream
+    #  events_ref: new reference events
+    #  events_hyp: new hypothesis events
+    #  watermark: all events that start before this time have been appended
+    #
+    # return: a logical value indicating status
+    #
+    # This method appends events to a stream and samples the epochs whose
+    # centers are before the watermark. The total duration grows with the
+    # watermark.
+    #
+    def score_stream(self, stream_a, events_ref_a, events_hyp_a, watermark_a):
+
+        # append the events
+        #
+        watermark = stream_a.watermark_d
+        if stream_a.append(events_ref_a, events_hyp_a, watermark_a,
+                           self.pmap_d) == False:
+            print("%s (%s: %s): error appending events" % \
+                (sys.argv[0], __name__, "score_stream"))
+            return False
+        self.total_dur_d += stream_a.watermark_d - watermark
+
+        # sample the finalized epochs
+        #
+        self.advance_stream(stream_a, stream_a.watermark_d)
+
+        # exit gracefully
+        #
+        return True
+    #
+    # end of method
+
+    # method: close_stream
+    #
+    # arguments:
+    #  stream: a stream returned by open_stream
+    #
+    # return: a logical value indicating status
+    #
+    # This method ends a stream and samples the remaining epochs. As in
+    # compute, the ref and hyp must end at the same time. When all the
+    # events of a file are appended before the stream is closed, the
+    # counters are the same as those from compute on the file with its
+    # gaps filled by background.
+    #
+    def close_stream(self, stream_a):
+
+        # close the stream
+        #
+        stop_time = stream_a.close()
+        if stop_time is None:
+            print("%s (%s: %s): error closing stream" % \
+                (sys.argv[0], __name__, "close_stream"))
+            return False
+        self.total_dur_d += stop_time - stream_a.watermark_d
+        stream_a.watermark_d = stop_time
+
+        # remove the epochs sampled after the end of the file:
+        #  the watermark can pass the stop time, and no event contains
+        #  those epochs, so they were all sampled as background
+        #
+        num_extra = stream_a.index_d - \
+            len(self.epoch_times(stop_time, self.epoch_dur_d))
+        if num_extra > 0:
+            bckg = self.pmap_d[nat.BCKG_CLASS]
+            self.sub_d[bckg][bckg] -= num_extra
+            self.tgt_d[bckg] -= num_extra
+            stream_a.index_d -= num_extra
+
+        # sample the remaining epochs
+        #
+        self.advance_stream(stream_a, None)
+
+        # exit gracefully
+        #
+        return True
+    #
+    # end of method
+
+    # method: advance_stream
+    #
+    # arguments:
+    #  stream: a stream returned by open_stream
+    #  watermark: the time up to which events are final (None = all)
+    #
+    # return: none
+    #
+    # This method samples epochs in the same way as compute. An epoch
+    # whose center is before the watermark is final, since every event
+    # that contains it has been appended. An epoch that falls in a gap
+    # between events is background, as if the gap had been filled (see
+    # nat.fill_gap), so streams that only contain seizure events are
+    # scored as they arrive. Events that stop before the next epoch are
+    # then dropped.
+    #
+    def advance_stream(self, stream_a, watermark_a):
+
+        # declare local variables
+        #
+        ref = stream_a.ref_d
+        hyp = stream_a.hyp_d
+        dur_by_2 = self.epoch_dur_d / float(2.0)
+        bckg = self.pmap_d[nat.BCKG_CLASS]
+
+        # loop over the finalized epochs:
+        #  time is computed from an integer counter, as in compute
+        #
+        while True:
+            curr_time = dur_by_2 + stream_a.index_d * self.epoch_dur_d
+            if watermark_a is None:
+                if curr_time > stream_a.stop_ref_d:
+                    break
+            elif curr_time >= watermark_a:
+                break
+
+            # find the events that contain this time:
+            #  a time that no event contains is background
+            #
+            j = self.time_to_index(curr_time, ref)
+            k = self.time_to_index(curr_time, hyp)
+            lbl_ref = ref[j][2] if j >= 0 else bckg
+            lbl_hyp = hyp[k][2] if k >= 0 else bckg
+
+            # increment the substitution matrix and count the number of
+            # reference events
+            #
+            self.sub_d[lbl_ref][lbl_hyp] += int(1)
+            self.tgt_d[lbl_ref] += 1
+            stream_a.index_d += 1
+
+        # drop the events that stop before the next epoch
+        #
+        for elist in (ref, hyp):
+            num_done = int(0)
+            while (num_done < len(elist)) and \
+                  (elist[num_done][1] < curr_time):
+                num_done += 1
+            del elist[:num_done]
+
+        # exit gracefully
+        #
+        return None
+    #
+    # end of method
+
+    # method: score_sweep
+    #
+    # arguments:
+    #  files_ref: a reference file list
+    #  scores: a dictionary mapping of files and frame scores
+    #  frame_dur: the duration of a frame in secs
+    #  thresholds: the thresholds at which the curve is computed
+    #  key: the class the frame scores detect
+    #
+    # return: a logical value indicating status
+    #
+    # This method computes an roc/det curve directly from frame scores
+    # (e.g., the seizure probabilities of a TDNN). An epoch is labeled
+    # key by the hypothesis if the score of the frame at the center of
+    # the epoch is greater than the threshold. The epoch scores of all
+    # files are sorted once, and cumulative sums of the ref labels give
+    # the counts at every threshold. Files without scores are all
+    # background. Note that no post-processing (e.g., a minimum event
+    # duration) is applied to the thresholded frames.
+    #
+    # The counts and the derived measures for key are arrays with one
+    # entry per threshold; get_roc and get_det return them as curves.
+    #
+    def score_sweep(self, files_ref_a, scores_a, frame_dur_a, thresholds_a,
+                    key_a):
+
+        # declare local variables
+        #
+        codes = {lbl: i for i, lbl in enumerate(self.sub_d.keys())}
+        if key_a not in codes:
+            print("%s (%s: %s): unknown class (%s)" % \
+                (sys.argv[0], __name__, "score_sweep", key_a))
+            return False
+        epoch_scores = []
+        epoch_refs = []
+
+        # loop over all files
+        #
+        for fname in files_ref_a:
+
+            # sample the reference at the center of each epoch
+            #
+            ann_ref = nat.map_events(files_ref_a[fname], self.pmap_d)
+            self.total_dur_d += ann_ref[-1][1]
+            times = self.epoch_times(ann_ref[-1][1], self.epoch_dur_d)
+            epoch_refs.append(self.times_to_codes(times, ann_ref, codes) == \
+                              codes[key_a])
+
+            # look up the score of the frame that contains each epoch center
+            #
+            scores = scores_a.get(fname, None)
+            if scores is None or len(scores) == 0:
+                epoch_scores.append(np.full(len(times), -np.inf))
+                continue
+            frames = np.minimum((times // frame_dur_a).astype(np.int64),
+                                len(scores) - 1)
+            epoch_scores.append(np.asarray(scores, dtype = np.float64)[frames])
+
+        # sort the epoch scores once (highest first) and count the ref
+        # epochs that are and are not key above each position
+        #
+        epoch_scores = np.concatenate(epoch_scores + [np.empty(0)])
+        epoch_refs = np.concatenate(epoch_refs + [np.empty(0, dtype = bool)])
+        order = np.argsort(-epoch_scores, kind = "stable")
+        pos = np.concatenate(([0], np.cumsum(epoch_refs[order])))
+        neg = np.concatenate(([0], np.cumsum(~epoch_refs[order])))
+
+        # the epochs labeled key at a threshold are those whose scores
+        # are greater than it, which are the first num_above in order
+        #
+        thresholds = np.asarray(thresholds_a, dtype = np.float64)
+        num_above = len(epoch_scores) - \
+            np.searchsorted(epoch_scores[order][::-1], thresholds,
+                            side = "right")
+
+        # compute the counts
+        #
+        num_pos = int(pos[-1])
+        num_neg = int(neg[-1])
+        self.tp_d[key_a] = pos[num_above]
+        self.fp_d[key_a] = neg[num_above]
+        self.fn_d[key_a] = num_pos - self.tp_d[key_a]
+        self.tn_d[key_a] = num_neg - self.fp_d[key_a]
+
+        # compute the derived measures
+        #
+        if num_pos != 0:
+            self.tpr_d[key_a] = self.tp_d[key_a] / float(num_pos)
+        else:
+            self.tpr_d[key_a] = np.zeros(len(thresholds))
+
+        if num_neg != 0:
+            self.tnr_d[key_a] = self.tn_d[key_a] / float(num_neg)
+        else:
+            self.tnr_d[key_a] = np.zeros(len(thresholds))
+
+        self.fnr_d[key_a] = 1 - self.tpr_d[key_a]
+        self.fpr_d[key_a] = 1 - self.tnr_d[key_a]
+
+        # exit gracefully
+        #
+        return True
+    #
+    # end of method
+
     # method: score_roc
     #
     # arguments:
@@ -978,23 +1536,26 @@ class NedcEpoch():
     #
     def score_roc(self, events_ref_a, events_hyp_a):
         
-        # declare local variables
-        #
-        status = True
-        ann = nat.Annotations()
-
         # loop over all event lists (corresponding to files)
         #
-        for ann_ref, ann_hyp in zip(events_ref_a, events_hyp_a):
+        for events_ref, events_hyp in zip(events_ref_a, events_hyp_a):
 
             # update the total duration
             #
-            self.total_dur_d += ann_ref[-1][1]
+            self.total_dur_d += events_ref[-1][1]
 
-            # add this to the confusion matrix
+            # map the annotations before scoring
             #
-            refo, hypo = self.compute(ann_ref, ann_hyp, self.epoch_dur_d)
+            ann_ref = nat.map_events(events_ref, self.pmap_d)
+            ann_hyp = nat.map_events(events_hyp, self.pmap_d)
 
+            # add this to the confusion matrix
+            #
+            if self.batch_d:
+                refo, hypo = self.compute_batch(ann_ref, ann_hyp,
+                                                self.epoch_dur_d)
+            else:
+                refo, hypo = self.compute(ann_ref, ann_hyp, self.epoch_dur_d)
             if refo == None:
                 print("%s (%s: %s): error computing confusions" % \
                     (sys.argv[0], __name__, "score_roc"))
@@ -1006,6 +1567,27 @@ class NedcEpoch():
     #
     # end of method
 
+    # method: score_roc_sweep
+    #
+    # arguments:
+    #  events_ref: a reference list
+    #  events_hyp: a hypothesis list
+    #  thresholds: the thresholds at which the curve is computed
+    #  key: the class to be scored
+    #
+    # return: a logical value indicating status
+    #
+    # This method computes an roc/det curve for key by thresholding the
+    # confidences of the hypothesis events (see nrt.sweep). Afterwards,
+    # get_roc and get_det return one point per threshold.
+    #
+    def score_roc_sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                        key_a):
+        return nrt.sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                         key_a)
+    #
+    # end of method
+
     # method: compute_performance_roc
     #
     # arguments:
@@ -1032,9 +1614,22 @@ class NedcEpoch():
 
         #----------------------------------------------------------------------
         # (1) The first block of parameters count events such as hits,
-        #     missses and false alarms. The overlap algorithm provides
-        #     these directly.
+        #     missses and false alarms. The epoch algorithm only fills
+        #     the confusion matrix, so these are derived from it (as in
+        #     compute_performance). They are assigned rather than
+        #     accumulated so this method can be called more than once.
         #
+        for key1 in self.sub_d:
+            self.hit_d[key1] = self.sub_d[key1][key1]
+            self.mis_d[key1] = int(0)
+            for key2 in self.sub_d:
+                if key1 != key2:
+                    self.mis_d[key1] += self.sub_d[key1][key2]
+            if key1 != self.null_class_d:
+                self.fal_d[key1] = self.sub_d[self.null_class_d][key1]
+            else:
+                self.fal_d[key1] = int(0)
+
         for key1 in self.hit_d:
             self.ins_d[key1] = self.fal_d[key1]
             self.del_d[key1] = self.mis_d[key1]
@@ -48,6 +48,9 @@ import sys_tools.nedc_file_tools as nft
 import sys_tools.nedc_ann_tools as nat
 import sys_tools.nedc_text_tools as ntt
 import sys_tools.nedc_display_tools as ndt
+import sys_tools.nedc_pool_tools as npt
+import sys_tools.nedc_roc_tools as nrt
+import sys_tools.nedc_stream_tools as nst
 
 #------------------------------------------------------------------------------
 #
@@ -84,6 +87,7 @@ STOP_TIME_INDEX = 1
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  jobs: the number of processes used to score the files
 #
 # return: a logical value indicating status
 #
@@ -92,7 +96,8 @@ STOP_TIME_INDEX = 1
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
+def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a,
+        jobs_a = npt.DEF_JOBS):
 
     # define local variables
     #
@@ -113,7 +118,7 @@ def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
     # run overlap scoring
     #
     status = novlp.init_score(map_a)
-    status = novlp.score(reflist_a, hyplist_a, map_a, rfile_a)
+    status = novlp.score(reflist_a, hyplist_a, map_a, rfile_a, jobs_a)
     if status == False:
         print("%s (%s: %s): error during scoring" % \
             (sys.argv[0], __name__, "run"))
@@ -364,87 +369,110 @@ class NedcOverlap():
     #  files_hyp: a hypothesis file list
     #  map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  jobs: the number of processes used to score the files
     #
     # return: a logical value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a):
-        
+    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a,
+              jobs_a = npt.DEF_JOBS):
+
         # declare local variables
         #
         status = True
 
-        # create the results file
+        # score each file
+        #
+        reports = npt.score_files(self, files_ref_a, files_hyp_a, jobs_a)
+        if reports is None:
+            print("%s (%s: %s): error scoring files" % \
+                (sys.argv[0], __name__, "score"))
+            return False
+
+        # create the results file and write the per file results
         #
         self.rfile_d = nft.make_fp(rfile_a)
+        for report in reports:
+            self.rfile_d.write(report)
 
-        # for each fname
+        # close the file
         #
-        for i, fname in enumerate(files_ref_a):
+        self.rfile_d.close()
 
-            # get the ref events
-            #
-            events_ref = files_ref_a.get(fname, None)
-            if events_ref == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_ref_a[i]))
-                return False
+        # exit gracefully
+        # 
+        return True
+    #
+    # end of method
 
-            # get the hyp events
-            #
-            events_hyp = files_hyp_a.get(fname, None)
-            if events_hyp == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_hyp_a[i]))
-                return False
+    # method: score_file
+    #
+    # arguments:
+    #  i: the index of the file in the file list
+    #  fname: the file to be scored
+    #  files_ref: a reference file list
+    #  files_hyp: a hypothesis file list
+    #
+    # return: the per file results as a string, or None on error
+    #
+    # This method adds one file to the confusion matrix.
+    #
+    def score_file(self, i_a, fname_a, files_ref_a, files_hyp_a):
 
-            # update the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
+        # declare local variables
+        #
+        report = ""
 
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
-                
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
+        # get the ref events
+        #
+        events_ref = files_ref_a.get(fname_a, None)
+        if events_ref == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # add this to the confusion matrix
-            #
-            refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
-            if refo == None:
-                print("%s (%s: %s): error computing confusions (%s %s)" % \
-                    (sys.argv[0], __name__, "score", \
-                     files_ref_a[i], files_hyp_a[i]))
-                return False
+        # get the hyp events
+        #
+        events_hyp = files_hyp_a.get(fname_a, None)
+        if events_hyp == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # output the files to the per file results file
-            #
-            self.rfile_d.write("%5d: %s.tse\n" % (i, fname))
-            self.rfile_d.write("%5s  %s.hyp\n" % ("", fname))
-            self.rfile_d.write("  Ref: %s\n" % ' '.join(refo))
-            self.rfile_d.write("  Hyp: %s\n" % ' '.join(hypo))
-            self.rfile_d.write("%6s (Hits: %d  Miss: %d  False Alarms: %d  Total: %d)\n" \
-                               % ("", hit, mis, fal, \
-                                  hit + mis + fal))
-            self.rfile_d.write("\n")
+        # update the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-        # close the file
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
         #
-        self.rfile_d.close()
+        ann_ref = nat.map_events(events_ref, self.pmap_d)
+        ann_hyp = nat.map_events(events_hyp, self.pmap_d)
+
+        # add this to the confusion matrix
+        #
+        refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
+        if refo == None:
+            print("%s (%s: %s): error computing confusions (%s %s)" % \
+                (sys.argv[0], __name__, "score_file", \
+                 fname_a, fname_a))
+            return None
+
+        # output the files to the per file results file
+        #
+        report += ("%5d: %s.tse\n" % (i_a, fname_a))
+        report += ("%5s  %s.hyp\n" % ("", fname_a))
+        report += ("  Ref: %s\n" % ' '.join(refo))
+        report += ("  Hyp: %s\n" % ' '.join(hypo))
+        report += ("%6s (Hits: %d  Miss: %d  False Alarms: %d  Total: %d)\n" \
+                   % ("", hit, mis, fal, \
+                        hit + mis + fal))
+        report += ("\n")
 
         # exit gracefully
-        # 
-        return True
+        #
+        return report
     #
     # end of method
 
@@ -485,10 +513,23 @@ class NedcOverlap():
         mis = int(0)
         fal = int(0)
 
-        for event in ref_a:
+        # find the range of overlapping events for each event in a
+        # single pass over both annotations (None if they are not sorted)
+        #
+        rranges = None
+        hranges = None
+        if nat.is_sorted(ref_a) and nat.is_sorted(hyp_a):
+            rranges = nat.sweep_events(ref_a, hyp_a)
+            hranges = nat.sweep_events(hyp_a, ref_a)
+
+        for i, event in enumerate(ref_a):
             self.tgt_d[event[2]] += 1            
             refo.append(event[2])
-            labels, starts, stops = self.get_events(event[0], event[1], hyp_a)
+            if rranges is not None:
+                labels = [hyp_a[j][2] for j in range(*rranges[i])]
+            else:
+                labels, starts, stops = \
+                    self.get_events(event[0], event[1], hyp_a)
             if event[2] in labels:
                 self.hit_d[event[2]] += 1
                 hit += 1
@@ -498,9 +539,13 @@ class NedcOverlap():
 
         # loop over the hyp annotation to collect false alarms
         #
-        for event in hyp_a:
+        for i, event in enumerate(hyp_a):
             hypo.append(event[2])
-            labels, starts, stops = self.get_events(event[0], event[1], ref_a)
+            if hranges is not None:
+                labels = [ref_a[j][2] for j in range(*hranges[i])]
+            else:
+                labels, starts, stops = \
+                    self.get_events(event[0], event[1], ref_a)
             if event[2] not in labels:
                 self.fal_d[event[2]] += 1
                 fal += 1
@@ -920,6 +965,178 @@ class NedcOverlap():
     #
     # end of method
 
+    #--------------------------------------------------------------------------
+    #
+    # class-specific methods go here:
+    #  these methods support incremental scoring of a recording that is
+    #  still being produced (see nedc_stream_tools)
+    #
+    #--------------------------------------------------------------------------
+
+    # method: open_stream
+    #
+    # arguments: none
+    #
+    # return: a new stream
+    #
+    # This method starts incremental scoring of one recording. Any number
+    # of streams can be open at once; they all update this object's
+    # counters.
+    #
+    def open_stream(self):
+        return nst.EventStream()
+    #
+    # end of method
+
+    # method: score_stream
+    #
+    # arguments:
+    #  stream: a stream returned by open_stream
+    #  events_ref: new reference events
+    #  events_hyp: new hypothesis events
+    #  watermark: all events that start before this time have been appended
+    #
+    # return: a logical value indicating status
+    #
+    # This method appends events to a stream and scores the events that
+    # stop at or before the watermark. Nothing that overlaps such an event
+    # can arrive later, so its hit, miss or false alarm is final. The
+    # total duration grows with the watermark.
+    #
+    def score_stream(self, stream_a, events_ref_a, events_hyp_a, watermark_a):
+
+        # append the events
+        #
+        watermark = stream_a.watermark_d
+        if stream_a.append(events_ref_a, events_hyp_a, watermark_a,
+                           self.pmap_d) == False:
+            print("%s (%s: %s): error appending events" % \
+                (sys.argv[0], __name__, "score_stream"))
+            return False
+        self.total_dur_d += stream_a.watermark_d - watermark
+
+        # score the finalized events
+        #
+        self.advance_stream(stream_a, stream_a.watermark_d)
+
+        # exit gracefully
+        #
+        return True
+    #
+    # end of method
+
+    # method: close_stream
+    #
+    # arguments:
+    #  stream: a stream returned by open_stream
+    #
+    # return: a logical value indicating status
+    #
+    # This method ends a stream and scores the events that remain. As in
+    # compute, the ref and hyp must end at the same time. When all the
+    # events of a file are appended before the stream is closed, the
+    # counters are the same as those from compute.
+    #
+    def close_stream(self, stream_a):
+
+        # close the stream
+        #
+        stop_time = stream_a.close()
+        if stop_time is None:
+            print("%s (%s: %s): error closing stream" % \
+                (sys.argv[0], __name__, "close_stream"))
+            return False
+        self.total_dur_d += stop_time - stream_a.watermark_d
+        stream_a.watermark_d = stop_time
+
+        # score the remaining events
+        #
+        self.advance_stream(stream_a, None)
+
+        # exit gracefully
+        #
+        return True
+    #
+    # end of method
+
+    # method: advance_stream
+    #
+    # arguments:
+    #  stream: a stream returned by open_stream
+    #  watermark: the time up to which events are final (None = all)
+    #
+    # return: none
+    #
+    # This method scores the events that stop at or before the watermark,
+    # in the order they were appended, using the same tests as compute.
+    # Scored events are then dropped once no pending or future event in
+    # the other stream can overlap them.
+    #
+    def advance_stream(self, stream_a, watermark_a):
+
+        # collect hits and misses for the finalized ref events
+        #
+        ref = stream_a.ref_d
+        hyp = stream_a.hyp_d
+        i = stream_a.next_ref_d
+        while (i < len(ref)) and \
+              ((watermark_a is None) or (ref[i][1] <= watermark_a)):
+            event = ref[i]
+            self.tgt_d[event[2]] += 1
+            labels, starts, stops = self.get_events(event[0], event[1], hyp)
+            if event[2] in labels:
+                self.hit_d[event[2]] += 1
+            else:
+                self.mis_d[event[2]] += 1
+            i += 1
+        stream_a.next_ref_d = i
+
+        # collect false alarms for the finalized hyp events
+        #
+        i = stream_a.next_hyp_d
+        while (i < len(hyp)) and \
+              ((watermark_a is None) or (hyp[i][1] <= watermark_a)):
+            event = hyp[i]
+            labels, starts, stops = self.get_events(event[0], event[1], ref)
+            if event[2] not in labels:
+                self.fal_d[event[2]] += 1
+            i += 1
+        stream_a.next_hyp_d = i
+
+        # drop scored events that can no longer overlap anything:
+        #  pending events start at or after the first pending start, and
+        #  future events start at or after the watermark
+        #
+        if watermark_a is None:
+            del ref[:], hyp[:]
+            stream_a.next_ref_d = int(0)
+            stream_a.next_hyp_d = int(0)
+            return None
+
+        limits = []
+        for elist, next_event in [(hyp, stream_a.next_hyp_d),
+                                  (ref, stream_a.next_ref_d)]:
+            if next_event < len(elist):
+                limits.append(min(elist[next_event][0], watermark_a))
+            else:
+                limits.append(watermark_a)
+
+        for name, limit in [("ref", limits[0]), ("hyp", limits[1])]:
+            elist = getattr(stream_a, name + "_d")
+            next_event = getattr(stream_a, "next_" + name + "_d")
+            num_done = int(0)
+            while (num_done < next_event) and \
+                  (elist[num_done][1] <= limit):
+                num_done += 1
+            del elist[:num_done]
+            setattr(stream_a, "next_" + name + "_d", next_event - num_done)
+
+        # exit gracefully
+        #
+        return None
+    #
+    # end of method
+
     #--------------------------------------------------------------------------
     #
     # class-specific methods go here:
@@ -939,18 +1156,18 @@ class NedcOverlap():
     #
     def score_roc(self, events_ref_a, events_hyp_a):
         
-        # declare local variables
-        #
-        status = True
-        ann = nat.Annotations()
-
         # loop over all event lists (corresponding to files)
         #
-        for ann_ref, ann_hyp in zip(events_ref_a, events_hyp_a):
+        for events_ref, events_hyp in zip(events_ref_a, events_hyp_a):
 
             # update the total duration
             #
-            self.total_dur_d += ann_ref[-1][1]
+            self.total_dur_d += events_ref[-1][1]
+
+            # map the annotations before scoring
+            #
+            ann_ref = nat.map_events(events_ref, self.pmap_d)
+            ann_hyp = nat.map_events(events_hyp, self.pmap_d)
 
             # add this to the confusion matrix
             #
@@ -966,6 +1183,27 @@ class NedcOverlap():
     #
     # end of method
 
+    # method: score_roc_sweep
+    #
+    # arguments:
+    #  events_ref: a reference list
+    #  events_hyp: a hypothesis list
+    #  thresholds: the thresholds at which the curve is computed
+    #  key: the class to be scored
+    #
+    # return: a logical value indicating status
+    #
+    # This method computes an roc/det curve for key by thresholding the
+    # confidences of the hypothesis events (see nrt.sweep). Afterwards,
+    # get_roc and get_det return one point per threshold.
+    #
+    def score_roc_sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                        key_a):
+        return nrt.sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                         key_a)
+    #
+    # end of method
+
     # method: compute_performance_roc
     #
     # arguments:
@@ -31,6 +31,8 @@ import sys_tools.nedc_file_tools as nft
 import sys_tools.nedc_ann_tools as nat
 import sys_tools.nedc_text_tools as ntt
 import sys_tools.nedc_display_tools as ndt
+import sys_tools.nedc_pool_tools as npt
+import sys_tools.nedc_roc_tools as nrt
 
 #------------------------------------------------------------------------------
 #
@@ -57,6 +59,7 @@ NEDC_TAES = "NEDC_TAES"
 #  odir: the output directory
 #  rfile: the results file (written in odir)
 #  fp: a pointer to the output summary file
+#  jobs: the number of processes used to score the files
 #
 # return: a logical value indicating status
 #
@@ -65,7 +68,8 @@ NEDC_TAES = "NEDC_TAES"
 #  (2) scoring them
 #  (3) displaying the results
 #
-def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
+def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a,
+        jobs_a = npt.DEF_JOBS):
 
     # define local variables
     #
@@ -86,7 +90,7 @@ def run(reflist_a, hyplist_a, map_a, odir_a, rfile_a, fp_a):
     # run time-aligned scoring
     #
     status = ntaes.init_score(map_a)
-    status = ntaes.score(reflist_a, hyplist_a, map_a, rfile_a)
+    status = ntaes.score(reflist_a, hyplist_a, map_a, rfile_a, jobs_a)
     if status == False:
         print("%s (%s: %s): error during scoring" % \
             (sys.argv[0], __name__, "run"))
@@ -337,87 +341,110 @@ class NedcTAES():
     #  files_hyp: a hypothesis file list
     #  map: a scoring map
     #  rfile: a file that contains per file scoring results
+    #  jobs: the number of processes used to score the files
     #
     # return: a logical value indicating status
     #
     # This method computes a confusion matrix.
     #
-    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a):
-        
+    def score(self, files_ref_a, files_hyp_a, map_a, rfile_a,
+              jobs_a = npt.DEF_JOBS):
+
         # declare local variables
         #
         status = True
 
-        # create the results file
+        # score each file
+        #
+        reports = npt.score_files(self, files_ref_a, files_hyp_a, jobs_a)
+        if reports is None:
+            print("%s (%s: %s): error scoring files" % \
+                (sys.argv[0], __name__, "score"))
+            return False
+
+        # create the results file and write the per file results
         #
         self.rfile_d = nft.make_fp(rfile_a)
+        for report in reports:
+            self.rfile_d.write(report)
 
-        # for each fname
+        # close the file
         #
-        for i, fname in enumerate(files_ref_a):
+        self.rfile_d.close()
 
-            # get the ref events
-            #
-            events_ref = files_ref_a.get(fname, None)
-            if events_ref == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_ref_a[i]))
-                return False
+        # exit gracefully
+        # 
+        return True
+    #
+    # end of method
 
-            # get the hyp events
-            #
-            events_hyp = files_hyp_a.get(fname, None)
-            if events_hyp == None:
-                print("%s (%s: %s): error getting annotations (%s)" % \
-                    (sys.argv[0], __name__, "score", files_hyp_a[i]))
-                return False
+    # method: score_file
+    #
+    # arguments:
+    #  i: the index of the file in the file list
+    #  fname: the file to be scored
+    #  files_ref: a reference file list
+    #  files_hyp: a hypothesis file list
+    #
+    # return: the per file results as a string, or None on error
+    #
+    # This method adds one file to the confusion matrix.
+    #
+    def score_file(self, i_a, fname_a, files_ref_a, files_hyp_a):
 
-            # pudate the total duration
-            #
-            self.total_dur_d += events_ref[-1][1]
+        # declare local variables
+        #
+        report = ""
 
-            # map the annotations before scoring:
-            #  only extract the first label and convert to a pure list
-            #
-            ann_ref = []
-            for event in events_ref:
-                key = next(iter(event[2]))
-                ann_ref.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
-                
-            ann_hyp = []
-            for event in events_hyp:
-                key = next(iter(event[2]))
-                ann_hyp.append([event[0], event[1], \
-                                self.pmap_d[key], event[2][key]])
+        # get the ref events
+        #
+        events_ref = files_ref_a.get(fname_a, None)
+        if events_ref == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # add this to the confusion matrix
-            #
-            refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
-            if refo == None:
-                print("%s (%s: %s): error computing confusion matrix (%s %s)" % \
-                    (sys.argv[0], __name__, "score", \
-                     files_ref_a[i], files_hyp_a[i]))
-                return False
+        # get the hyp events
+        #
+        events_hyp = files_hyp_a.get(fname_a, None)
+        if events_hyp == None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_file", fname_a))
+            return None
 
-            # output the files to the per file results file
-            #
-            self.rfile_d.write("%5d: %s.tse\n" % (i, fname))
-            self.rfile_d.write("%5s  %s.hyp\n" % ("", fname))
-            self.rfile_d.write("  Ref: %s\n" % ' '.join(refo))
-            self.rfile_d.write("  Hyp: %s\n" % ' '.join(hypo))
-            self.rfile_d.write("%6s (Hits: %.4f  Miss: %.4f  False Alarms: %.4f  Total: %.4f)\n" \
-                               % ("", hit, mis, fal, \
-                                  mis + fal))
-            self.rfile_d.write("\n")
+        # pudate the total duration
+        #
+        self.total_dur_d += events_ref[-1][1]
 
-        # close the file
+        # map the annotations before scoring:
+        #  only extract the first label and convert to a pure list
         #
-        self.rfile_d.close()
+        ann_ref = nat.map_events(events_ref, self.pmap_d)
+        ann_hyp = nat.map_events(events_hyp, self.pmap_d)
+
+        # add this to the confusion matrix
+        #
+        refo, hypo, hit, mis, fal = self.compute(ann_ref, ann_hyp)
+        if refo == None:
+            print("%s (%s: %s): error computing confusion matrix (%s %s)" % \
+                (sys.argv[0], __name__, "score_file", \
+                 fname_a, fname_a))
+            return None
+
+        # output the files to the per file results file
+        #
+        report += ("%5d: %s.tse\n" % (i_a, fname_a))
+        report += ("%5s  %s.hyp\n" % ("", fname_a))
+        report += ("  Ref: %s\n" % ' '.join(refo))
+        report += ("  Hyp: %s\n" % ' '.join(hypo))
+        report += ("%6s (Hits: %.4f  Miss: %.4f  False Alarms: %.4f  Total: %.4f)\n" \
+                   % ("", hit, mis, fal, \
+                        mis + fal))
+        report += ("\n")
 
         # exit gracefully
-        # 
-        return True
+        #
+        return report
     #
     # end of method
 
@@ -469,6 +496,17 @@ class NedcTAES():
         for i in range(len(ref_a)):
             rflags.append(True)
 
+        # if both annotations are sorted, find the candidate hyp events
+        # for every ref event in a single pass:
+        #  granges holds the hyp events that overlap in time (get_events)
+        #  aranges holds the hyp events that overlap in whole seconds
+        #  (anyovlp). hyp events outside of aranges contribute nothing.
+        #
+        is_sorted = nat.is_sorted(ref_a) and nat.is_sorted(hyp_a)
+        if is_sorted:
+            granges = nat.sweep_events(ref_a, hyp_a, False)
+            aranges = nat.sweep_events(ref_a, hyp_a, True)
+
         # loop through ref events
         #
         for i in range(len(ref_a)):
@@ -478,16 +516,22 @@ class NedcTAES():
             
             # collect hyp events which are in some overlap with ref event
             #
-            labels, starts, stops \
-                = self.get_events(ref_a[i][0], ref_a[i][1], hyp_a, hflags)
+            if is_sorted:
+                labels = [hyp_a[j][2] for j in range(*granges[i])]
+                candidates = range(*aranges[i])
+            else:
+                labels, starts, stops \
+                    = self.get_events(ref_a[i][0], ref_a[i][1], hyp_a, hflags)
+                candidates = range(len(hyp_a))
 
             # one event at a time, don't bother if ref/hyp labels don't overlap
             #
             if ref_a[i][2] in labels and rflags[i]:
 
-                # loop through all hyp events and calculate partial HMF
+                # loop through the candidate hyp events and calculate
+                # partial HMF
                 #
-                for j in range(len(hyp_a)):
+                for j in candidates:
 
                     # compare hyp and ref event labels and hyp flags status;
                     #
@@ -495,7 +539,8 @@ class NedcTAES():
                     
                         p_hit, p_miss, p_fa \
                             = self.compute_partial(ref_a, hyp_a, i, j, \
-                                                   rflags, hflags, tgt_event)
+                                                   rflags, hflags, tgt_event,
+                                                   is_sorted)
 
                         # updat the HMF confusion matrix
                         #
@@ -568,6 +613,7 @@ class NedcTAES():
     #  refflag_a: reference flags indicating the processed labels
     #  hypflag_a: hypothesis flags indicating the processed labels
     #  tgt_a: label name for which ovlp is detected
+    #  sorted_a: true if the events are sorted by start and stop time
     #
     # return:
     #  p_hit: detected partial hits
@@ -579,7 +625,7 @@ class NedcTAES():
     # stop time.
     #
     def ovlp_ref_seqs(self, ref_a, hyp_a, rind_a, hind_a,
-                          refflag_a, hypflag_a, tgt_a):
+                          refflag_a, hypflag_a, tgt_a, sorted_a = False):
         
         # define variables
         #
@@ -606,6 +652,12 @@ class NedcTAES():
         # look for more ref events overlapping with hyp event
         #
         for i in range(rind_a, len(ref_a)):
+
+            # if the events are sorted, no later ref event can overlap
+            # once one starts after the hyp event
+            #
+            if sorted_a and (int(ref_a[i][0]) > int(hyp_a[hind_a][1])):
+                break
             
             # update misses according to the TAES score definition
             #
@@ -637,6 +689,7 @@ class NedcTAES():
     #  refflag_a: reference flags indicating the processed labels
     #  hypflag_a: hypothesis flags indicating the processed labels
     #  tgt_a: label name for which ovlp is detected
+    #  sorted_a: true if the events are sorted by start and stop time
     #
     # return:
     #  p_hit: detected partial hits
@@ -648,7 +701,7 @@ class NedcTAES():
     # stop time.
     #
     def ovlp_hyp_seqs(self, ref_a, hyp_a, rind_a, hind_a,
-                          refflag_a, hypflag_a, tgt_a):
+                          refflag_a, hypflag_a, tgt_a, sorted_a = False):
         
         # define variables
         #
@@ -675,6 +728,12 @@ class NedcTAES():
         # look for hyp events overlapping with hyp event
         #
         for i in range(hind_a, len(hyp_a)):
+
+            # if the events are sorted, no later hyp event can overlap
+            # once one starts after the ref event
+            #
+            if sorted_a and (int(hyp_a[i][0]) > int(ref_a[rind_a][1])):
+                break
             
             # update HMF according to the TAES score definition
             #
@@ -712,6 +771,7 @@ class NedcTAES():
     #  stop_h: stop time of hyp event
     #  flag: flag that suggests that event has previously used
     #  tstop_prev: previous stop time of a recent class
+    #  sorted: true if the events are sorted by start and stop time
     #
     # return:
     #  hit: calculated fractional number of hits
@@ -724,7 +784,7 @@ class NedcTAES():
     #  of overlap between the two.
     #
     def compute_partial(self, ref_a, hyp_a, rind_a, hind_a, \
-                        rflags_a, hflags_a, tgt_event_a):
+                        rflags_a, hflags_a, tgt_event_a, sorted_a = False):
 
         # check whether current reference event has any overlap
         # with the hyp event
@@ -750,7 +810,8 @@ class NedcTAES():
             #
             p_hit, p_mis, p_fal \
                 = self.ovlp_ref_seqs(ref_a, hyp_a, rind_a, hind_a, 
-                                      rflags_a, hflags_a, tgt_event_a)
+                                      rflags_a, hflags_a, tgt_event_a,
+                                      sorted_a)
 
         # check whether reference event stop time exceed the 
         # detected stop time.
@@ -771,7 +832,8 @@ class NedcTAES():
             #
             p_hit, p_mis, p_fal \
                 = self.ovlp_hyp_seqs(ref_a, hyp_a, rind_a, hind_a,
-                                     rflags_a, hflags_a, tgt_event_a)
+                                     rflags_a, hflags_a, tgt_event_a,
+                                     sorted_a)
 
         # return gracefully
         #
@@ -792,14 +854,17 @@ class NedcTAES():
     # two events passed as an argument and return a boolean
     # value indicating the status.
     #
+    # Each event covers the integer seconds int(start) through
+    # int(stop), inclusive. Two such ranges intersect when the larger
+    # of the first seconds is not after the smaller of the last seconds.
+    # An empty range (stop before start) never intersects.
+    #
     def anyovlp(self, ref_a, hyp_a):
         
-        # create set for the ref/hyp events
+        # compare the integer ranges for the ref/hyp events
         #
-        refset = set(range(int(ref_a[0]), int(ref_a[1]) + 1))
-        hypset = set(range(int(hyp_a[0]), int(hyp_a[1]) + 1))
-            
-        if len(refset.intersection(hypset)) != 0:
+        if max(int(ref_a[0]), int(hyp_a[0])) <= \
+           min(int(ref_a[1]), int(hyp_a[1])):
             return True
 
         # return gracefully
@@ -1315,18 +1380,18 @@ class NedcTAES():
     #
     def score_roc(self, events_ref_a, events_hyp_a):
         
-        # declare local variables
-        #
-        status = True
-        ann = nat.Annotations()
-
         # loop over all event lists (corresponding to files)
         #
-        for ann_ref, ann_hyp in zip(events_ref_a, events_hyp_a):
+        for events_ref, events_hyp in zip(events_ref_a, events_hyp_a):
 
             # update the total duration
             #
-            self.total_dur_d += ann_ref[-1][1]
+            self.total_dur_d += events_ref[-1][1]
+
+            # map the annotations before scoring
+            #
+            ann_ref = nat.map_events(events_ref, self.pmap_d)
+            ann_hyp = nat.map_events(events_hyp, self.pmap_d)
 
             # add this to the confusion matrix
             #
@@ -1342,6 +1407,27 @@ class NedcTAES():
     #
     # end of method
 
+    # method: score_roc_sweep
+    #
+    # arguments:
+    #  events_ref: a reference list
+    #  events_hyp: a hypothesis list
+    #  thresholds: the thresholds at which the curve is computed
+    #  key: the class to be scored
+    #
+    # return: a logical value indicating status
+    #
+    # This method computes an roc/det curve for key by thresholding the
+    # confidences of the hypothesis events (see nrt.sweep). Afterwards,
+    # get_roc and get_det return one point per threshold.
+    #
+    def score_roc_sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                        key_a):
+        return nrt.sweep(self, events_ref_a, events_hyp_a, thresholds_a,
+                         key_a)
+    #
+    # end of method
+
     # method: compute_performance_roc
     #
     # arguments:
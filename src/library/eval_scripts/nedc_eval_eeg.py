@@ -14,16 +14,28 @@
 # 
 # usage:
 #   nedc_eval_eeg -odir output -parameters parameters ref.list hyp.list
+#   nedc_eval_eeg -odir output ref.list hyp1.list hyp2.list ...
 #
 # options:
 #  -parameters: a parameter file 
 #  -odir: the output directory [$PWD/output]
+#  -band: the half-width of the DP alignment band [0 = full grid]
+#  -jobs: the number of processes used to score the files [1]
+#  -parallel: run the four scoring methods concurrently
+#  -cache: a directory used to cache the parsed ref file [none]
+#  -store: a directory used to share the events between processes [none]
 #  -help: display this help message
 #
 # arguments:
 #  ref.list: a list of reference annotations
 #  hyp.list: a list of hypothesis 
 #
+# If more than one hyp list is given (batch mode), the ref list is parsed
+# once and each hyp list is scored into odir/<name>, where name is the
+# path of the list relative to the directory all lists share (e.g.,
+# 0.6/dev_hyp for model/0.6/dev_hyp.txt and model/0.7/dev_hyp.txt). A
+# table comparing the hyp lists is written to odir/comparison.txt.
+#
 # This script implements several standard scoring algorithms:
 #  (1) DP Align: a dynamic programming-based alignment
 #  (2) Epoch-based: measures the time-aligned similarity of two annotations;
@@ -36,6 +48,8 @@
 import os
 import sys
 import time
+import io
+import concurrent.futures as cf
 from collections import OrderedDict
 
 # import NEDC support modules
@@ -43,6 +57,7 @@ from collections import OrderedDict
 import sys_tools.nedc_cmdl_parser as ncp
 import sys_tools.nedc_file_tools as nft
 import sys_tools.nedc_ann_tools as nat
+import sys_tools.nedc_pool_tools as npt
 
 # import NEDC scoring modules
 #
@@ -70,7 +85,8 @@ USAGE_FILE = SCRIPT_LOC + "/help/nedc_eval_eeg.usage"
 #
 DEF_ODIR = os.environ["PWD"] + "/output"
 
-# define the required number of arguments
+# define the minimum number of arguments:
+#  one ref list and one or more hyp lists
 #
 NUM_ARGS = 2
 
@@ -81,6 +97,35 @@ NEDC_DPALIGN_FILE = "summary_dpalign.txt"
 NEDC_EPOCH_FILE = "summary_epoch.txt"
 NEDC_OVLP_FILE = "summary_ovlp.txt"
 NEDC_TAES_FILE = "summary_taes.txt"
+NEDC_COMPARISON_FILE = "comparison.txt"
+
+# define the names of the event stores
+#
+REF_STORE = "ref"
+HYP_STORE = "hyp"
+
+# define the scoring methods in the order they appear in the summary:
+#  each entry holds the progress name, the name used in error messages,
+#  the summary section header and the per file results file
+#
+NEDC_DPALIGN = "dpalign"
+NEDC_EPOCH = "epoch"
+NEDC_OVLP = "ovlp"
+NEDC_TAES = "taes"
+
+SCORING_METHODS = OrderedDict([
+    (NEDC_DPALIGN, ("NEDC DP Alignment", "DP Alignment",
+                    ("NEDC DP Alignment Scoring Summary (v2.0.0):").upper(),
+                    NEDC_DPALIGN_FILE)),
+    (NEDC_EPOCH, ("NEDC Epoch", "EPOCH",
+                  "NEDC Epoch Scoring Summary (v2.0.0):",
+                  NEDC_EPOCH_FILE)),
+    (NEDC_OVLP, ("NEDC Overlap", "OVERLAP",
+                 "NEDC Overlap Scoring Summary (v2.0.0):",
+                 NEDC_OVLP_FILE)),
+    (NEDC_TAES, ("NEDC Time-Aligned Event", "TIME-ALIGNED Event",
+                 "NEDC TAES Scoring Summary (v2.0.0):",
+                 NEDC_TAES_FILE))])
 
 # define formatting constants
 #
@@ -88,12 +133,348 @@ NEDC_EVAL_SEP = "=" * 78
 NEDC_NEW_LINE = "\n"
 NEDC_VERSION = "NEDC Eval EEG (v3.3.1)"
 
+# define the overall metrics shown in the batch mode comparison table
+#
+COMPARISON_METRICS = ["Sensitivity (TPR, Recall)", "F1 Score",
+                      "Total False Alarm Rate"]
+
 # define class definitions
 #
 SEIZ = "SEIZ"
 BCKG = "BCKG"
 CLASSES = [SEIZ, BCKG]
 
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: run_scorer
+#
+# arguments:
+#  method: the scoring method (a key in SCORING_METHODS)
+#  reflist: the reference annotations
+#  hyplist: the hypothesis annotations
+#  map: a scoring map
+#  odir: the output directory
+#  band: the half-width of the DP alignment band
+#  jobs: the number of processes used to score the files
+#  fp: a pointer to the output summary file
+#
+# return: a logical value indicating status
+#
+# This function writes the section header for one scoring method and
+# then runs it.
+#
+def run_scorer(method_a, reflist_a, hyplist_a, map_a, odir_a, band_a,
+               jobs_a, fp_a):
+
+    # write the section header
+    #
+    fp_a.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, SCORING_METHODS[method_a][2]))
+    fname = nft.make_fname(odir_a, SCORING_METHODS[method_a][3])
+
+    # run the scoring method
+    #
+    if method_a == NEDC_DPALIGN:
+        return ndpalign.run(reflist_a, hyplist_a, map_a, odir_a, fname,
+                            fp_a, band_a, jobs_a)
+    elif method_a == NEDC_EPOCH:
+        return nepoch.run(reflist_a, hyplist_a, map_a, odir_a, fname,
+                          fp_a, jobs_a)
+    elif method_a == NEDC_OVLP:
+        return novlp.run(reflist_a, hyplist_a, map_a, odir_a, fname,
+                         fp_a, jobs_a)
+    elif method_a == NEDC_TAES:
+        return ntaes.run(reflist_a, hyplist_a, map_a, odir_a, fname,
+                         fp_a, jobs_a)
+
+    # exit ungracefully: unknown method
+    #
+    print("%s (%s: %s): unknown scoring method (%s)" % \
+        (sys.argv[0], __name__, "run_scorer", method_a))
+    return False
+#
+# end of function
+
+# function: score_section
+#
+# arguments:
+#  method: the scoring method (a key in SCORING_METHODS)
+#  reflist: the reference annotations
+#  hyplist: the hypothesis annotations
+#  map: a scoring map
+#  odir: the output directory
+#  band: the half-width of the DP alignment band
+#  jobs: the number of processes used to score the files
+#
+# return: the summary section as a string, or None on error
+#
+# This function runs one scoring method in a worker process. The summary
+# section is returned as text so that the parent can write the sections
+# in the canonical order.
+#
+def score_section(method_a, reflist_a, hyplist_a, map_a, odir_a, band_a,
+                  jobs_a):
+
+    # run the scoring method into a buffer
+    #
+    fp = io.StringIO()
+    if run_scorer(method_a, reflist_a, hyplist_a, map_a, odir_a, band_a,
+                  jobs_a, fp) == False:
+        return None
+
+    # exit gracefully
+    #
+    return fp.getvalue()
+#
+# end of function
+
+# function: score_hyp
+#
+# arguments:
+#  fname_ref: the name of the ref file list
+#  fname_hyp: the name of the hyp file list
+#  reflist: the normalized reference annotations
+#  dur_dict: the duration of each file
+#  map: a scoring map
+#  pmap: the permuted scoring map
+#  odir: the output directory
+#  band: the half-width of the DP alignment band
+#  jobs: the number of processes used to score the files
+#  parallel: run the four scoring methods concurrently
+#  store: the event store directory for the hyp events (None = none)
+#
+# return: the summary sections of the scoring methods (in the canonical
+#         order), or None on error
+#
+# This function scores one hyp file list and writes the summary file and
+# the per file results to the output directory.
+#
+def score_hyp(fname_ref_a, fname_hyp_a, reflist_a, dur_dict_a, map_a,
+              pmap_a, odir_a, band_a, jobs_a, parallel_a, store_a):
+
+    # parse the hyp file list:
+    #  each recording is converted to a compact form as it is read
+    #
+    hyplist, num_resorted = nat.load_hyp(fname_hyp_a, dur_dict_a, pmap_a)
+    print(" ... re-sorted events in %d hyp recordings ..." % num_resorted)
+
+    # check for mismatched file lists:
+    #  note that we do this here so it is done only once, rather than
+    #  in each scoring method
+    #
+    if hyplist == None:
+        print("%s (%s: %s): error loading filelists (ref: %s) and (hyp: %s)" \
+            % (sys.argv[0], __name__, "score_hyp", fname_ref_a, fname_hyp_a))
+        return None
+    elif len(reflist_a) != len(hyplist):
+        print("%s (%s: %s): (ref: %d) and (hyp: %d) have different lengths" \
+            % (sys.argv[0], __name__, "score_hyp", len(reflist_a),
+               len(hyplist)))
+        return None
+
+    # move the events to an event store if requested
+    #
+    if store_a is not None:
+        if nat.write_store(store_a, hyplist) == False:
+            print("%s (%s: %s): error writing event store (%s)" % \
+                (sys.argv[0], __name__, "score_hyp", store_a))
+            return None
+        hyplist = nat.open_store(store_a)[0]
+
+    # create the output directory and the output summary file
+    #               
+    print(" ... creating the output directory ...")
+    if nft.make_dir(odir_a) == False:
+        print("%s (%s: %s): error creating output directory (%s)" \
+            % (sys.argv[0], __name__, "score_hyp", odir_a))
+        return None
+
+    fname = nft.make_fname(odir_a, NEDC_SUMMARY_FILE)
+    fp = nft.make_fp(fname)
+
+    # print the header of the summary file showing the relevant information
+    #
+    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, NEDC_VERSION))
+    fp.write(" File: %s\n" % fname) 
+    fp.write(" Date: %s\n\n" % time.strftime("%c"))
+    fp.write(" Data:\n")
+    fp.write("  Ref: %s\n" % fname_ref_a)
+    fp.write("  Hyp: %s\n\n" % fname_hyp_a)
+
+    # execute the scoring methods:
+    #  each method writes its summary section to a buffer, and the
+    #  sections are written to the summary file in the canonical order.
+    #  when running in parallel, the methods run in separate processes.
+    #
+    args = [(method, reflist_a, hyplist, map_a, odir_a, band_a, jobs_a) \
+            for method in SCORING_METHODS]
+    if parallel_a == True:
+        for method in SCORING_METHODS:
+            print(" ... executing %s scoring ..." % \
+                  SCORING_METHODS[method][0])
+        with cf.ProcessPoolExecutor(len(SCORING_METHODS)) as pool:
+            futures = [pool.submit(score_section, *arg) for arg in args]
+            sections = [future.result() for future in futures]
+    else:
+        sections = []
+        for method, arg in zip(SCORING_METHODS, args):
+            print(" ... executing %s scoring ..." % \
+                  SCORING_METHODS[method][0])
+            sections.append(score_section(*arg))
+            if sections[-1] == None:
+                break
+
+    for method, section in zip(SCORING_METHODS, sections):
+        if section == None:
+            print("%s (%s: %s): error in %s scoring" % \
+                (sys.argv[0], __name__, "score_hyp",
+                 SCORING_METHODS[method][1]))
+            fp.close()
+            return None
+        fp.write(section)
+
+    # print the final message to the summary file, close it and exit
+    #
+    print(" ... done ...")
+    fp.write("%s\nNEDC EEG Eval Successfully Completed on %s\n%s\n" \
+             % (NEDC_EVAL_SEP, time.strftime("%c"), NEDC_EVAL_SEP))
+    fp.close()
+
+    # exit gracefully
+    #
+    return sections
+#
+# end of function
+
+# function: batch_names
+#
+# arguments:
+#  fnames: a list of hyp file lists
+#
+# return: a list of unique names
+#
+# This function names each hyp list by its path (without its extension)
+# relative to the longest directory that all of the lists share. Lists
+# that differ only in their directory, such as the per threshold lists
+# written by prepare_seiz_hypothesis.m, are named after that directory.
+# Repeated names (e.g., the same list given twice) get a suffix.
+#
+def batch_names(fnames_a):
+
+    # find the directory shared by all lists
+    #
+    paths = [os.path.splitext(os.path.abspath(fname))[0] \
+             for fname in fnames_a]
+    common = os.path.commonpath([os.path.dirname(path) for path in paths])
+
+    # name each hyp list
+    #
+    names = []
+    for i, path in enumerate(paths):
+        name = os.path.relpath(path, common)
+        if name in names:
+            name = "%s_%d" % (name, i)
+        names.append(name)
+
+    # exit gracefully
+    #
+    return names
+#
+# end of function
+
+# function: summary_metrics
+#
+# arguments:
+#  section: the summary section of a scoring method
+#
+# return: the values of COMPARISON_METRICS (as formatted in the summary)
+#
+# This function pulls the overall metrics out of the "SUMMARY:" block of
+# a scoring method's summary section.
+#
+def summary_metrics(section_a):
+
+    # declare local variables
+    #
+    values = OrderedDict((metric, "-") for metric in COMPARISON_METRICS)
+    in_summary = False
+
+    # loop over the lines of the summary block
+    #
+    for line in section_a.splitlines():
+        if line.strip() == "SUMMARY:":
+            in_summary = True
+        elif in_summary and ":" in line:
+            metric, value = line.split(":", 1)
+            if metric.strip() in values:
+                values[metric.strip()] = value.strip()
+
+    # exit gracefully
+    #
+    return values
+#
+# end of function
+
+# function: write_comparison
+#
+# arguments:
+#  fname: the name of the comparison file
+#  fname_ref: the name of the ref file list
+#  results: the summary sections of each hyp list, by name
+#
+# return: a logical value indicating status
+#
+# This function writes a table that compares the overall metrics of the
+# hyp lists for each scoring method.
+#
+def write_comparison(fname_a, fname_ref_a, results_a):
+
+    # open the comparison file
+    #
+    fp = nft.make_fp(fname_a)
+    if fp == None:
+        print("%s (%s: %s): error opening comparison file (%s)" % \
+            (sys.argv[0], __name__, "write_comparison", fname_a))
+        return False
+
+    # print the header
+    #
+    width = max([len(name) for name in results_a] + [len("Hyp")])
+    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, NEDC_VERSION))
+    fp.write(" Date: %s\n\n" % time.strftime("%c"))
+    fp.write(" Data:\n")
+    fp.write("  Ref: %s\n\n" % fname_ref_a)
+
+    # print a table for each scoring method
+    #
+    for i, method in enumerate(SCORING_METHODS):
+        fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, SCORING_METHODS[method][2]))
+        fp.write(" %-*s" % (width, "Hyp"))
+        for metric in COMPARISON_METRICS:
+            fp.write("  %28s" % metric)
+        fp.write("\n")
+        for name in results_a:
+            values = summary_metrics(results_a[name][i])
+            fp.write(" %-*s" % (width, name))
+            for metric in COMPARISON_METRICS:
+                fp.write("  %28s" % values[metric])
+            fp.write("\n")
+        fp.write("\n")
+
+    # close the file
+    #
+    fp.write("%s\n" % NEDC_EVAL_SEP)
+    fp.close()
+
+    # exit gracefully
+    #
+    return True
+#
+# end of function
+
 #------------------------------------------------------------------------------
 #
 # the main program starts here
@@ -116,6 +497,11 @@ def main(argv):
     # declare default values for command line arguments
     #
     odir = DEF_ODIR
+    band = ndpalign.DPALIGN_BAND
+    jobs = npt.DEF_JOBS
+    parallel = False
+    cache = None
+    store = None
 
     # create a command line parser
     #
@@ -125,6 +511,11 @@ def main(argv):
     #
     parser.add_argument("args",  type = str, nargs='*')
     parser.add_argument("-odir", type = str)
+    parser.add_argument("-band", type = int)
+    parser.add_argument("-jobs", type = int)
+    parser.add_argument("-parallel", action = "store_true")
+    parser.add_argument("-cache", type = str)
+    parser.add_argument("-store", type = str)
     parser.add_argument("-help", action="help")
     
     # parse the command line
@@ -133,7 +524,7 @@ def main(argv):
 
     # check if the proper number of lists has been provided
     #
-    if len(args.args) != NUM_ARGS:
+    if len(args.args) < NUM_ARGS:
         parser.print_usage()
         exit(-1)
 
@@ -144,27 +535,45 @@ def main(argv):
     if args.odir is not None:
         odir = args.odir
 
-    # set the input lists
+    # set the dp alignment band
     #
-    fname_ref = args.args[0]
-    fname_hyp = args.args[1]
+    if args.band is not None:
+        band = args.band
 
-    # parse the ref and hyp file lists
+    # set the number of scoring processes
     #
-    reflist, dur_dict = nat.parse_file(fname_ref)
-    hyplist = nat.parse_file(fname_hyp, dur_dict)
+    if args.jobs is not None:
+        jobs = args.jobs
 
-    # check for mismatched file lists:
-    #  note that we do this here so it is done only once, rather than
-    #  in each scoring method
+    # run the scoring methods concurrently
     #
-    if (reflist == None) or (hyplist == None):
-        print("%s (%s: %s): error loading filelists (ref: %s) and (hyp: %s)" \
-            % (sys.argv[0], __name__, "main", fname_ref, fname_hyp))
-        exit (-1)
-    elif len(reflist) != len(hyplist):
-        print("%s (%s: %s): (ref: %d) and (hyp: %d) have different lengths" \
-            % (sys.argv[0], __name__, "main", len(reflist), len(hyplist)))
+    if args.parallel == True:
+        parallel = True
+
+    # set the ref cache directory
+    #
+    if args.cache is not None:
+        cache = args.cache
+
+    # set the event store directory
+    #
+    if args.store is not None:
+        store = args.store
+
+    # set the input lists:
+    #  more than one hyp list selects batch mode
+    #
+    fname_ref = args.args[0]
+    fnames_hyp = args.args[1:]
+
+    # parse the ref file list:
+    #  the ref file is loaded column-wise, and cached if requested
+    #
+    reflist, dur_dict, num_resorted = nat.load_ref(fname_ref, cache)
+    print(" ... re-sorted events in %d ref recordings ..." % num_resorted)
+    if reflist == None:
+        print("%s (%s: %s): error loading filelist (ref: %s)" \
+            % (sys.argv[0], __name__, "main", fname_ref))
         exit (-1)
 
     # load the scoring map
@@ -182,84 +591,55 @@ def main(argv):
         print(tmpmap)
         exit (-1)
 
-    # create the output directory and the output summary file
-    #               
-    print(" ... creating the output directory ...")
-    if nft.make_dir(odir) == False:
-        print("%s (%s: %s): error creating output directory (%s)" \
-            % (sys.argv[0], __name__, "main", odir))
-        exit (-1)
-
-    fname = nft.make_fname(odir, NEDC_SUMMARY_FILE)
-    fp = nft.make_fp(fname)
-
-    # print the header of the summary file showing the relevant information
+    # convert the ref events to a compact form:
+    #  this is done once here, rather than in each scoring method,
+    #  and is shared by all hyp lists
     #
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, NEDC_VERSION))
-    fp.write(" File: %s\n" % fname) 
-    fp.write(" Date: %s\n\n" % time.strftime("%c"))
-    fp.write(" Data:\n")
-    fp.write("  Ref: %s\n" % fname_ref)
-    fp.write("  Hyp: %s\n\n" % fname_hyp)
-
-    # execute dp alignment scoring
-    #
-    print(" ... executing NEDC DP Alignment scoring ...")
-    fp.write("%s\n%s\n\n" % \
-             (NEDC_EVAL_SEP, \
-              ("NEDC DP Alignment Scoring Summary (v2.0.0):").upper()))
-    fname = nft.make_fname(odir, NEDC_DPALIGN_FILE)
-    status = ndpalign.run(reflist, hyplist, scmap, odir, fname, fp)
-    if status == False:
-        print("%s (%s: %s): error in DP Alignment scoring" % \
-            (sys.argv[0], __name__, "main"))
-        exit (-1)
-    
-    # execute NEDC epoch-based scoring
-    #
-    print(" ... executing NEDC Epoch scoring ...")
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, \
-                             "NEDC Epoch Scoring Summary (v2.0.0):"))
-    fname = nft.make_fname(odir, NEDC_EPOCH_FILE)
-    status = nepoch.run(reflist, hyplist, scmap, odir, fname, fp)
-    if status == False:
-        print("%s (%s: %s): error in EPOCH scoring" % \
-            (sys.argv[0], __name__, "main"))
-        exit (-1)
-    
-    # execute overlap scoring
-    #
-    print(" ... executing NEDC Overlap scoring ...")
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, \
-                             "NEDC Overlap Scoring Summary (v2.0.0):"))
-    fname = nft.make_fname(odir, NEDC_OVLP_FILE)
-    status = novlp.run(reflist, hyplist, scmap, odir, fname, fp)
-    if status == False:
-        print("%s (%s: %s): error in OVERLAP scoring" % \
-            (sys.argv[0], __name__, "main"))
-        exit (-1)
-        
-    # execute time-aligned event scoring
-    #
-    print(" ... executing NEDC Time-Aligned Event scoring ...")
-    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, \
-                             "NEDC TAES Scoring Summary (v2.0.0):"))
-    fname = nft.make_fname(odir, NEDC_TAES_FILE)
-    status = ntaes.run(reflist, hyplist, scmap, odir, fname, fp)
-    if status == False:
-        print("%s (%s: %s): error in TIME-ALIGNED Event scoring" % \
-            (sys.argv[0], __name__, "main"))
-        exit (-1)
+    pmap = nft.permute_map(scmap)
+    reflist = nat.normalize(reflist, pmap)
 
-    # print the final message to the summary file, close it and exit
+    # move the ref events to a memory mapped event store:
+    #  worker processes then map the store rather than receiving
+    #  a copy of the events
     #
-    print(" ... done ...")
-    fp.write("%s\nNEDC EEG Eval Successfully Completed on %s\n%s\n" \
-             % (NEDC_EVAL_SEP, time.strftime("%c"), NEDC_EVAL_SEP))
-    
-    # close the output file
+    if store is not None:
+        if nat.write_store(os.path.join(store, REF_STORE), reflist) == False:
+            print("%s (%s: %s): error writing event store (%s)" % \
+                (sys.argv[0], __name__, "main", store))
+            exit (-1)
+        reflist, dur_dict = nat.open_store(os.path.join(store, REF_STORE))
+
+    # score a single hyp list into the output directory
     #
-    fp.close()
+    if len(fnames_hyp) == 1:
+        hyp_store = None if store is None else \
+            os.path.join(store, HYP_STORE)
+        sections = score_hyp(fname_ref, fnames_hyp[0], reflist, dur_dict,
+                             scmap, pmap, odir, band, jobs, parallel,
+                             hyp_store)
+        if sections == None:
+            exit (-1)
+
+    # batch mode: score each hyp list into its own subdirectory and
+    # compare the hyp lists
+    #
+    else:
+        names = batch_names(fnames_hyp)
+        results = OrderedDict()
+        for name, fname_hyp in zip(names, fnames_hyp):
+            print(" ... scoring %s ..." % fname_hyp)
+            hyp_store = None if store is None else \
+                os.path.join(store, HYP_STORE, name)
+            sections = score_hyp(fname_ref, fname_hyp, reflist, dur_dict,
+                                 scmap, pmap, os.path.join(odir, name),
+                                 band, jobs, parallel, hyp_store)
+            if sections == None:
+                exit (-1)
+            results[name] = sections
+
+        fname = nft.make_fname(odir, NEDC_COMPARISON_FILE)
+        if write_comparison(fname, fname_ref, results) == False:
+            exit (-1)
 
     # end of main
     #
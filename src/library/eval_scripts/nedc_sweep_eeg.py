@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+#
+# file: $(NEDC_NFC)/util/python/nedc_eval_eeg/nedc_sweep_eeg.py
+#
+# usage:
+#   nedc_sweep_eeg -odir output ref.list trans.list
+#
+# options:
+#  -odir: the output directory [$PWD/output]
+#  -frame_dur: the duration of a frame in secs [0.15]
+#  -thresholds: the number of thresholds in [0, 1] [201]
+#  -help: display this help message
+#
+# arguments:
+#  ref.list: a list of reference annotations
+#  trans.list: a list of TDNN transcriptions (*_tdnn_trans.mat), or a
+#              directory that is searched for them
+#
+# This script computes an epoch-based ROC/DET curve directly from the
+# frame-level seizure probabilities written by
+# transcribe_using_multi_channel_tdnn.py. Rather than thresholding the
+# probabilities into a hyp file and scoring it once per threshold, every
+# threshold is scored in a single pass (see NedcEpoch.score_sweep).
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import os
+import sys
+import time
+from collections import OrderedDict
+
+# import required numerical modules
+#
+import numpy as np
+import scipy.io as sio
+
+# import NEDC support modules
+#
+import sys_tools.nedc_cmdl_parser as ncp
+import sys_tools.nedc_file_tools as nft
+import sys_tools.nedc_ann_tools as nat
+
+# import NEDC scoring modules
+#
+import eval_tools.nedc_eval_epoch as nepoch
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define script location
+#
+SCRIPT_LOC = os.path.dirname(os.path.realpath(__file__))
+
+# define the help file and usage message
+#
+HELP_FILE = SCRIPT_LOC + "/help/nedc_sweep_eeg.help"
+USAGE_FILE = SCRIPT_LOC + "/help/nedc_sweep_eeg.usage"
+
+# define default values for arguments:
+#  the frame duration is (win_size - overlap) / 1000 in configuration.m
+#
+DEF_ODIR = os.environ["PWD"] + "/output"
+DEF_FRAME_DUR = float(0.15)
+DEF_NUM_THRESHOLDS = int(201)
+
+# define the required number of arguments
+#
+NUM_ARGS = 2
+
+# define the transcription files and the variable that holds the
+# probabilities (one row per split configuration, one column per frame)
+#
+TRANS_EXT = "_tdnn_trans.mat"
+TRANS_VAR = "result"
+
+# define the name of the output file
+#
+NEDC_SWEEP_FILE = "sweep_epoch.txt"
+
+# define formatting constants
+#
+NEDC_EVAL_SEP = "=" * 78
+NEDC_VERSION = "NEDC Sweep EEG (v1.0.0)"
+
+# define class definitions
+#
+SEIZ = "SEIZ"
+BCKG = "BCKG"
+CLASSES = [SEIZ, BCKG]
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: find_trans
+#
+# arguments:
+#  fname: a list of transcription files, or a directory
+#
+# return: a list of transcription files
+#
+def find_trans(fname_a):
+
+    # search a directory
+    #
+    if os.path.isdir(fname_a):
+        fnames = []
+        for root, dirs, files in os.walk(fname_a):
+            for name in sorted(files):
+                if name.endswith(TRANS_EXT):
+                    fnames.append(os.path.join(root, name))
+        return sorted(fnames)
+
+    # read a list
+    #
+    with open(fname_a, 'r') as fp:
+        return [line.strip() for line in fp if line.strip()]
+#
+# end of function
+
+# function: load_scores
+#
+# arguments:
+#  fnames: a list of transcription files
+#
+# return: a dictionary mapping of files and frame scores
+#
+# This function loads each transcription and averages the probabilities
+# of the split configurations, as prepare_seiz_hypothesis.m does. The
+# file name is the first three fields of the transcription name
+# (e.g., 00000258_s002_t000).
+#
+def load_scores(fnames_a):
+
+    # loop over all transcriptions
+    #
+    scores = OrderedDict()
+    for fname in fnames_a:
+        name = os.path.basename(fname).split('.')[0]
+        name = '_'.join(name.split('_')[:3])
+        result = np.atleast_2d(sio.loadmat(fname)[TRANS_VAR])
+        scores[name] = result.mean(axis = 0)
+
+    # exit gracefully
+    #
+    return scores
+#
+# end of function
+
+#------------------------------------------------------------------------------
+#
+# the main program starts here
+#
+#------------------------------------------------------------------------------
+
+# method: main
+#
+# arguments: none
+#
+# return: none
+#
+# This function is the main program.
+#
+def main(argv):
+
+    # declare default values for command line arguments
+    #
+    odir = DEF_ODIR
+    frame_dur = DEF_FRAME_DUR
+    num_thresholds = DEF_NUM_THRESHOLDS
+
+    # create a command line parser
+    #
+    parser = ncp.CommandLineParser(USAGE_FILE, HELP_FILE)
+
+    # define the command line arguments
+    #
+    parser.add_argument("args",  type = str, nargs='*')
+    parser.add_argument("-odir", type = str)
+    parser.add_argument("-frame_dur", type = float)
+    parser.add_argument("-thresholds", type = int)
+    parser.add_argument("-help", action="help")
+
+    # parse the command line
+    #
+    args = parser.parse_args()
+
+    # check if the proper number of lists has been provided
+    #
+    if len(args.args) != NUM_ARGS:
+        parser.print_usage()
+        exit(-1)
+
+    # set option and argument values
+    #
+    if args.odir is not None:
+        odir = args.odir
+    if args.frame_dur is not None:
+        frame_dur = args.frame_dur
+    if args.thresholds is not None:
+        num_thresholds = args.thresholds
+    fname_ref = args.args[0]
+    fname_trans = args.args[1]
+
+    # load the scoring map
+    #
+    tmpmap = OrderedDict()
+    for class_a in CLASSES:
+        tmpmap[class_a] = class_a
+
+    scmap = nft.generate_map(tmpmap)
+    if (scmap == None):
+        print("%s (%s: %s): error converting the map" % \
+            (sys.argv[0], __name__, "main"))
+        exit (-1)
+    pmap = nft.permute_map(scmap)
+
+    # load the ref file list and the frame scores
+    #
+    print(" ... loading the reference and the transcriptions ...")
+    reflist, dur_dict, num_resorted = nat.load_ref(fname_ref)
+    reflist = nat.normalize(reflist, pmap)
+    scores = load_scores(find_trans(fname_trans))
+
+    # compute the curve
+    #
+    print(" ... executing NEDC Epoch threshold sweep ...")
+    key = pmap[nat.DEF_CLASS]
+    thresholds = np.linspace(0.0, 1.0, num_thresholds)
+    scorer = nepoch.run_sweep(reflist, scores, scmap, frame_dur,
+                              thresholds, key)
+    if scorer == None:
+        print("%s (%s: %s): error in EPOCH threshold sweep" % \
+            (sys.argv[0], __name__, "main"))
+        exit (-1)
+    fpr, tpr = scorer.get_roc(key)
+    fpr, fnr = scorer.get_det(key)
+
+    # create the output directory and write the curve
+    #
+    if nft.make_dir(odir) == False:
+        print("%s (%s: %s): error creating output directory (%s)" \
+            % (sys.argv[0], __name__, "main", odir))
+        exit (-1)
+
+    fname = nft.make_fname(odir, NEDC_SWEEP_FILE)
+    fp = nft.make_fp(fname)
+    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP, NEDC_VERSION))
+    fp.write(" File: %s\n" % fname)
+    fp.write(" Date: %s\n\n" % time.strftime("%c"))
+    fp.write(" Data:\n")
+    fp.write("  Ref: %s\n" % fname_ref)
+    fp.write("  Trans: %s (%d files)\n\n" % (fname_trans, len(scores)))
+    fp.write("%s\n%s\n\n" % (NEDC_EVAL_SEP,
+                             "NEDC Epoch Threshold Sweep (%s):" % key))
+    fp.write(" %10s %12s %12s %12s\n" % ("Threshold", "TPR", "FPR", "FNR"))
+    for i in range(len(thresholds)):
+        fp.write(" %10.4f %12.4f %12.4f %12.4f\n" % \
+                 (thresholds[i], tpr[i], fpr[i], fnr[i]))
+    fp.write("%s\n" % NEDC_EVAL_SEP)
+    fp.close()
+    print(" ... done ...")
+
+    # end of main
+    #
+    exit(1)
+
+#
+# end of main
+
+# begin gracefully
+#
+if __name__ == "__main__":
+    main(sys.argv[0:])
+
+#
+# end of file
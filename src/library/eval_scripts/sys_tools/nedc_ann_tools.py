@@ -16,7 +16,10 @@
 #
 import os
 import sys
+import hashlib
+import zipfile
 from collections import OrderedDict
+import numpy as np
 
 # import required NEDC modules
 #
@@ -38,30 +41,371 @@ LAST_EVENT_INDEX = -1
 START_TIME_INDEX = 0
 STOP_TIME_INDEX = 1
 
+# define the type used to store class codes in an event list
+#
+CODE_TYPE = np.int8
+
+# define the number of characters read at a time when streaming a file,
+# and the minimum number of tokens on a valid ref/hyp line
+#
+BLOCK_SIZE = int(1048576)
+MIN_REF_TOKENS = int(4)
+MIN_HYP_TOKENS = int(3)
+
+# define the cache file naming and the columns stored for a ref file
+#
+CACHE_PREFIX = "nedc_ref_"
+CACHE_EXT = ".npz"
+REF_COLUMNS = ["fnames", "bounds", "starts", "stops", "codes", "confs",
+               "labels"]
+
+# define the file extension of the columns in an event store, and the
+# columns that are memory mapped
+#
+STORE_EXT = ".npy"
+STORE_MAPPED = ["bounds", "starts", "stops", "codes", "confs"]
+
+# keep track of the event stores opened by this process
+#
+STORES = {}
+
+#------------------------------------------------------------------------------
+#
+# classes are listed here:
+#
+#------------------------------------------------------------------------------
+
+# class: EventList
+#
+# This class holds the events of one file in a compact form: parallel
+# arrays of start times, stop times, class codes and confidences. The
+# codes index a list of mapped labels that is shared by all files. It is
+# built once per file (see normalize) and passed to every scoring method
+# in place of the list of [start, stop, OrderedDict({lbl: conf})] events.
+#
+class EventList():
+
+    # method: constructor
+    #
+    # arguments:
+    #  starts: an array of start times
+    #  stops: an array of stop times
+    #  codes: an array of class codes
+    #  confs: an array of confidences
+    #  labels: the list of mapped labels indexed by the class codes
+    #  store: (store directory, first event, last event + 1) if the
+    #         arrays are slices of an event store (see open_store)
+    #
+    # return: none
+    #
+    def __init__(self, starts_a, stops_a, codes_a, confs_a, labels_a,
+                 store_a = None):
+
+        # declare class data
+        #
+        self.starts_d = starts_a
+        self.stops_d = stops_a
+        self.codes_d = codes_a
+        self.confs_d = confs_a
+        self.labels_d = labels_a
+        self.store_d = store_a
+        self.events_d = None
+
+        # exit gracefully
+        #
+    #
+    # end of method
+
+    # method: __len__
+    #
+    # arguments: none
+    #
+    # return: the number of events
+    #
+    def __len__(self):
+        return len(self.starts_d)
+    #
+    # end of method
+
+    # method: __getitem__
+    #
+    # arguments:
+    #  index: the index of an event
+    #
+    # return: the event as [start, stop, label, conf]
+    #
+    def __getitem__(self, index_a):
+        return self.to_list()[index_a]
+    #
+    # end of method
+
+    # method: __getstate__
+    #
+    # arguments: none
+    #
+    # return: the state used to pickle this object
+    #
+    # The list built by to_list is not pickled; it is rebuilt on demand.
+    # An EventList read from an event store is pickled as a reference to
+    # the store, so other processes map the same files instead of
+    # receiving a copy of the events.
+    #
+    def __getstate__(self):
+        if self.store_d is not None:
+            return {"store_d": self.store_d}
+        state = self.__dict__.copy()
+        state["events_d"] = None
+        return state
+    #
+    # end of method
+
+    # method: __setstate__
+    #
+    # arguments:
+    #  state: the state returned by __getstate__
+    #
+    # return: none
+    #
+    def __setstate__(self, state_a):
+
+        # an ordinary EventList
+        #
+        if state_a.get("store_d", None) is None:
+            self.__dict__.update(state_a)
+            return
+
+        # slice the arrays of the event store
+        #
+        dname, lo, hi = state_a["store_d"]
+        columns, labels = load_store(dname)
+        self.__init__(columns["starts"][lo:hi], columns["stops"][lo:hi],
+                      columns["codes"][lo:hi], columns["confs"][lo:hi],
+                      labels, state_a["store_d"])
+    #
+    # end of method
+
+    # method: to_list
+    #
+    # arguments: none
+    #
+    # return: the events as a list of [start, stop, label, conf]
+    #
+    # This method returns the events in the form the scoring methods
+    # use. The list is built once and shared, so callers must not
+    # modify it.
+    #
+    def to_list(self):
+
+        # build the list the first time it is needed
+        #
+        if self.events_d is None:
+            self.events_d = [[start, stop, self.labels_d[code], conf] \
+                             for start, stop, code, conf in \
+                             zip(self.starts_d.tolist(),
+                                 self.stops_d.tolist(),
+                                 self.codes_d.tolist(),
+                                 self.confs_d.tolist())]
+
+        # exit gracefully
+        #
+        return self.events_d
+    #
+    # end of method
+#
+# end of class
+
 #------------------------------------------------------------------------------
 #
 # functions are listed here:
 #
 #------------------------------------------------------------------------------
 
+# function: map_codes
+#
+# arguments:
+#  pmap: a permuted map (see nft.permute_map)
+#
+# return: the list of mapped labels, and the code of each raw label
+#
+def map_codes(pmap):
+
+    # build the list of mapped labels and their codes
+    #
+    labels = []
+    for key in pmap:
+        if pmap[key] not in labels:
+            labels.append(pmap[key])
+    codes = {key: labels.index(pmap[key]) for key in pmap}
+
+    # sanity check
+    #
+    if len(labels) > np.iinfo(CODE_TYPE).max:
+        raise ValueError("[%s]: too many classes (%d)" % \
+                         (sys.argv[0], len(labels)))
+
+    # exit gracefully
+    #
+    return labels, codes
+#
+# end of function
+
+# function: make_event_list
+#
+# arguments:
+#  events: the events of one file from parse_file
+#  labels: the list of mapped labels (see map_codes)
+#  codes: the code of each raw label (see map_codes)
+#
+# return: an EventList
+#
+# This function keeps the first label of each event and maps it.
+#
+def make_event_list(events, labels, codes):
+
+    # collect the start/stop times, codes and confidences
+    #
+    num_events = len(events)
+    starts = np.empty(num_events, dtype = np.float64)
+    stops = np.empty(num_events, dtype = np.float64)
+    ecodes = np.empty(num_events, dtype = CODE_TYPE)
+    confs = np.empty(num_events, dtype = np.float64)
+    for i, event in enumerate(events):
+        key = next(iter(event[2]))
+        starts[i] = event[START_TIME_INDEX]
+        stops[i] = event[STOP_TIME_INDEX]
+        ecodes[i] = codes[key]
+        confs[i] = event[2][key]
+
+    # exit gracefully
+    #
+    return EventList(starts, stops, ecodes, confs, labels)
+#
+# end of function
+
+# function: normalize
+#
+# arguments:
+#  odict: dictionary mapping of files and events
+#  pmap: a permuted map (see nft.permute_map)
+#
+# return: a dictionary mapping of files and EventLists
+#
+# This function converts the events returned by parse_file (or load_ref)
+# to EventLists in a single pass. Only the first label of each event is
+# kept, and it is mapped using pmap.
+#
+def normalize(odict, pmap):
+
+    # build the list of mapped labels and their codes
+    #
+    labels, codes = map_codes(pmap)
+    tables = {}
+
+    # for each file
+    #
+    ndict = OrderedDict()
+    for fname in odict:
+
+        # an EventList from load_ref only needs its codes mapped:
+        #  its labels are the raw labels, so a lookup table converts
+        #  raw codes to mapped codes
+        #
+        events = odict[fname]
+        if isinstance(events, EventList):
+            if id(events.labels_d) not in tables:
+                tables[id(events.labels_d)] = \
+                    np.array([codes[key] for key in events.labels_d],
+                             dtype = CODE_TYPE)
+            table = tables[id(events.labels_d)]
+            ndict[fname] = EventList(events.starts_d, events.stops_d,
+                                     table[events.codes_d], events.confs_d,
+                                     labels)
+            continue
+
+        # convert a list of parsed events
+        #
+        ndict[fname] = make_event_list(events, labels, codes)
+
+    # exit gracefully
+    #
+    return ndict
+#
+# end of function
+
+# function: map_events
+#
+# arguments:
+#  events: a list of events from parse_file, an EventList, or a list
+#          that has already been mapped
+#  pmap: a permuted map (see nft.permute_map)
+#
+# return: the events as a list of [start, stop, label, conf]
+#
+# This function converts the events of one file to the form the scoring
+# methods use. Only the first label of each event is kept. EventLists are
+# already mapped, so their shared list is returned. A list whose labels
+# are already strings is returned as is.
+#
+def map_events(events, pmap):
+
+    # an EventList has already been mapped
+    #
+    if isinstance(events, EventList):
+        return events.to_list()
+    if len(events) > 0 and isinstance(events[0][2], str):
+        return events
+
+    # map each event
+    #
+    ann = []
+    for event in events:
+        key = next(iter(event[2]))
+        ann.append([event[0], event[1], pmap[key], event[2][key]])
+
+    # exit gracefully
+    #
+    return ann
+#
+# end of function
+
 # function: sort_dict
 #
 # arguments:
 #  odict: dictionary mapping of files and events
+#  unordered: the files whose events are not in time order
+#             (None = check every file)
 #
 # return: updated dictionary
 #
-# This function sorts the events in all files by the event start time
+# This function sorts the events in all files by the event start time.
+# Files whose events are already in order are left alone.
 #
-def sort_dict(odict):
+def sort_dict(odict, unordered = None):
 
-    # for each file
+    # find the files that are out of order
     #
-    for key in odict:
+    if unordered is None:
+        unordered = set()
+        for key in odict:
+            events = odict[key]
+            for i in range(1, len(events)):
+                if events[i][START_TIME_INDEX] < \
+                   events[i - 1][START_TIME_INDEX]:
+                    unordered.add(key)
+                    break
+
+    # for each file that is out of order
+    #
+    for key in unordered:
 
-        # sort by the start time of the event
+        # sort by the start time of the event:
+        #  a stable argsort of the start times matches sorted()
         #
-        odict[key] = sorted(odict[key], key=lambda event:event[START_TIME_INDEX])
+        events = odict[key]
+        starts = np.array([event[START_TIME_INDEX] for event in events],
+                          dtype = np.float64)
+        odict[key] = [events[i] for i in \
+                      np.argsort(starts, kind = "stable").tolist()]
 
     # exit gracefully
     #
@@ -69,11 +413,95 @@ def sort_dict(odict):
 #
 # end of function
 
+# function: is_sorted
+#
+# arguments:
+#  events: a list of events
+#
+# return: a logical value indicating status
+#
+# This function checks that both the start and stop times of a list
+# of events are nondecreasing.
+#
+def is_sorted(events):
+
+    # loop over all events
+    #
+    for i in range(1, len(events)):
+        if (events[i][START_TIME_INDEX] < \
+            events[i - 1][START_TIME_INDEX]) or \
+           (events[i][STOP_TIME_INDEX] < events[i - 1][STOP_TIME_INDEX]):
+            return False
+
+    # exit gracefully
+    #
+    return True
+#
+# end of function
+
+# function: sweep_events
+#
+# arguments:
+#  events: a sorted list of events (see is_sorted)
+#  others: a sorted list of events to be matched against events
+#  whole: if true, events overlap when they share a whole second (as
+#         in the TAES anyovlp test), otherwise when they overlap in time
+#
+# return: a list containing, for each event, the range of indices
+#         (lo, hi) of the events in others that may overlap it
+#
+# This function walks both lists once. Since start and stop times are
+# nondecreasing, the events in others that overlap an event form a
+# contiguous range, and both ends of the range only move forward. The
+# time test is the one the overlap and TAES scorers use in get_events.
+# For the whole-second test, an event in the range can still fail
+# anyovlp if its own range of seconds is empty.
+#
+def sweep_events(events, others, whole = False):
+
+    # declare local variables
+    #
+    ranges = []
+    num_others = len(others)
+    lo = int(0)
+    hi = int(0)
+
+    # loop over all events, advancing two pointers into others:
+    #  lo is the first event that stops after the event starts
+    #  hi is the first event that starts after the event stops
+    #
+    for event in events:
+        if whole:
+            while (lo < num_others) and \
+                  (int(others[lo][STOP_TIME_INDEX]) < \
+                   int(event[START_TIME_INDEX])):
+                lo += 1
+            while (hi < num_others) and \
+                  (int(others[hi][START_TIME_INDEX]) <= \
+                   int(event[STOP_TIME_INDEX])):
+                hi += 1
+        else:
+            while (lo < num_others) and \
+                  (others[lo][STOP_TIME_INDEX] <= event[START_TIME_INDEX]):
+                lo += 1
+            while (hi < num_others) and \
+                  (others[hi][START_TIME_INDEX] < event[STOP_TIME_INDEX]):
+                hi += 1
+        ranges.append((lo, max(lo, hi)))
+
+    # exit gracefully
+    #
+    return ranges
+#
+# end of function
+
 
 # function: parse_ref
 #
 # arguments:
 #  f_cont: the file content tokenized by newline
+#  resorted: a set that collects the files whose events had to be
+#            re-sorted (None = don't collect them)
 #
 # return: event dictionary and duration dictionary
 #
@@ -83,12 +511,18 @@ def sort_dict(odict):
 # it also returns a duration dictionary with a key/value pair of
 # file/duration
 #
-def parse_ref(f_cont):
+def parse_ref(f_cont, resorted = None):
 
     # instatiate the event dictionary
     #
     odict = {}
 
+    # keep track of the last start time of each file, and the files
+    # whose events are out of order
+    #
+    last = {}
+    unordered = set()
+
     # for each line in the file
     #
     for line in f_cont:
@@ -124,6 +558,7 @@ def parse_ref(f_cont):
             # the value is a new nested list of events
             #
             odict[fname] = [[start, stop, OrderedDict({lbl:conf})]]
+            last[fname] = start
 
         # if this file is already in the dictionary
         #
@@ -133,9 +568,17 @@ def parse_ref(f_cont):
             #
             odict[fname].append([start, stop, OrderedDict({lbl:conf})])
 
+            # note files whose events are out of order
+            #
+            if start < last[fname]:
+                unordered.add(fname)
+            last[fname] = start
+
     # sort the dictionary
     #
-    odict = sort_dict(odict)
+    odict = sort_dict(odict, unordered)
+    if resorted is not None:
+        resorted.update(unordered)
 
     # create a mapping of fname:duration; duration is simply
     # the stop time of the last event
@@ -149,6 +592,420 @@ def parse_ref(f_cont):
 # end of function
 
 
+# function: read_ref_columns
+#
+# arguments:
+#  fname: the name of the ref file
+#
+# return: a dictionary of columns (see REF_COLUMNS) and the number of
+#         files whose events had to be re-sorted
+#
+# This function parses a ref file column-wise. Rather than building a
+# list and an OrderedDict per event, the columns are converted to arrays
+# and grouped by file with one stable sort. The events of file i are
+# the entries bounds[i] to bounds[i + 1] of starts, stops, codes and
+# confs; codes index the (unmapped) labels.
+#
+def read_ref_columns(fname):
+
+    # read and tokenize the file:
+    #  lines with fewer than four tokens are skipped, as in parse_ref
+    #
+    with open(fname, 'rb') as fp:
+        rows = [line.split() for line in fp.read().splitlines()]
+    rows = [row for row in rows if len(row) >= MIN_REF_TOKENS]
+
+    # convert the columns
+    #
+    names = np.array([row[0] for row in rows], dtype = bytes)
+    starts = np.array([float(row[1]) for row in rows], dtype = np.float64)
+    stops = np.array([float(row[2]) for row in rows], dtype = np.float64)
+    labels, codes = np.unique(np.array([row[3] for row in rows],
+                                       dtype = bytes), return_inverse = True)
+    confs = np.array([float(row[4]) if len(row) == MIN_REF_TOKENS + 1 \
+                      else DEF_CONF for row in rows], dtype = np.float64)
+
+    # sanity check
+    #
+    if len(labels) > np.iinfo(CODE_TYPE).max:
+        raise ValueError("[%s]: too many classes (%d)" % \
+                         (sys.argv[0], len(labels)))
+
+    # number the files in order of first appearance
+    #
+    fnames, first, inverse = np.unique(names, return_index = True,
+                                       return_inverse = True)
+    order = np.argsort(first)
+    rank = np.empty(len(fnames), dtype = np.int64)
+    rank[order] = np.arange(len(fnames))
+    files = rank[inverse]
+
+    # sort by file and then by start time:
+    #  lexsort is stable, so this matches sorting each file by start time
+    #
+    index = np.lexsort((starts, files))
+
+    # count the files whose events were out of order: their original
+    # positions decrease somewhere within the sorted file
+    #
+    sorted_files = files[index]
+    drops = np.flatnonzero(np.diff(index) < 0) + 1
+    drops = drops[sorted_files[drops] == sorted_files[drops - 1]]
+    num_resorted = len(np.unique(sorted_files[drops]))
+
+    # collect the columns
+    #
+    columns = {"fnames": np.array([key.decode() for key in fnames[order]],
+                                  dtype = str),
+               "bounds": np.searchsorted(files[index],
+                                         np.arange(len(fnames) + 1)),
+               "starts": starts[index],
+               "stops": stops[index],
+               "codes": codes[index].astype(CODE_TYPE),
+               "confs": confs[index],
+               "labels": np.array([lbl.decode() for lbl in labels],
+                                  dtype = str)}
+
+    # exit gracefully
+    #
+    return columns, num_resorted
+#
+# end of function
+
+
+# function: make_event_lists
+#
+# arguments:
+#  columns: a dictionary of columns (see read_ref_columns)
+#  labels: the list of labels (None = use columns["labels"])
+#  store: the event store the columns were read from (None = none)
+#
+# return: a dictionary mapping of files and EventLists
+#         and a duration dictionary
+#
+def make_event_lists(columns, labels = None, store = None):
+
+    # declare local variables
+    #
+    bounds = columns["bounds"]
+    starts = columns["starts"]
+    stops = columns["stops"]
+    codes = columns["codes"]
+    confs = columns["confs"]
+    if labels is None:
+        labels = [str(lbl) for lbl in columns["labels"]]
+    odict = OrderedDict()
+    dur_dict = {}
+
+    # build an EventList for each file
+    #
+    for i, key in enumerate(columns["fnames"].tolist()):
+        lo, hi = int(bounds[i]), int(bounds[i + 1])
+        odict[key] = EventList(starts[lo:hi], stops[lo:hi], codes[lo:hi],
+                               confs[lo:hi], labels,
+                               None if store is None else (store, lo, hi))
+        dur_dict[key] = float(stops[hi - 1])
+
+    # exit gracefully
+    #
+    return odict, dur_dict
+#
+# end of function
+
+
+# function: write_store
+#
+# arguments:
+#  dname: the event store directory
+#  odict: a dictionary mapping of files and EventLists (see normalize)
+#
+# return: a logical value indicating status
+#
+# This function writes an event store: a directory holding one .npy
+# file per column (see REF_COLUMNS). The events of all files are
+# concatenated, and bounds holds the offset of each file's events. All
+# EventLists must share the same labels, as they do after normalize.
+#
+def write_store(dname, odict):
+
+    # declare local variables
+    #
+    events = [odict[key] for key in odict]
+    labels = events[0].labels_d if events else []
+
+    # sanity check
+    #
+    if any(event.labels_d != labels for event in events):
+        print("%s (%s: %s): the files have different labels (%s)" % \
+            (sys.argv[0], __name__, "write_store", dname))
+        return False
+
+    # build the columns
+    #
+    sizes = np.array([len(event) for event in events], dtype = np.int64)
+    columns = {
+        "fnames": np.array(list(odict), dtype = str),
+        "bounds": np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+        "starts": np.concatenate([event.starts_d for event in events] + \
+                                 [np.empty(0, np.float64)]),
+        "stops": np.concatenate([event.stops_d for event in events] + \
+                                [np.empty(0, np.float64)]),
+        "codes": np.concatenate([event.codes_d for event in events] + \
+                                [np.empty(0, CODE_TYPE)]).astype(CODE_TYPE),
+        "confs": np.concatenate([event.confs_d for event in events] + \
+                                [np.empty(0, np.float64)]),
+        "labels": np.array(labels, dtype = str)}
+
+    # write the columns
+    #
+    try:
+        os.makedirs(dname, exist_ok = True)
+        for key in REF_COLUMNS:
+            np.save(os.path.join(dname, key + STORE_EXT), columns[key],
+                    allow_pickle = False)
+    except OSError as e:
+        print("%s (%s: %s): error writing event store (%s: %s)" % \
+            (sys.argv[0], __name__, "write_store", dname, e))
+        return False
+
+    # forget any copy of this store opened earlier
+    #
+    STORES.pop(os.path.realpath(dname), None)
+
+    # exit gracefully
+    #
+    return True
+#
+# end of function
+
+
+# function: load_store
+#
+# arguments:
+#  dname: the event store directory
+#
+# return: the columns of the store and its list of labels
+#
+# This function memory maps the columns of an event store. Each store is
+# opened once per process.
+#
+def load_store(dname):
+
+    # open the store the first time it is needed
+    #
+    path = os.path.realpath(dname)
+    if path not in STORES:
+        columns = {}
+        for key in REF_COLUMNS:
+            columns[key] = np.load(os.path.join(path, key + STORE_EXT),
+                                   mmap_mode = "r" if key in STORE_MAPPED \
+                                   else None, allow_pickle = False)
+        STORES[path] = (columns, [str(lbl) for lbl in columns["labels"]])
+
+    # exit gracefully
+    #
+    return STORES[path]
+#
+# end of function
+
+
+# function: open_store
+#
+# arguments:
+#  dname: the event store directory
+#
+# return: a dictionary mapping of files and EventLists
+#         and a duration dictionary
+#
+# This function returns EventLists whose arrays are slices of the memory
+# mapped store. They are pickled as references to the store, so worker
+# processes share the mapped pages rather than copies of the events.
+#
+def open_store(dname):
+    columns, labels = load_store(dname)
+    return make_event_lists(columns, labels, os.path.realpath(dname))
+#
+# end of function
+
+
+# function: hash_file
+#
+# arguments:
+#  fname: the name of a file
+#
+# return: the sha256 digest of the file's contents (hex)
+#
+def hash_file(fname):
+
+    # hash the file one block at a time
+    #
+    digest = hashlib.sha256()
+    with open(fname, 'rb') as fp:
+        for block in iter(lambda: fp.read(BLOCK_SIZE), b""):
+            digest.update(block)
+
+    # exit gracefully
+    #
+    return digest.hexdigest()
+#
+# end of function
+
+
+# function: ref_cache_fname
+#
+# arguments:
+#  fname: the name of the ref file
+#  cache_dir: the cache directory
+#
+# return: the name of the cache file for fname
+#
+def ref_cache_fname(fname, cache_dir):
+    path = os.path.realpath(fname)
+    return os.path.join(cache_dir, CACHE_PREFIX + \
+                        hashlib.sha256(path.encode()).hexdigest()[:32] + \
+                        CACHE_EXT)
+#
+# end of function
+
+
+# function: read_ref_cache
+#
+# arguments:
+#  fname: the name of the ref file
+#  cache_dir: the cache directory
+#  stat: the result of os.stat(fname)
+#
+# return: a dictionary of columns, or None if there is no valid entry
+#
+# This function returns the cached columns for fname, and the number of
+# files that were re-sorted when fname was parsed (as "resorted"). The
+# entry is valid if its path, size and modification time match the
+# file. If only the modification time differs, the entry is still used
+# when the content hash matches, and it is rewritten with the new
+# modification time so the file is not hashed again on the next run.
+#
+def read_ref_cache(fname, cache_dir, stat):
+
+    # load the entry
+    #
+    cname = ref_cache_fname(fname, cache_dir)
+    if not os.path.exists(cname):
+        return None
+    try:
+        with np.load(cname, allow_pickle = False) as entry:
+            columns = {key: entry[key] for key in entry.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+
+    # check the key
+    #
+    if str(columns.get("path", "")) != os.path.realpath(fname) or \
+       int(columns.get("size", -1)) != stat.st_size or \
+       any(key not in columns for key in REF_COLUMNS + ["resorted"]):
+        return None
+    if int(columns["mtime"]) != stat.st_mtime_ns:
+        if str(columns["sha"]) != hash_file(fname):
+            return None
+        write_ref_cache(fname, cache_dir, stat, columns,
+                        int(columns["resorted"]), str(columns["sha"]))
+
+    # exit gracefully
+    #
+    return columns
+#
+# end of function
+
+
+# function: write_ref_cache
+#
+# arguments:
+#  fname: the name of the ref file
+#  cache_dir: the cache directory
+#  stat: the result of os.stat(fname) taken before fname was read
+#  columns: a dictionary of columns (see read_ref_columns)
+#  num_resorted: the number of files re-sorted when fname was parsed
+#  sha: the content hash of fname (None = hash the file)
+#
+# return: a logical value indicating status
+#
+# This function writes a cache entry. The entry is written to a
+# temporary file and renamed, so readers never see a partial entry.
+#
+def write_ref_cache(fname, cache_dir, stat, columns, num_resorted,
+                    sha = None):
+
+    # declare local variables
+    #
+    cname = ref_cache_fname(fname, cache_dir)
+    tname = "%s.%d.tmp" % (cname, os.getpid())
+
+    # write the entry
+    #
+    try:
+        if sha is None:
+            sha = hash_file(fname)
+        os.makedirs(cache_dir, exist_ok = True)
+        with open(tname, 'wb') as fp:
+            np.savez(fp, path = os.path.realpath(fname),
+                     size = stat.st_size, mtime = stat.st_mtime_ns,
+                     sha = sha, resorted = num_resorted,
+                     **{key: columns[key] for key in REF_COLUMNS})
+        os.replace(tname, cname)
+    except OSError as e:
+        print("%s (%s: %s): error writing cache (%s: %s)" % \
+            (sys.argv[0], __name__, "write_ref_cache", cname, e))
+        if os.path.exists(tname):
+            os.remove(tname)
+        return False
+
+    # exit gracefully
+    #
+    return True
+#
+# end of function
+
+
+# function: load_ref
+#
+# arguments:
+#  fname: the name of the ref file
+#  cache_dir: a directory used to cache the parsed file (None = no cache)
+#
+# return: a dictionary mapping of files and EventLists (with raw labels),
+#         a duration dictionary and the number of files whose events had
+#         to be re-sorted
+#
+# This function is a fast, column-wise version of parse_file_resorted
+# for ref files. The events, their order, the durations and the count
+# are the same as those from parse_ref. The labels are not mapped (see
+# normalize). If a cache directory is given, the parsed columns and the
+# count are stored there and reused until the file changes.
+#
+def load_ref(fname, cache_dir = None):
+
+    # no cache: parse the file
+    #
+    if cache_dir is None:
+        columns, num_resorted = read_ref_columns(fname)
+        return make_event_lists(columns) + (num_resorted,)
+
+    # use the cache entry if it is valid
+    #
+    stat = os.stat(fname)
+    columns = read_ref_cache(fname, cache_dir, stat)
+    if columns is None:
+        columns, num_resorted = read_ref_columns(fname)
+        write_ref_cache(fname, cache_dir, stat, columns, num_resorted)
+    else:
+        num_resorted = int(columns["resorted"])
+
+    # exit gracefully
+    #
+    return make_event_lists(columns) + (num_resorted,)
+#
+# end of function
+
+
 # function: fill_gap
 #
 # arguments:
@@ -190,66 +1047,50 @@ def fill_gap(odict, duration_dict):
         #
         bckg_event = OrderedDict({BCKG_CLASS:1.0})
 
-        # if the first event didn't start at time 0.0
+        # collect the events, bracketed by bckg events from time 0 to
+        # the start of the first event and from the stop time of the
+        # last event to the end of the file where these are missing
         #
+        events = odict[fname]
         if first_event_start != f_start:
-
-            # insert a bckg event from time 0 to the start of
-            # the first event
-            #
-            odict[fname].insert(0, [f_start, first_event_start, bckg_event])
-
-        # if the last event didn't stop at the end of the file
-        #
+            events = [[f_start, first_event_start, bckg_event]] + events
         if last_event_stop != f_stop:
+            events = events + [[last_event_stop, f_stop, bckg_event]]
 
-            # insert a bckg event from the stop time of the
-            # last event to the end of the file
-            #
-            odict[fname].append([last_event_stop, f_stop, bckg_event])
-
-        # keep track of the previous event stop time
-        # initially, this is the stop time of the first event
+        # build the new list in a single pass:
+        #  keep track of the previous event stop time, which initially
+        #  is the stop time of the first event
         #
-        prev_event_stop = odict[fname][FIRST_EVENT_INDEX][STOP_TIME_INDEX]
+        filled = [events[FIRST_EVENT_INDEX]]
+        prev_event_stop = events[FIRST_EVENT_INDEX][STOP_TIME_INDEX]
 
-        # skip the first event
+        # for each remaining event
         #
-        index = 1
-
-        # while there are events to process
-        #
-        while index < len(odict[fname]):
+        for index in range(1, len(events)):
 
             # get the current event
             #
-            event = odict[fname][index]
-
-            # get the start/stop time of the current event
-            #
-            curr_event_start = event[START_TIME_INDEX]
-            curr_event_stop = event[STOP_TIME_INDEX]
+            event = events[index]
 
             # if the stop time of the previous event is not
             # equal to the start time of the current event
             #
-            if prev_event_stop != curr_event_start:
-
-                # insert a bckg event in between the two events
-                #
-                odict[fname].insert(index, [prev_event_stop, curr_event_start, bckg_event])
+            if prev_event_stop != event[START_TIME_INDEX]:
 
-                # skip the next event
+                # add a bckg event in between the two events
                 #
-                index += 1
+                filled.append([prev_event_stop, event[START_TIME_INDEX],
+                               bckg_event])
 
-            # update the stop time of the previous event
+            # add the event and update the stop time of the
+            # previous event
             #
-            prev_event_stop = curr_event_stop
+            filled.append(event)
+            prev_event_stop = event[STOP_TIME_INDEX]
 
-            # increment the index
-            #
-            index += 1
+        # replace the events of this file
+        #
+        odict[fname] = filled
 
     # for each fname in the duration dictionary
     #
@@ -276,18 +1117,26 @@ def fill_gap(odict, duration_dict):
 # arguments:
 #  f_cont: the file content of the hyp file
 #  duration_dict: dictionary mapping of files and duration
+#  resorted: a set that collects the files whose events had to be
+#            re-sorted (None = don't collect them)
 #
 # return: updated dictionary
 #
 # This function sorts through the hyp file and creates 
 # a dictionary mapping of file name and events
 #
-def parse_hyp(f_cont, duration_dict):
+def parse_hyp(f_cont, duration_dict, resorted = None):
 
     # instantiate the event dictionary
     #
     odict = {}
 
+    # keep track of the last start time of each file, and the files
+    # whose events are out of order
+    #
+    last = {}
+    unordered = set()
+
     # for each line in the file
     #
     for line in f_cont:
@@ -323,6 +1172,7 @@ def parse_hyp(f_cont, duration_dict):
             # the value is a nested list of events
             #
             odict[fname] = [[start, stop, OrderedDict({DEF_CLASS:conf})]]
+            last[fname] = start
 
         # if the file was already in the dictionary
         #
@@ -332,9 +1182,17 @@ def parse_hyp(f_cont, duration_dict):
             #
             odict[fname].append([start, stop, OrderedDict({DEF_CLASS:conf})])
 
+            # note files whose events are out of order
+            #
+            if start < last[fname]:
+                unordered.add(fname)
+            last[fname] = start
+
     # sort the dictionary
     #
-    odict = sort_dict(odict)
+    odict = sort_dict(odict, unordered)
+    if resorted is not None:
+        resorted.update(unordered)
 
     # exit gracefully
     #
@@ -343,6 +1201,89 @@ def parse_hyp(f_cont, duration_dict):
 # end of function
 
 
+# function: read_lines
+#
+# arguments:
+#  fname: the name of the annotation file
+#  block_size: the number of characters to read at a time
+#
+# return: a generator of lines (without line endings)
+#
+# This function reads a file in fixed-size blocks and yields one line at
+# a time, so the whole file is never held in memory.
+#
+def read_lines(fname, block_size = BLOCK_SIZE):
+
+    # read the file one block at a time
+    #
+    with open(fname, 'r') as fp:
+
+        # a partial line at the end of a block is carried over
+        # to the next block
+        #
+        tail = ""
+        while True:
+            block = fp.read(block_size)
+            if not block:
+                break
+            lines = (tail + block).split("\n")
+            tail = lines.pop()
+            for line in lines:
+                yield line
+
+        # the last line may not end with a newline
+        #
+        if tail:
+            yield tail
+#
+# end of function
+
+
+# function: group_lines
+#
+# arguments:
+#  f_cont: an iterable of lines
+#  min_tokens: the minimum number of tokens on a valid line
+#
+# return: a generator of (fname, lines) tuples
+#
+# This function groups consecutive valid lines by their file name. Lines
+# that have too few tokens are dropped, as the parsers would skip them.
+#
+def group_lines(f_cont, min_tokens):
+
+    # declare local variables
+    #
+    fname = None
+    group = []
+
+    # for each line in the file
+    #
+    for line in f_cont:
+
+        # skip lines the parsers would skip
+        #
+        tokenized = line.split()
+        if len(tokenized) < min_tokens:
+            continue
+
+        # a new file name ends the current group
+        #
+        if tokenized[0] != fname:
+            if group:
+                yield fname, group
+            fname = tokenized[0]
+            group = []
+        group.append(line)
+
+    # the last group
+    #
+    if group:
+        yield fname, group
+#
+# end of function
+
+
 # function: parse_file
 #
 # arguments:
@@ -356,10 +1297,9 @@ def parse_hyp(f_cont, duration_dict):
 #
 def parse_file(fname, duration_dict = None):
 
-    # read the file
+    # read the file one block at a time
     #
-    with open(fname, 'r') as fp:
-        f_cont = fp.read().splitlines()
+    f_cont = read_lines(fname)
 
     # if no duration dict was provided, treat as ref
     #
@@ -375,5 +1315,126 @@ def parse_file(fname, duration_dict = None):
 #
 # end of function
 
+
+# function: parse_file_resorted
+#
+# arguments:
+#  fname: the name of the annotation file
+#  duration_dict: dictionary mapping of files and duration
+#
+# return: the result of parse_file and the number of files whose events
+#         had to be re-sorted
+#
+# This function is the same as parse_file, but it also reports how many
+# files were not in time order in the annotation file.
+#
+def parse_file_resorted(fname, duration_dict = None):
+
+    # declare local variables
+    #
+    resorted = set()
+    f_cont = read_lines(fname)
+
+    # ref files: return the event and duration dictionaries
+    #
+    if duration_dict is None:
+        odict, dur_dict = parse_ref(f_cont, resorted)
+        return odict, dur_dict, len(resorted)
+
+    # hyp files: return the event dictionary
+    #
+    return parse_hyp(f_cont, duration_dict, resorted), len(resorted)
+#
+# end of function
+
+
+# function: iter_file
+#
+# arguments:
+#  fname: the name of the hyp file
+#  duration_dict: dictionary mapping of files and duration
+#  resorted: a set that collects the files whose events had to be
+#            re-sorted (None = don't collect them)
+#
+# return: a generator of (fname, events) tuples
+#
+# This function yields the events of one recording at a time, in the
+# same order and form as the dictionary returned by parse_file. While
+# the lines of each recording are consecutive, the file is streamed and
+# only one recording is held in memory. If a recording turns up again
+# later in the file, the lines of the whole file are grouped by
+# recording and every recording is yielded again with all its events,
+# so the events yielded last for a file are the complete ones.
+#
+def iter_file(fname, duration_dict, resorted = None):
+
+    # parse one recording at a time while the lines of each recording
+    # are consecutive
+    #
+    seen = set()
+    grouped = True
+    for key, group in group_lines(read_lines(fname), MIN_HYP_TOKENS):
+        if key in seen:
+            grouped = False
+            break
+        seen.add(key)
+        yield key, parse_hyp(group, {key: duration_dict[key]},
+                             resorted)[key]
+
+    # otherwise, collect the lines of each recording before parsing it
+    #
+    if not grouped:
+        merged = OrderedDict()
+        for key, group in group_lines(read_lines(fname), MIN_HYP_TOKENS):
+            merged.setdefault(key, []).extend(group)
+        for key in merged:
+            yield key, parse_hyp(merged[key], {key: duration_dict[key]},
+                                 resorted)[key]
+        seen = set(merged)
+
+    # hyp files that were not mentioned are entirely bckg
+    #
+    for key in duration_dict:
+        if key not in seen:
+            yield key, fill_gap({}, {key: duration_dict[key]})[key]
+#
+# end of function
+
+
+# function: load_hyp
+#
+# arguments:
+#  fname: the name of the hyp file
+#  duration_dict: dictionary mapping of files and duration
+#  pmap: a permuted map (see nft.permute_map)
+#
+# return: a dictionary mapping of files and EventLists and the number
+#         of files whose events had to be re-sorted
+#
+# This function is the same as normalize(parse_file(...)), but each
+# recording is converted to an EventList as soon as it is parsed (see
+# iter_file), so the parsed events of the whole file are never held in
+# memory at once.
+#
+def load_hyp(fname, duration_dict, pmap):
+
+    # declare local variables
+    #
+    labels, codes = map_codes(pmap)
+    ndict = OrderedDict()
+    resorted = set()
+
+    # convert one recording at a time:
+    #  a recording that is yielded again replaces the earlier events
+    #
+    for key, events in iter_file(fname, duration_dict, resorted):
+        ndict[key] = make_event_list(events, labels, codes)
+
+    # exit gracefully
+    #
+    return ndict, len(resorted)
+#
+# end of function
+
 #                                                                              
 # end of file 
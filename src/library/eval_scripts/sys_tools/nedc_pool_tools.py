@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/python/nedc_sys_tools/nedc_pool_tools.py
+#
+# usage:
+#  import nedc_pool_tools as npt
+#
+# This file contains functions that score the files in a ref/hyp list
+# across a pool of worker processes. Each worker scores a contiguous
+# shard of the files and records every update it makes to the error
+# counters. The updates are replayed in input order, so the results are
+# identical to scoring the files one after another.
+#------------------------------------------------------------------------------
+
+# import required system modules
+#
+import os
+import sys
+import copy
+import multiprocessing
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the counters that are updated while scoring a file
+#
+COUNTERS = ["tgt_d", "hit_d", "mis_d", "fal_d", "sub_d", "ins_d", "del_d"]
+
+# define the default number of worker processes
+#
+DEF_JOBS = int(1)
+
+#------------------------------------------------------------------------------
+#
+# classes are listed here
+#
+#------------------------------------------------------------------------------
+
+# class: Ledger
+#
+# This class stands in for a counter dictionary inside a worker. Reads
+# return zero, so "counter[key] += value" stores exactly value, and every
+# store is appended to a log. Nested dictionaries (e.g., sub_d) are
+# represented by nested ledgers.
+#
+class Ledger(dict):
+
+    # method: constructor
+    #
+    # arguments:
+    #  path: the attribute name and keys that lead to this dictionary
+    #  counter: the dictionary being replaced
+    #  log: the list that stores the updates
+    #
+    # return: none
+    #
+    def __init__(self, path_a, counter_a, log_a):
+
+        # declare class data
+        #
+        dict.__init__(self)
+        self.path_d = path_a
+        self.log_d = log_a
+
+        # mirror the keys of the counter
+        #
+        for key in counter_a:
+            if isinstance(counter_a[key], dict):
+                dict.__setitem__(self, key, Ledger(path_a + (key,),
+                                                   counter_a[key], log_a))
+            else:
+                dict.__setitem__(self, key, int(0))
+
+        # exit gracefully
+        #
+    #
+    # end of method
+
+    # method: __getitem__
+    #
+    # arguments:
+    #  key: the key to look up
+    #
+    # return: a nested ledger or zero
+    #
+    def __getitem__(self, key_a):
+        value = dict.__getitem__(self, key_a)
+        if isinstance(value, Ledger):
+            return value
+        return int(0)
+    #
+    # end of method
+
+    # method: __setitem__
+    #
+    # arguments:
+    #  key: the key being updated
+    #  value: the amount added to the counter
+    #
+    # return: none
+    #
+    def __setitem__(self, key_a, value_a):
+        if key_a not in self:
+            raise KeyError(key_a)
+        self.log_d.append((self.path_d, key_a, value_a))
+    #
+    # end of method
+#
+# end of class
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: replay
+#
+# arguments:
+#  scorer: the scoring object whose counters are updated
+#  log: a list of updates recorded by ledgers
+#
+# return: none
+#
+# This function adds each recorded update to the scorer's counters in
+# the order they were recorded.
+#
+def replay(scorer_a, log_a):
+
+    # loop over all updates
+    #
+    for path, key, value in log_a:
+        counter = getattr(scorer_a, path[0])
+        for subkey in path[1:]:
+            counter = counter[subkey]
+        counter[key] += value
+
+    # exit gracefully
+    #
+    return None
+#
+# end of function
+
+# function: score_shard
+#
+# arguments:
+#  scorer: a copy of the scoring object
+#  shard: a list of (index, fname, ref events, hyp events)
+#
+# return:
+#  reports: the per file report text (None for a file that failed)
+#  log: the updates made to the counters
+#
+# This function runs in a worker process and scores one shard of files.
+#
+def score_shard(scorer_a, shard_a):
+
+    # replace the counters with ledgers
+    #
+    log = []
+    for name in COUNTERS:
+        if hasattr(scorer_a, name):
+            setattr(scorer_a, name,
+                    Ledger((name,), getattr(scorer_a, name), log))
+
+    # score each file
+    #
+    reports = []
+    for i, fname, events_ref, events_hyp in shard_a:
+        reports.append(scorer_a.score_file(i, fname,
+                                           {fname: events_ref},
+                                           {fname: events_hyp}))
+
+    # exit gracefully
+    #
+    return reports, log
+#
+# end of function
+
+# function: score_files
+#
+# arguments:
+#  scorer: the scoring object (already initialized)
+#  files_ref: a reference file list
+#  files_hyp: a hypothesis file list
+#  jobs: the number of worker processes
+#
+# return: a list of per file reports, or None if scoring failed
+#
+# This function calls scorer.score_file for every file in files_ref. If
+# more than one job is requested, the files are split into contiguous
+# shards that are scored in parallel, and the results are merged in
+# input order.
+#
+def score_files(scorer_a, files_ref_a, files_hyp_a, jobs_a = DEF_JOBS):
+
+    # declare local variables
+    #
+    fnames = list(files_ref_a)
+    jobs = max(min(int(jobs_a), len(fnames)), 1)
+    reports = []
+
+    # score the files one after another
+    #
+    if jobs == 1:
+        for i, fname in enumerate(fnames):
+            report = scorer_a.score_file(i, fname, files_ref_a, files_hyp_a)
+            if report is None:
+                return None
+            reports.append(report)
+        return reports
+
+    # make sure every file has a hypothesis before splitting the work
+    #
+    for fname in fnames:
+        if files_hyp_a.get(fname, None) is None:
+            print("%s (%s: %s): error getting annotations (%s)" % \
+                (sys.argv[0], __name__, "score_files", fname))
+            return None
+
+    # split the files into contiguous shards
+    #
+    shards = []
+    size = (len(fnames) + jobs - 1) // jobs
+    for start in range(0, len(fnames), size):
+        shards.append([(i, fname, files_ref_a[fname], files_hyp_a[fname]) \
+                       for i, fname in \
+                       enumerate(fnames[start:start + size], start)])
+
+    # the workers get a copy of the scorer without the open results file
+    #
+    worker = copy.copy(scorer_a)
+    worker.rfile_d = None
+
+    # score the shards
+    #
+    pool = multiprocessing.Pool(jobs)
+    try:
+        results = pool.starmap(score_shard,
+                               [(worker, shard) for shard in shards])
+    finally:
+        pool.close()
+        pool.join()
+
+    # merge the results in input order:
+    #  the total duration is accumulated here, in the same order
+    #
+    for shard, (shard_reports, log) in zip(shards, results):
+        for (i, fname, events_ref, events_hyp), report in \
+            zip(shard, shard_reports):
+            if report is None:
+                return None
+            scorer_a.total_dur_d += events_ref[-1][1]
+            reports.append(report)
+        replay(scorer_a, log)
+
+    # exit gracefully
+    #
+    return reports
+#
+# end of function
+
+#
+# end of file
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/python/nedc_sys_tools/nedc_roc_tools.py
+#
+# usage:
+#  import nedc_roc_tools as nrt
+#
+# This file contains functions that compute roc/det curves with any of
+# the scoring objects. The hypotheses are thresholded on their
+# confidences, and every threshold is scored from annotations that are
+# mapped once. A file is only rescored when its thresholded hypothesis
+# changes; otherwise the counter updates recorded for it are reused.
+#------------------------------------------------------------------------------
+
+# import required system modules
+#
+import os
+import sys
+
+# import required numerical modules
+#
+import numpy as np
+
+# import required NEDC modules
+#
+import sys_tools.nedc_ann_tools as nat
+import sys_tools.nedc_pool_tools as npt
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: threshold_events
+#
+# arguments:
+#  ann: a list of events ([start, stop, label, conf])
+#  threshold: the minimum confidence of a hypothesized event
+#  null: the null (background) label
+#
+# return: a new list of events
+#
+# This function relabels events whose confidence is below the threshold
+# as the null class, and merges adjacent null events.
+#
+def threshold_events(ann_a, threshold_a, null_a):
+
+    # loop over all events
+    #
+    events = []
+    for start, stop, lbl, conf in ann_a:
+
+        # drop events below the threshold
+        #
+        if lbl != null_a and conf < threshold_a:
+            lbl, conf = null_a, nat.DEF_CONF
+
+        # merge adjacent null events
+        #
+        if events and lbl == null_a and events[-1][2] == null_a and \
+           events[-1][1] == start:
+            events[-1] = [events[-1][0], stop, null_a, events[-1][3]]
+        else:
+            events.append([start, stop, lbl, conf])
+
+    # exit gracefully
+    #
+    return events
+#
+# end of function
+
+# function: reset_counters
+#
+# arguments:
+#  scorer: a scoring object
+#
+# return: none
+#
+# This function sets the error counters of a scoring object back to zero
+# without creating new dictionaries.
+#
+def reset_counters(scorer_a):
+
+    # zero every counter, including nested ones (e.g., sub_d)
+    #
+    for name in npt.COUNTERS:
+        if hasattr(scorer_a, name):
+            counters = [getattr(scorer_a, name)]
+            while counters:
+                counter = counters.pop()
+                for key in counter:
+                    if isinstance(counter[key], dict):
+                        counters.append(counter[key])
+                    else:
+                        counter[key] = int(0)
+    scorer_a.total_dur_d = float(0)
+
+    # exit gracefully
+    #
+    return None
+#
+# end of function
+
+# function: record_file
+#
+# arguments:
+#  scorer: a scoring object
+#  ann_ref: the reference events of a file
+#  ann_hyp: the hypothesis events of a file
+#
+# return: the counter updates made by scoring the file, or None on error
+#
+# This function scores one file with the scorer's counters replaced by
+# ledgers (see nedc_pool_tools), so the scorer itself is not changed.
+#
+def record_file(scorer_a, ann_ref_a, ann_hyp_a):
+
+    # replace the counters with ledgers
+    #
+    log = []
+    saved = {}
+    for name in npt.COUNTERS:
+        if hasattr(scorer_a, name):
+            saved[name] = getattr(scorer_a, name)
+            setattr(scorer_a, name, npt.Ledger((name,), saved[name], log))
+    total_dur = scorer_a.total_dur_d
+
+    # score the file and restore the counters
+    #
+    try:
+        status = scorer_a.score_roc([ann_ref_a], [ann_hyp_a])
+    finally:
+        for name in saved:
+            setattr(scorer_a, name, saved[name])
+        scorer_a.total_dur_d = total_dur
+
+    # exit gracefully
+    #
+    if status == False:
+        return None
+    return log
+#
+# end of function
+
+# function: sweep
+#
+# arguments:
+#  scorer: a scoring object (already initialized)
+#  events_ref: a list of reference event lists (one per file)
+#  events_hyp: a list of hypothesis event lists (one per file)
+#  thresholds: the thresholds at which the curve is computed
+#  key: the class for which the curve is computed
+#
+# return: a logical value indicating status
+#
+# This function computes an roc/det curve for key. At each threshold,
+# hypothesis events whose confidence is below the threshold become
+# background, the files are scored with score_roc and
+# compute_performance_roc is called. The events are mapped once, and a
+# file is only rescored when the set of events that pass the threshold
+# changes. The counters are rebuilt at each threshold by replaying the
+# recorded updates in file order, so the results are identical to
+# scoring every threshold from scratch.
+#
+# The counts and the derived measures for key become arrays with one
+# entry per threshold; get_roc and get_det return them as curves.
+#
+def sweep(scorer_a, events_ref_a, events_hyp_a, thresholds_a, key_a):
+
+    # map the events once
+    #
+    null = scorer_a.pmap_d[nat.BCKG_CLASS]
+    refs = [nat.map_events(events, scorer_a.pmap_d) \
+            for events in events_ref_a]
+    hyps = [nat.map_events(events, scorer_a.pmap_d) \
+            for events in events_hyp_a]
+    confs = [np.array([event[3] for event in ann], dtype = np.float64) \
+             for ann in hyps]
+    nulls = [np.array([event[2] == null for event in ann], dtype = bool) \
+             for ann in hyps]
+
+    # declare local variables
+    #
+    masks = [None] * len(hyps)
+    logs = [None] * len(hyps)
+    curve = {name: [] for name in ["tp_d", "tn_d", "fp_d", "fn_d",
+                                   "tpr_d", "tnr_d", "fpr_d", "fnr_d"]}
+
+    # loop over all thresholds
+    #
+    for threshold in thresholds_a:
+
+        # rescore the files whose thresholded hypothesis changed
+        #
+        for i in range(len(hyps)):
+            mask = (confs[i] >= threshold) | nulls[i]
+            if masks[i] is not None and np.array_equal(mask, masks[i]):
+                continue
+            logs[i] = record_file(scorer_a, refs[i],
+                                  threshold_events(hyps[i], threshold, null))
+            if logs[i] is None:
+                print("%s (%s: %s): error scoring file %d" % \
+                    (sys.argv[0], __name__, "sweep", i))
+                return False
+            masks[i] = mask
+
+        # rebuild the counters in file order
+        #
+        reset_counters(scorer_a)
+        for ann_ref, log in zip(refs, logs):
+            scorer_a.total_dur_d += ann_ref[-1][1]
+            npt.replay(scorer_a, log)
+
+        # compute the operating point
+        #
+        if scorer_a.compute_performance_roc(key_a) == False:
+            return False
+        for name in curve:
+            curve[name].append(getattr(scorer_a, name)[key_a])
+
+    # store the curve
+    #
+    for name in curve:
+        getattr(scorer_a, name)[key_a] = np.array(curve[name])
+
+    # exit gracefully
+    #
+    return True
+#
+# end of function
+
+#
+# end of file
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/python/nedc_sys_tools/nedc_stream_tools.py
+#
+# usage:
+#  import nedc_stream_tools as nst
+#
+# This file contains the state used to score a recording while it is
+# still being produced. Ref and hyp events are appended in time order
+# along with a watermark: a promise that every event that starts before
+# the watermark has been appended to both streams. The scoring objects
+# use this to decide which part of the timeline can no longer change
+# (see score_stream in nedc_eval_ovlp and nedc_eval_epoch).
+#------------------------------------------------------------------------------
+
+# import required system modules
+#
+import os
+import sys
+
+# import required NEDC modules
+#
+import sys_tools.nedc_ann_tools as nat
+
+#------------------------------------------------------------------------------
+#
+# classes are listed here
+#
+#------------------------------------------------------------------------------
+
+# class: EventStream
+#
+# This class holds the events of one recording that a scorer still needs,
+# and how far the timeline has been finalized.
+#
+class EventStream():
+
+    # method: constructor
+    #
+    # arguments: none
+    #
+    # return: none
+    #
+    def __init__(self):
+
+        # declare the events that are still needed:
+        #  events are [start, stop, label, conf] lists, and the scorer
+        #  drops events from the front once nothing can overlap them
+        #
+        self.ref_d = []
+        self.hyp_d = []
+
+        # declare the stop time of the last event appended to each stream
+        #
+        self.stop_ref_d = None
+        self.stop_hyp_d = None
+
+        # declare the time before which all events are known
+        #
+        self.watermark_d = float(0)
+
+        # declare counters the scorer uses to track its progress:
+        #  the number of retained events that have been finalized,
+        #  and the number of epochs that have been sampled
+        #
+        self.next_ref_d = int(0)
+        self.next_hyp_d = int(0)
+        self.index_d = int(0)
+        self.closed_d = False
+
+        # exit gracefully
+        #
+    #
+    # end of method
+
+    # method: append
+    #
+    # arguments:
+    #  events_ref: new reference events
+    #  events_hyp: new hypothesis events
+    #  watermark: all events that start before this time have been appended
+    #  pmap: a permuted map (see nft.permute_map)
+    #
+    # return: a logical value indicating status
+    #
+    # This method maps and appends new events. The watermark can not move
+    # backwards, and new events can not start before the old watermark or
+    # before the last event in the same stream.
+    #
+    def append(self, events_ref_a, events_hyp_a, watermark_a, pmap_a):
+
+        # a closed stream can not be extended
+        #
+        if self.closed_d:
+            print("%s (%s: %s): stream is closed" % \
+                (sys.argv[0], __name__, "append"))
+            return False
+
+        # check the watermark
+        #
+        if watermark_a < self.watermark_d:
+            print("%s (%s: %s): watermark moved backwards (%f < %f)" % \
+                (sys.argv[0], __name__, "append", watermark_a,
+                 self.watermark_d))
+            return False
+
+        # map and check the events of both streams before changing either
+        #
+        anns = []
+        for events, elist in [(events_ref_a, self.ref_d),
+                              (events_hyp_a, self.hyp_d)]:
+            ann = nat.map_events(events, pmap_a)
+            last = elist[-1][0] if len(elist) > 0 else float(0)
+            for event in ann:
+                if (event[0] < self.watermark_d) or (event[0] < last):
+                    print("%s (%s: %s): event out of order (%f %f)" % \
+                        (sys.argv[0], __name__, "append", event[0],
+                         event[1]))
+                    return False
+                last = event[0]
+            anns.append(ann)
+
+        # append the events
+        #
+        self.ref_d.extend(anns[0])
+        self.hyp_d.extend(anns[1])
+        if len(anns[0]) > 0:
+            self.stop_ref_d = anns[0][-1][1]
+        if len(anns[1]) > 0:
+            self.stop_hyp_d = anns[1][-1][1]
+
+        # advance the watermark
+        #
+        self.watermark_d = watermark_a
+
+        # exit gracefully
+        #
+        return True
+    #
+    # end of method
+
+    # method: close
+    #
+    # arguments: none
+    #
+    # return: the stop time of the recording, or None on error
+    #
+    # This method marks the end of both streams. As for a complete file,
+    # the last ref and hyp events must end at the same time (within 1
+    # millisecond).
+    #
+    def close(self):
+
+        # check that both streams have events
+        #
+        if (self.stop_ref_d is None) or (self.stop_hyp_d is None) or \
+           self.closed_d:
+            print("%s (%s: %s): nothing to close" % \
+                (sys.argv[0], __name__, "close"))
+            return None
+
+        # check the durations
+        #
+        if round(self.stop_ref_d, 3) != round(self.stop_hyp_d, 3):
+            print("%s (%s: %s): durations do not match (%f %f)" % \
+                (sys.argv[0], __name__, "close", self.stop_ref_d,
+                 self.stop_hyp_d))
+            return None
+
+        # exit gracefully
+        #
+        self.closed_d = True
+        return self.stop_ref_d
+    #
+    # end of method
+#
+# end of class
+
+#
+# end of file
@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/conftest.py
+#
+# This file makes the NEDC modules importable from the tests, which
+# import them the same way the scripts do (e.g., sys_tools.nedc_ann_tools).
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import os
+import sys
+
+# add the eval_scripts directory to the module search path
+#
+SCRIPT_LOC = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+if SCRIPT_LOC not in sys.path:
+    sys.path.insert(0, SCRIPT_LOC)
+
+#
+# end of file
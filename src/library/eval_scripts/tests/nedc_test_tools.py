@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/nedc_test_tools.py
+#
+# This file holds what the scorer tests share: the scoring map, a seeded
+# generator of ref/hyp events, a factory for initialized scorers and a
+# driver for streaming scorers.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import random
+from collections import OrderedDict
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the scoring map
+#
+SCMAP = OrderedDict([("seiz", ["seiz"]), ("bckg", ["bckg"])])
+SEIZ = "seiz"
+BCKG = "bckg"
+
+# define the fraction of events labeled seiz when labels are random
+#
+SEIZ_RATE = 0.4
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: make_events
+#
+# arguments:
+#  rng: a random number generator
+#  duration: the stop time of the last event
+#  num_events: the number of events
+#  alternate: if true, labels alternate between bckg and seiz (starting
+#             with bckg), otherwise they are random
+#  conf: if true, seiz events get random confidences
+#
+# return: a list of contiguous [start, stop, label, conf] events that
+#         covers 0 to duration
+#
+# The boundaries are whole, half or arbitrary fractional seconds, and
+# some events have zero length.
+#
+def make_events(rng_a, duration_a, num_events_a, alternate_a = True,
+                conf_a = False):
+
+    # pick the boundaries
+    #
+    bounds = []
+    for i in range(num_events_a - 1):
+        kind = rng_a.random()
+        if kind < 0.3:
+            bounds.append(float(rng_a.randint(0, int(duration_a))))
+        elif kind < 0.5:
+            bounds.append(rng_a.randint(0, int(duration_a) * 2) / 2.0)
+        else:
+            bounds.append(round(rng_a.uniform(0, duration_a), 4))
+    bounds = [0.0] + sorted(min(bound, duration_a) for bound in bounds) + \
+        [duration_a]
+
+    # label the events
+    #
+    events = []
+    for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if alternate_a:
+            lbl = SEIZ if i % 2 == 1 else BCKG
+        else:
+            lbl = SEIZ if rng_a.random() < SEIZ_RATE else BCKG
+        conf = round(rng_a.random(), 2) if conf_a and lbl == SEIZ else 1.0
+        events.append([start, stop, lbl, conf])
+
+    # exit gracefully
+    #
+    return events
+#
+# end of function
+
+# function: make_corpus
+#
+# arguments:
+#  seed: the seed of the random number generator
+#  num_files: the number of ref/hyp pairs
+#  durations: the durations to choose from
+#  max_events: the maximum number of events in a ref or hyp
+#  alternate: see make_events
+#  conf: if true, seiz events in the hyps get random confidences
+#
+# return: a list of (ref, hyp) pairs
+#
+def make_corpus(seed_a, num_files_a, durations_a, max_events_a,
+                alternate_a = True, conf_a = False):
+    rng = random.Random(seed_a)
+    corpus = []
+    for i in range(num_files_a):
+        duration = float(rng.choice(durations_a))
+        ref = make_events(rng, duration, rng.randint(1, max_events_a),
+                          alternate_a)
+        hyp = make_events(rng, duration, rng.randint(1, max_events_a),
+                          alternate_a, conf_a)
+        corpus.append((ref, hyp))
+    return corpus
+#
+# end of function
+
+# function: make_scorer
+#
+# arguments:
+#  cls: a scoring class
+#  attrs: attributes to set before the scorer is initialized
+#         (e.g., epoch_dur_d)
+#
+# return: an initialized scoring object
+#
+def make_scorer(cls_a, **attrs_a):
+    scorer = cls_a()
+    for name in attrs_a:
+        setattr(scorer, name, attrs_a[name])
+    scorer.init_score(SCMAP)
+    return scorer
+#
+# end of function
+
+# function: stream
+#
+# arguments:
+#  scorer: a scoring object that supports open_stream/score_stream
+#  ref: the ref events
+#  hyp: the hyp events
+#  watermarks: the watermarks at which events are appended
+#
+# return: the stream and the number of ref events (or epochs) scored
+#         after each append
+#
+# Each append passes the events that start between the previous
+# watermark and the new one. The last append passes every remaining
+# event, including zero-length events at the end of the file.
+#
+def stream(scorer_a, ref_a, hyp_a, watermarks_a):
+    st = scorer_a.open_stream()
+    counts = []
+    for i, watermark in enumerate(watermarks_a):
+        stop = watermark if i < len(watermarks_a) - 1 else float("inf")
+        assert scorer_a.score_stream(
+            st, [e for e in ref_a if st.watermark_d <= e[0] < stop],
+            [e for e in hyp_a if st.watermark_d <= e[0] < stop],
+            watermark)
+        counts.append(sum(scorer_a.tgt_d.values()))
+    return st, counts
+#
+# end of function
+
+#
+# end of file
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_ann_tools.py
+#
+# This file checks the ref/hyp parsers in nedc_ann_tools: the number of
+# re-sorted recordings they report, loading the hyp file one recording at
+# a time, and the ref cache.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import os
+
+# import NEDC support modules
+#
+import sys_tools.nedc_ann_tools as nat
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define a ref file in which two of the three recordings are out of order
+#
+REF = """\
+a_t000 10.0 20.0 seiz 1.0
+a_t000 0.0 10.0 bckg 1.0
+a_t000 20.0 30.0 bckg 1.0
+b_t000 0.0 5.5 bckg 1.0
+b_t000 5.5 12.0 seiz 1.0
+c_t000 4.0 9.0 bckg 1.0
+c_t000 0.0 4.0 seiz 1.0
+c_t000 9.0 9.0 bckg 1.0
+"""
+
+# define a hyp file in which one recording is out of order
+#
+HYP = """\
+a_t000 12.0 18.5 0.9
+a_t000 2.0 3.0 0.4
+b_t000 6.0 8.0 0.7
+"""
+
+# define a hyp file whose recordings are interleaved
+#
+HYP_INTERLEAVED = """\
+b_t000 1.0 2.0 0.3
+a_t000 12.0 18.5 0.9
+b_t000 6.0 8.0 0.7
+a_t000 2.0 3.0 0.4
+short line
+"""
+
+# define the scoring map
+#
+PMAP = {"seiz": "seiz", "bckg": "bckg"}
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: write_file
+#
+# arguments:
+#  dname: a directory
+#  name: the name of the file
+#  text: the contents of the file
+#
+# return: the path of the file
+#
+def write_file(dname_a, name_a, text_a):
+    path = os.path.join(str(dname_a), name_a)
+    with open(path, "w") as fp:
+        fp.write(text_a)
+    return path
+#
+# end of function
+
+# function: ref_events
+#
+# arguments:
+#  odict: a dictionary mapping of files and events or EventLists
+#
+# return: the events of each file as (start, stop, label) tuples
+#
+def ref_events(odict_a):
+    events = {}
+    for key in odict_a:
+        if isinstance(odict_a[key], nat.EventList):
+            events[key] = [tuple(event[:3]) for event in odict_a[key]]
+        else:
+            events[key] = [(event[0], event[1], next(iter(event[2]))) \
+                           for event in odict_a[key]]
+    return events
+#
+# end of function
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+def test_parsers_count_resorted(tmp_path):
+
+    # the ref and hyp parsers count the recordings they re-sort, and
+    # parse_file still returns what it always has
+    #
+    fref = write_file(tmp_path, "ref.txt", REF)
+    fhyp = write_file(tmp_path, "hyp.txt", HYP)
+    odict, dur_dict, num_resorted = nat.parse_file_resorted(fref)
+    assert num_resorted == 2
+    assert nat.parse_file(fref) == (odict, dur_dict)
+    hdict, num_resorted = nat.parse_file_resorted(fhyp, dur_dict)
+    assert num_resorted == 1
+    assert nat.parse_file(fhyp, dur_dict) == hdict
+    assert [event[:2] for event in hdict["a_t000"]][:3] == \
+        [[0.0, 2.0], [2.0, 3.0], [3.0, 12.0]]
+
+def test_load_hyp_matches_parse_file(tmp_path):
+
+    # grouped and interleaved files give the same EventLists and counts
+    # as parsing the whole file and normalizing it
+    #
+    fref = write_file(tmp_path, "ref.txt", REF)
+    odict, dur_dict = nat.parse_file(fref)
+    for i, text in enumerate([HYP, HYP_INTERLEAVED]):
+        fhyp = write_file(tmp_path, "hyp%d.txt" % i, text)
+        hdict, num_resorted = nat.parse_file_resorted(fhyp, dur_dict)
+        ndict = nat.normalize(hdict, PMAP)
+        ldict, lnum_resorted = nat.load_hyp(fhyp, dur_dict, PMAP)
+        assert list(ldict) == list(ndict)
+        assert [ldict[key].to_list() for key in ldict] == \
+            [ndict[key].to_list() for key in ndict]
+        assert lnum_resorted == num_resorted
+
+def test_iter_file_streams_grouped_input(tmp_path, monkeypatch):
+
+    # a file whose recordings are consecutive is read once, and an
+    # interleaved file is read again once the repeat is found
+    #
+    fref = write_file(tmp_path, "ref.txt", REF)
+    odict, dur_dict = nat.parse_file(fref)
+    reads = []
+    read_lines = nat.read_lines
+    monkeypatch.setattr(nat, "read_lines",
+                        lambda fname: reads.append(fname) or \
+                        read_lines(fname))
+    for i, (text, num_reads) in enumerate([(HYP, 1),
+                                           (HYP_INTERLEAVED, 2)]):
+        fhyp = write_file(tmp_path, "hyp%d.txt" % i, text)
+        del reads[:]
+        keys = [key for key, events in nat.iter_file(fhyp, dur_dict)]
+        assert len(reads) == num_reads
+        assert set(keys) == set(dur_dict)
+
+def test_load_ref_matches_parse_ref(tmp_path):
+
+    # the column-wise loader returns the same events, durations and count
+    #
+    fref = write_file(tmp_path, "ref.txt", REF)
+    odict, dur_dict, num_resorted = nat.parse_file_resorted(fref)
+    edict, edur_dict, enum_resorted = nat.load_ref(fref)
+    assert ref_events(edict) == ref_events(odict)
+    assert edur_dict == dur_dict
+    assert enum_resorted == num_resorted
+
+def test_load_ref_cache_keeps_count(tmp_path):
+
+    # a cache hit reports the count found when the file was parsed
+    #
+    fref = write_file(tmp_path, "ref.txt", REF)
+    cache = os.path.join(str(tmp_path), "cache")
+    first = nat.load_ref(fref, cache)
+    second = nat.load_ref(fref, cache)
+    assert first[2] == second[2] == 2
+    assert ref_events(second[0]) == ref_events(first[0])
+
+def test_ref_cache_refreshes_mtime(tmp_path, monkeypatch):
+
+    # after a touch, the entry is accepted on its hash once and then
+    # rewritten, so the next run does not hash the file again
+    #
+    fref = write_file(tmp_path, "ref.txt", REF)
+    cache = os.path.join(str(tmp_path), "cache")
+    nat.load_ref(fref, cache)
+    stat = os.stat(fref)
+    os.utime(fref, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    hashed = []
+    hash_file = nat.hash_file
+    monkeypatch.setattr(nat, "hash_file",
+                        lambda fname: hashed.append(fname) or \
+                        hash_file(fname))
+    assert nat.load_ref(fref, cache)[2] == 2
+    assert len(hashed) == 1
+    assert nat.load_ref(fref, cache)[2] == 2
+    assert len(hashed) == 1
+
+#
+# end of file
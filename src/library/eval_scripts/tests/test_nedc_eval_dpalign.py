@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_eval_dpalign.py
+#
+# This file checks that banded DP alignment produces the same alignment
+# and counts as the full grid (compute_etypes), including with penalties
+# whose sums are not exact in floating point.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import random
+
+import pytest
+
+# import NEDC scoring modules
+#
+import eval_tools.nedc_eval_dpalign as ndpalign
+from nedc_test_tools import SEIZ, BCKG, make_events, make_scorer
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the counters compared after scoring
+#
+COUNTERS = ["tgt_d", "hit_d", "mis_d", "fal_d", "sub_d", "ins_d", "del_d"]
+
+# define the (deletion, insertion, substitution) penalties tested
+#
+PENALTIES = [(1.0, 1.0, 1.0), (0.1, 0.1, 0.3), (0.3, 0.7, 0.45),
+             (0.1, 0.2, 0.7), (1.0, 1.0, 2.5)]
+
+# define the number and size of the generated ref/hyp pairs (for each
+# set of penalties)
+#
+NUM_RANDOM = 200
+MAX_EVENTS = 40
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: align
+#
+# arguments:
+#  penalties: the (deletion, insertion, substitution) penalties
+#  band: the half-width of the band (0 = full grid)
+#  ref: the ref events
+#  hyp: the hyp events
+#
+# return: the alignment returned by compute and the counters
+#
+def align(penalties_a, band_a, ref_a, hyp_a):
+    scorer = make_scorer(ndpalign.NedcDPAlignment,
+                         penalty_del_d = penalties_a[0],
+                         penalty_ins_d = penalties_a[1],
+                         penalty_sub_d = penalties_a[2], band_d = band_a)
+    result = scorer.compute(ref_a, hyp_a)
+    return result, [getattr(scorer, name) for name in COUNTERS]
+#
+# end of function
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("penalties", PENALTIES)
+def test_banded_matches_full_grid(penalties):
+
+    # align random label sequences of similar lengths, so that most
+    # of them are aligned within the band. only the labels matter.
+    #
+    rng = random.Random(20240415)
+    num_banded = 0
+    for n in range(NUM_RANDOM):
+        m = rng.randint(1, MAX_EVENTS)
+        k = max(1, m + rng.randint(-3, 3))
+        ref = make_events(rng, float(m), m, False)
+        hyp = make_events(rng, float(k), k, False)
+        band = rng.randint(1, 4)
+
+        # count the pairs that the band actually handles
+        #
+        scorer = make_scorer(ndpalign.NedcDPAlignment,
+                             penalty_del_d = penalties[0],
+                             penalty_ins_d = penalties[1],
+                             penalty_sub_d = penalties[2])
+        labels = [ndpalign.ntt.NULL_CLASS]
+        etypes, offset = scorer.compute_etypes_banded(
+            labels + [e[2] for e in ref] + labels,
+            labels + [e[2] for e in hyp] + labels, band)
+        if etypes is not None:
+            num_banded += 1
+
+        assert align(penalties, band, ref, hyp) == \
+            align(penalties, 0, ref, hyp), (n, band)
+
+    # make sure the test is not vacuous
+    #
+    assert num_banded > NUM_RANDOM // 2
+
+def test_banded_tie_matches_full_grid():
+
+    # with penalties of 0.1/0.1/0.3, once the band is widened to 2 the
+    # best path in it costs exactly the bound on paths outside it (0.7),
+    # but the float sum compares as smaller. the band must be widened
+    # again, not accepted.
+    #
+    ref = [[float(i), float(i + 1), SEIZ, 1.0] for i in range(3)]
+    hyp = [[float(i), float(i + 1), BCKG, 1.0] for i in range(4)]
+    assert align((0.1, 0.1, 0.3), 1, ref, hyp) == \
+        align((0.1, 0.1, 0.3), 0, ref, hyp)
+
+#
+# end of file
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_eval_eeg.py
+#
+# This file checks how batch mode names the hyp lists it scores.
+#------------------------------------------------------------------------------
+
+# import NEDC modules
+#
+import nedc_eval_eeg as neval
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+def test_batch_names_threshold_dirs():
+
+    # lists written per threshold differ only in their directory
+    #
+    assert neval.batch_names(["model/0.6/dev_hyp.txt",
+                              "model/0.7/dev_hyp.txt",
+                              "model/0.95/dev_hyp.txt"]) == \
+        ["0.6/dev_hyp", "0.7/dev_hyp", "0.95/dev_hyp"]
+
+def test_batch_names_same_dir():
+
+    # lists in the same directory are named after the files
+    #
+    assert neval.batch_names(["out/a_hyp.txt", "out/b_hyp.txt"]) == \
+        ["a_hyp", "b_hyp"]
+
+def test_batch_names_repeated():
+
+    # the same list given twice gets two names
+    #
+    names = neval.batch_names(["m/0.6/dev_hyp.txt", "m/0.7/dev_hyp.txt",
+                               "m/0.6/dev_hyp.txt"])
+    assert names == ["0.6/dev_hyp", "0.7/dev_hyp", "0.6/dev_hyp_2"]
+    assert len(set(names)) == len(names)
+
+#
+# end of file
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_eval_epoch.py
+#
+# This file checks that streaming epoch scoring (score_stream) finalizes
+# epochs as the watermark advances, including epochs that fall in gaps
+# between events, that close_stream removes the epochs sampled after the
+# end of the file, and that its counters match compute.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import random
+
+import pytest
+
+# import NEDC modules
+#
+import eval_tools.nedc_eval_epoch as nepoch
+from nedc_test_tools import SEIZ, BCKG, make_events, make_scorer, stream
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the counters compared after scoring
+#
+COUNTERS = ["tgt_d", "sub_d"]
+
+# define the epoch durations tested
+#
+EPOCH_DURATIONS = [nepoch.EPOCH_DURATION, 1.0]
+
+# define the number and size of the generated recordings
+#
+NUM_RANDOM = 50
+MAX_SEIZURES = 4
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+def test_stream_finalizes_gaps():
+
+    # a ref and hyp that only contain seizures: every epoch whose center
+    # is before the watermark is scored before the stream is closed
+    #
+    scorer = make_scorer(nepoch.NedcEpoch, epoch_dur_d = 1.0)
+    ref = [[10.0, 20.0, SEIZ, 1.0], [40.0, 50.0, SEIZ, 1.0]]
+    hyp = [[15.0, 25.0, SEIZ, 1.0]]
+    st, counts = stream(scorer, ref, hyp, [5.0, 30.0, 45.0])
+    assert counts == [5, 30, 45]
+    assert scorer.sub_d[SEIZ][SEIZ] == 5
+    assert scorer.sub_d[BCKG][SEIZ] == 5
+    assert scorer.sub_d[SEIZ][BCKG] == 10
+
+    # end both streams with a bckg event, so they can be closed
+    #
+    assert scorer.score_stream(st, [[50.0, 60.0, BCKG, 1.0]],
+                               [[50.0, 60.0, BCKG, 1.0]], 60.0)
+    assert scorer.close_stream(st)
+    assert sum(scorer.tgt_d.values()) == 60
+    assert scorer.sub_d[SEIZ][BCKG] == 15
+    assert scorer.sub_d[BCKG][BCKG] == 35
+
+def test_stream_close_drops_extra_epochs():
+
+    # streams that end with a seizure: the epochs after the end of the
+    # file are sampled as bckg/bckg while the watermark is past the end,
+    # and close_stream removes them again
+    #
+    scorer = make_scorer(nepoch.NedcEpoch, epoch_dur_d = 1.0)
+    ref = [[10.0, 20.0, SEIZ, 1.0], [50.0, 60.0, SEIZ, 1.0]]
+    hyp = [[15.0, 25.0, SEIZ, 1.0], [55.0, 60.0, SEIZ, 1.0]]
+    st, counts = stream(scorer, ref, hyp, [30.0, 65.0])
+    assert counts == [30, 65]
+    assert scorer.sub_d[BCKG][BCKG] == 40
+    assert scorer.close_stream(st)
+    assert sum(scorer.tgt_d.values()) == 60
+    assert scorer.sub_d[BCKG][BCKG] == 35
+    assert scorer.total_dur_d == 60.0
+
+    brute = make_scorer(nepoch.NedcEpoch, epoch_dur_d = 1.0)
+    brute.compute([[0.0, 10.0, BCKG, 1.0]] + ref[:1] +
+                  [[20.0, 50.0, BCKG, 1.0]] + ref[1:],
+                  [[0.0, 15.0, BCKG, 1.0]] + hyp[:1] +
+                  [[25.0, 55.0, BCKG, 1.0]] + hyp[1:], brute.epoch_dur_d)
+    for name in COUNTERS:
+        assert getattr(scorer, name) == getattr(brute, name), name
+
+@pytest.mark.parametrize("epoch_dur", EPOCH_DURATIONS)
+def test_stream_matches_compute(epoch_dur):
+
+    # stream contiguous events that end with bckg at random watermarks
+    # and compare the counters with compute
+    #
+    rng = random.Random(20240423)
+    for n in range(NUM_RANDOM):
+        duration = float(rng.choice([30, 60, 121]))
+        ref = make_events(rng, duration, 2 * rng.randint(0, MAX_SEIZURES) + 1)
+        hyp = make_events(rng, duration, 2 * rng.randint(0, MAX_SEIZURES) + 1)
+        watermarks = sorted(round(rng.uniform(0, duration), 1) \
+                            for i in range(rng.randint(1, 8)))
+
+        # every epoch whose center is before a watermark is scored. the
+        # last watermark can pass the end of the recording.
+        #
+        scorer = make_scorer(nepoch.NedcEpoch, epoch_dur_d = epoch_dur)
+        st, counts = stream(scorer, ref, hyp,
+                            watermarks + [duration + rng.choice([0, 5])])
+        times = scorer.epoch_times(duration, epoch_dur)
+        for watermark, count in zip(watermarks, counts):
+            assert count == int((times < watermark).sum()), n
+        assert scorer.close_stream(st)
+
+        brute = make_scorer(nepoch.NedcEpoch, epoch_dur_d = epoch_dur)
+        brute.compute(ref, hyp, epoch_dur)
+        for name in COUNTERS:
+            assert getattr(scorer, name) == getattr(brute, name), (n, name)
+
+#
+# end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_eval_ovlp.py
+#
+# This file checks that streaming overlap scoring (score_stream) scores
+# an event once the watermark passes its stop time, and that its
+# counters match compute.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import random
+
+import pytest
+
+# import NEDC modules
+#
+import eval_tools.nedc_eval_ovlp as novlp
+from nedc_test_tools import SEIZ, BCKG, make_events, make_scorer, stream
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the counters compared after scoring
+#
+COUNTERS = ["tgt_d", "hit_d", "mis_d", "fal_d"]
+
+# define the durations of the generated recordings, and the number of
+# recordings generated for each
+#
+DURATIONS = [30.0, 60.0, 121.0]
+NUM_RANDOM = 20
+MAX_EVENTS = 9
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+def test_stream_scores_finished_events():
+
+    # a ref event is scored once the watermark reaches its stop time,
+    # and is a hit if any hyp event seen so far overlaps it
+    #
+    scorer = make_scorer(novlp.NedcOverlap)
+    ref = [[0.0, 10.0, BCKG, 1.0], [10.0, 20.0, SEIZ, 1.0],
+           [20.0, 30.0, BCKG, 1.0]]
+    hyp = [[0.0, 15.0, BCKG, 1.0], [15.0, 25.0, SEIZ, 1.0],
+           [25.0, 30.0, BCKG, 1.0]]
+    st, counts = stream(scorer, ref, hyp, [5.0, 12.0, 20.0, 29.0])
+    assert counts == [0, 1, 2, 2]
+    assert scorer.hit_d[SEIZ] == 1
+    assert scorer.fal_d[SEIZ] == 0
+    assert scorer.close_stream(st)
+    assert sum(scorer.tgt_d.values()) == 3
+    assert scorer.total_dur_d == 30.0
+
+@pytest.mark.parametrize("duration", DURATIONS)
+def test_stream_matches_compute(duration):
+
+    # stream contiguous events at random watermarks and compare the
+    # counters and the total duration with compute
+    #
+    rng = random.Random(int(duration))
+    for n in range(NUM_RANDOM):
+        ref = make_events(rng, duration, rng.randint(1, MAX_EVENTS))
+        hyp = make_events(rng, duration, rng.randint(1, MAX_EVENTS))
+        watermarks = sorted(round(rng.uniform(0, duration), 1) \
+                            for i in range(rng.randint(1, 8)))
+
+        # every event that stops at or before a watermark is scored. the
+        # last watermark can pass the end of the recording.
+        #
+        scorer = make_scorer(novlp.NedcOverlap)
+        st, counts = stream(scorer, ref, hyp,
+                            watermarks + [duration + rng.choice([0, 5])])
+        for watermark, count in zip(watermarks, counts):
+            assert count == len([e for e in ref if e[1] <= watermark]), n
+        assert scorer.close_stream(st)
+        assert len(st.ref_d) == len(st.hyp_d) == 0
+
+        brute = make_scorer(novlp.NedcOverlap)
+        assert brute.compute(ref, hyp)
+        for name in COUNTERS:
+            assert getattr(scorer, name) == getattr(brute, name), (n, name)
+        assert round(scorer.total_dur_d, 6) == duration, n
+
+#
+# end of file
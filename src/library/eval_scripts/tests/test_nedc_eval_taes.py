@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_eval_taes.py
+#
+# This file checks that NedcTAES scores are bit-identical to those of
+# the original implementation, which tested whole-second overlap by
+# intersecting set(range(...)) objects and scanned every hyp event for
+# each ref event.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import copy
+
+import pytest
+
+# import NEDC modules
+#
+import sys_tools.nedc_ann_tools as nat
+import eval_tools.nedc_eval_taes as ntaes
+import nedc_test_tools as ntest
+from nedc_test_tools import SEIZ, BCKG, make_scorer
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the counters compared after scoring
+#
+COUNTERS = ["tgt_d", "hit_d", "mis_d", "fal_d", "ins_d", "del_d"]
+
+# define the hand-written ref/hyp pairs: fractional boundaries, events
+# that touch at a whole second, zero-length events and events that
+# share a single whole second
+#
+CORPUS = [
+
+    # fractional boundaries
+    #
+    ([[0.0, 10.25, BCKG, 1.0], [10.25, 20.75, SEIZ, 1.0],
+      [20.75, 30.0, BCKG, 1.0]],
+     [[0.0, 12.5, BCKG, 1.0], [12.5, 19.9, SEIZ, 0.8],
+      [19.9, 30.0, BCKG, 1.0]]),
+
+    # events that touch at a whole second
+    #
+    ([[0.0, 10.0, BCKG, 1.0], [10.0, 20.0, SEIZ, 1.0],
+      [20.0, 30.0, BCKG, 1.0]],
+     [[0.0, 20.0, BCKG, 1.0], [20.0, 25.0, SEIZ, 1.0],
+      [25.0, 30.0, BCKG, 1.0]]),
+
+    # events that share a fractional second but do not overlap
+    #
+    ([[0.0, 10.2, BCKG, 1.0], [10.2, 15.0, SEIZ, 1.0],
+      [15.0, 30.0, BCKG, 1.0]],
+     [[0.0, 5.0, BCKG, 1.0], [5.0, 10.1, SEIZ, 1.0],
+      [10.1, 30.0, BCKG, 1.0]]),
+
+    # zero-length events
+    #
+    ([[0.0, 10.0, BCKG, 1.0], [10.0, 10.0, SEIZ, 1.0],
+      [10.0, 20.0, SEIZ, 1.0], [20.0, 30.0, BCKG, 1.0]],
+     [[0.0, 10.5, BCKG, 1.0], [10.5, 10.5, SEIZ, 1.0],
+      [10.5, 30.0, BCKG, 1.0]]),
+
+    # zero-length events at the start and the end of the file
+    #
+    ([[0.0, 0.0, SEIZ, 1.0], [0.0, 29.5, BCKG, 1.0],
+      [29.5, 29.5, SEIZ, 1.0], [29.5, 30.0, BCKG, 1.0]],
+     [[0.0, 0.0, SEIZ, 1.0], [0.0, 30.0, BCKG, 1.0],
+      [30.0, 30.0, SEIZ, 1.0]]),
+
+    # several hyp events within one ref event, and the reverse
+    #
+    ([[0.0, 3.5, BCKG, 1.0], [3.5, 21.5, SEIZ, 1.0],
+      [21.5, 22.0, BCKG, 1.0], [22.0, 22.75, SEIZ, 1.0],
+      [22.75, 40.0, BCKG, 1.0]],
+     [[0.0, 4.0, BCKG, 1.0], [4.0, 6.0, SEIZ, 0.9],
+      [6.0, 7.5, BCKG, 1.0], [7.5, 9.25, SEIZ, 0.7],
+      [9.25, 9.75, BCKG, 1.0], [9.75, 23.0, SEIZ, 0.6],
+      [23.0, 40.0, BCKG, 1.0]])]
+
+# define the number and size of the generated ref/hyp pairs
+#
+NUM_RANDOM = 300
+DURATIONS = [1.0, 7.5, 30.0, 61.25, 300.0]
+MAX_EVENTS = 12
+
+#------------------------------------------------------------------------------
+#
+# classes are listed here
+#
+#------------------------------------------------------------------------------
+
+# class: OracleTAES
+#
+# This class scores with the original algorithm: whole-second overlap is
+# tested with range sets, and every hyp event is a candidate for every
+# ref event (the scan compute uses when nat.is_sorted fails).
+#
+class OracleTAES(ntaes.NedcTAES):
+
+    def anyovlp(self, ref_a, hyp_a):
+        refset = set(range(int(ref_a[0]), int(ref_a[1]) + 1))
+        hypset = set(range(int(hyp_a[0]), int(hyp_a[1]) + 1))
+        return len(refset.intersection(hypset)) != 0
+
+    def compute(self, ref_a, hyp_a):
+        is_sorted = nat.is_sorted
+        nat.is_sorted = lambda events_a: False
+        try:
+            return ntaes.NedcTAES.compute(self, ref_a, hyp_a)
+        finally:
+            nat.is_sorted = is_sorted
+
+#------------------------------------------------------------------------------
+#
+# functions are listed here
+#
+#------------------------------------------------------------------------------
+
+# function: make_corpus
+#
+# arguments: none
+#
+# return: the hand-written pairs followed by the generated pairs
+#
+def make_corpus():
+    return CORPUS + ntest.make_corpus(20240412, NUM_RANDOM, DURATIONS,
+                                      MAX_EVENTS, False, True)
+#
+# end of function
+
+# function: score
+#
+# arguments:
+#  cls: NedcTAES or OracleTAES
+#  ref: the ref events
+#  hyp: the hyp events
+#
+# return: the values returned by compute and the counters
+#
+# A zero-length ref event inside a longer hyp event makes calc_hf divide
+# by zero in both implementations, so the error is returned as a result.
+#
+def score(cls_a, ref_a, hyp_a):
+    scorer = make_scorer(cls_a)
+    try:
+        result = scorer.compute(copy.deepcopy(ref_a), copy.deepcopy(hyp_a))
+    except ZeroDivisionError:
+        return ZeroDivisionError
+    return result, [dict(getattr(scorer, name)) for name in COUNTERS]
+#
+# end of function
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+def test_anyovlp_matches_range_sets():
+
+    # compare every pair of events in the corpus, plus reversed,
+    # negative and whole-second events
+    #
+    scorer = ntaes.NedcTAES()
+    oracle = OracleTAES()
+    events = set(tuple(event[:2]) for ref, hyp in make_corpus() \
+                 for event in ref + hyp)
+    events = sorted(events)[::7] + \
+        [(5.0, 3.0), (-2.5, 0.5), (-1.0, -0.5), (4.0, 4.0), (4.999, 5.0),
+         (5.0, 5.001), (0.0, 0.0)]
+    for ref in events:
+        for hyp in events:
+            assert scorer.anyovlp(ref, hyp) == oracle.anyovlp(ref, hyp), \
+                (ref, hyp)
+
+@pytest.mark.parametrize("ref, hyp", make_corpus())
+def test_compute_matches_oracle(ref, hyp):
+
+    # score each pair with both implementations
+    #
+    assert score(ntaes.NedcTAES, ref, hyp) == score(OracleTAES, ref, hyp)
+
+def test_compute_accumulates_like_oracle():
+
+    # the counters summed over the whole corpus must also agree
+    #
+    scorer = make_scorer(ntaes.NedcTAES)
+    oracle = make_scorer(OracleTAES)
+    for ref, hyp in make_corpus():
+        if score(OracleTAES, ref, hyp) is ZeroDivisionError:
+            continue
+        scorer.compute(copy.deepcopy(ref), copy.deepcopy(hyp))
+        oracle.compute(copy.deepcopy(ref), copy.deepcopy(hyp))
+    for name in COUNTERS:
+        assert getattr(scorer, name) == getattr(oracle, name), name
+
+#
+# end of file
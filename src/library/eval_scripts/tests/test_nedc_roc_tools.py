@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#
+# file: $NEDC_NFC/util/python/nedc_eval_eeg/tests/test_nedc_roc_tools.py
+#
+# This file checks that a threshold sweep (nrt.sweep) gives, at every
+# threshold, the same operating point as a fresh scorer run on the
+# thresholded hypotheses, for all four scoring methods.
+#------------------------------------------------------------------------------
+
+# import system modules
+#
+import pytest
+
+# import NEDC modules
+#
+import sys_tools.nedc_roc_tools as nrt
+import eval_tools.nedc_eval_dpalign as ndpalign
+import eval_tools.nedc_eval_epoch as nepoch
+import eval_tools.nedc_eval_ovlp as novlp
+import eval_tools.nedc_eval_taes as ntaes
+from nedc_test_tools import SEIZ, BCKG, make_corpus, make_scorer
+
+#------------------------------------------------------------------------------
+#
+# global variables are listed here
+#
+#------------------------------------------------------------------------------
+
+# define the scoring classes
+#
+SCORERS = [ndpalign.NedcDPAlignment, nepoch.NedcEpoch, novlp.NedcOverlap,
+           ntaes.NedcTAES]
+
+# define the thresholds, and the values that make up an operating point
+#
+THRESHOLDS = [0.0, 0.2, 0.35, 0.5, 0.65, 0.8]
+CURVE = ["tp_d", "tn_d", "fp_d", "fn_d", "tpr_d", "tnr_d", "fpr_d", "fnr_d"]
+
+# define the number and size of the files in the corpus
+#
+NUM_FILES = 12
+DURATIONS = [60, 120, 300]
+MAX_EVENTS = 11
+
+#------------------------------------------------------------------------------
+#
+# tests are listed here
+#
+#------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("cls", SCORERS)
+def test_sweep_matches_brute_force(cls):
+
+    # sweep the scorer once, then score every threshold from scratch
+    #
+    corpus = make_corpus(20240420, NUM_FILES, DURATIONS, MAX_EVENTS,
+                         conf_a = True)
+    refs = [ref for ref, hyp in corpus]
+    hyps = [hyp for ref, hyp in corpus]
+    scorer = make_scorer(cls)
+    assert scorer.score_roc_sweep(refs, hyps, THRESHOLDS, SEIZ)
+
+    for i, threshold in enumerate(THRESHOLDS):
+        brute = make_scorer(cls)
+        assert brute.score_roc(refs, [nrt.threshold_events(hyp, threshold,
+                                                           BCKG) \
+                                      for hyp in hyps])
+        assert brute.compute_performance_roc(SEIZ)
+        for name in CURVE:
+            assert getattr(scorer, name)[SEIZ][i] == \
+                getattr(brute, name)[SEIZ], (threshold, name)
+        assert scorer.total_dur_d == brute.total_dur_d
+
+def test_threshold_events():
+
+    # events below the threshold become bckg and merge with their
+    # neighbors
+    #
+    hyp = [[0.0, 1.0, BCKG, 1.0], [1.0, 2.0, SEIZ, 0.3],
+           [2.0, 3.0, BCKG, 1.0], [3.0, 4.0, SEIZ, 0.6],
+           [4.0, 5.0, BCKG, 1.0]]
+    assert nrt.threshold_events(hyp, 0.5, BCKG) == \
+        [[0.0, 3.0, BCKG, 1.0], [3.0, 4.0, SEIZ, 0.6],
+         [4.0, 5.0, BCKG, 1.0]]
+    assert nrt.threshold_events(hyp, 0.0, BCKG) == hyp
+
+#
+# end of file
@@ -0,0 +1,186 @@
+import sys
+if len(sys.argv) < 6:
+	print('usage: python evaluate_transcription_hop.py network_config split_config '
+		'feature_list model_file hops [threshold] [interp] [frame_duration] [engine]')
+	print('  feature_list: a file listing feature .mat files, or a directory')
+	print('  hops: e.g. 1,2,4,8, (hop 1 is always run)')
+	print('  engine: the engine run at each hop; the reference is always the')
+	print('          window engine at hop 1')
+	sys.exit(1)
+network_config = sys.argv[1]
+split_config = sys.argv[2]
+feature_list = sys.argv[3]
+model_file = sys.argv[4]
+hops = sys.argv[5]
+threshold = float(sys.argv[6]) if len(sys.argv) > 6 else 0.5
+interp = sys.argv[7] if len(sys.argv) > 7 else 'linear'
+frame_duration = float(sys.argv[8]) if len(sys.argv) > 8 else 0.15
+engine = sys.argv[9] if len(sys.argv) > 9 else 'window'
+
+predictBatchSize=256
+
+# rules applied by prepare_seiz_hypothesis.m to the thresholded frames
+minSeizureDuration=40
+maxSeizureGap=80
+
+import os
+os.environ['LD_LIBRARY_PATH']='/usr/local/cuda/lib64/'
+import time
+import numpy as np
+import tensorflow as tf
+from keras import backend as K
+session_conf = tf.ConfigProto(intra_op_parallelism_threads=1, inter_op_parallelism_threads=1)
+session_conf.gpu_options.allow_growth = True
+sess = tf.Session(graph=tf.get_default_graph(), config=session_conf)
+K.set_session(sess)
+import scipy.io as sio
+
+from tdnn_inference import INTERP_MODES, ENGINES, parse_config, load_model, load_trunk_and_head, transcribe, split_EEG, hop_index
+
+if interp not in INTERP_MODES or engine not in ENGINES:
+	print('interp must be one of '+str(INTERP_MODES)+' and engine one of '+str(ENGINES))
+	sys.exit(1)
+
+class FrameCounter:
+	# wraps the trunk of the shared engine and counts the frames it
+	# processes per channel, since that engine does not evaluate windows
+	def __init__(self, trunk, num_channels):
+		self.trunk = trunk
+		self.num_channels = num_channels
+		self.frames = 0
+	def predict(self, x, **kwargs):
+		self.frames += x.shape[0]*x.shape[1]//self.num_channels
+		return self.trunk.predict(x, **kwargs)
+
+def find_features(feature_list):
+	if os.path.isdir(feature_list):
+		files = []
+		for root, dirs, names in os.walk(feature_list):
+			files += [os.path.join(root, n) for n in names if n.endswith('.mat')]
+		return sorted(files)
+	with open(feature_list) as f:
+		return [l.strip() for l in f if l.strip()]
+
+def seizure_events(final_score, threshold, frame_duration):
+	# a python version of the event rules in prepare_seiz_hypothesis.m,
+	# edges included: strfind only finds runs with a non-seizure frame on
+	# both sides, so a run that starts at the first frame or ends at the
+	# last frame is dropped, and a recording that is all seizure is one
+	# event from 0 to (num_frames-1)*frame_duration. runs shorter than
+	# minSeizureDuration secs are dropped, and a kept run absorbs the
+	# following runs that start less than maxSeizureGap secs after it
+	# ends. returns a list of (start, stop) in secs, rounded as in matlab.
+	seizure_frames = (final_score > threshold).astype(np.int8)
+	if seizure_frames.sum() == 0:
+		return []
+	if seizure_frames.sum() == len(seizure_frames):
+		return [(0.0, round((len(seizure_frames)-1)*frame_duration, 4))]
+	# the 1-based matlab index of the first frame of each [0 1] and [1 0]
+	# match, which is the first seizure frame and the first frame after
+	# a seizure as 0-based indices
+	steps = np.diff(seizure_frames)
+	starts = list(np.flatnonzero(steps == 1)+1)
+	ends = list(np.flatnonzero(steps == -1)+1)
+	if len(starts) > len(ends) and seizure_frames[-1] == 1:
+		starts = starts[:-1]
+	elif len(starts) < len(ends) and seizure_frames[0] == 1:
+		ends = ends[1:]
+	elif starts[0] > ends[0]:
+		ends = ends[1:]
+		starts = starts[:-1]
+	events = []
+	s = 0
+	while s < len(starts):
+		start = round(starts[s]*frame_duration, 4)
+		stop = round(ends[s]*frame_duration, 4)
+		if stop - start < minSeizureDuration:
+			s += 1
+			continue
+		while s+1 < len(starts) and round(starts[s+1]*frame_duration, 4) - stop < maxSeizureGap:
+			stop = round(ends[s+1]*frame_duration, 4)
+			s += 1
+		events.append((start, stop))
+		s += 1
+	return events
+
+def events_to_frames(events, num_frames, frame_duration):
+	mask = np.zeros(num_frames, dtype=bool)
+	for start, stop in events:
+		mask[int(round(start/frame_duration)):int(round(stop/frame_duration))] = True
+	return mask
+
+def count_overlaps(events, others):
+	# the number of events that overlap at least one of others
+	return sum(any(o[1] > e[0] and o[0] < e[1] for o in others) for e in events)
+
+split_config = parse_config(split_config)
+network_config = parse_config(network_config)
+hops = parse_config(hops)
+if 1 not in hops:
+	hops = [1] + hops
+hops = sorted(set(hops))
+
+stats = dict((h, dict(windows=0, trunk_frames=0, secs=0.0, frames=0, abs_err=0.0, max_err=0.0,
+	frame_agree=0, event_agree=0, events=0, ref_events=0, hits=0, found=0)) for h in hops)
+ref_secs = 0.0
+model = None
+features = find_features(feature_list)
+for n, feature in enumerate(features):
+	data = sio.loadmat(feature)['feature']
+	if model is None:
+		model = load_model(data.shape[1], data.shape[0], network_config, model_file)
+		if engine == 'shared':
+			trunk, head = load_trunk_and_head(data.shape[1], data.shape[0], network_config, model_file)
+			engine_model = (FrameCounter(trunk, data.shape[0]), head)
+		else:
+			engine_model = model
+	print('['+str(n+1)+'/'+str(len(features))+'] '+feature)
+	results = {}
+	for h in hops:
+		t0 = time.time()
+		final_score = transcribe(engine_model, data, split_config, predictBatchSize, h, interp).mean(axis=0)
+		stats[h]['secs'] += time.time() - t0
+		if engine == 'shared':
+			stats[h]['trunk_frames'] += engine_model[0].frames
+			engine_model[0].frames = 0
+		else:
+			stats[h]['windows'] += sum(len(hop_index(split_EEG(data, s)[0].shape[0], h)) for s in split_config)
+		results[h] = final_score
+	if engine == 'window':
+		ref_score = results[1]
+		ref_secs = stats[1]['secs']
+	else:
+		t0 = time.time()
+		ref_score = transcribe(model, data, split_config, predictBatchSize).mean(axis=0)
+		ref_secs += time.time() - t0
+	ref_events = seizure_events(ref_score, threshold, frame_duration)
+	ref_mask = events_to_frames(ref_events, len(ref_score), frame_duration)
+	for h in hops:
+		st = stats[h]
+		err = np.abs(results[h] - ref_score)
+		events = seizure_events(results[h], threshold, frame_duration)
+		st['frames'] += len(ref_score)
+		st['abs_err'] += err.sum()
+		st['max_err'] = max(st['max_err'], err.max())
+		st['frame_agree'] += np.sum((results[h] > threshold) == (ref_score > threshold))
+		st['event_agree'] += np.sum(events_to_frames(events, len(ref_score), frame_duration) == ref_mask)
+		st['events'] += len(events)
+		st['ref_events'] += len(ref_events)
+		st['hits'] += count_overlaps(ref_events, events)
+		st['found'] += count_overlaps(events, ref_events)
+
+print('')
+print('accuracy versus hop size ('+str(len(features))+' files, threshold '+str(threshold)+', '+interp+' interpolation, '+engine+' engine)')
+print('agreement is measured against the window engine at hop 1; events follow the rules of prepare_seiz_hypothesis.m')
+if engine == 'shared':
+	print('trunk_frm is the number of frames per channel the trunk processed')
+work, work_name = ('windows', 'windows') if engine == 'window' else ('trunk_frames', 'trunk_frm')
+print('%5s %10s %9s %8s %10s %10s %11s %11s %8s %8s %8s' % ('hop', work_name, 'secs', 'speedup',
+	'mean_err', 'max_err', 'frame_agr', 'event_agr', 'events', 'recall', 'prec'))
+for h in hops:
+	st = stats[h]
+	frames = max(st['frames'], 1)
+	print('%5d %10d %9.2f %8.2f %10.6f %10.6f %11.6f %11.6f %8d %8.4f %8.4f' % (h, st[work], st['secs'],
+		ref_secs/max(st['secs'], 1e-9), st['abs_err']/frames, st['max_err'],
+		st['frame_agree']/frames, st['event_agree']/frames, st['events'],
+		st['hits']/max(st['ref_events'], 1), st['found']/max(st['events'], 1)))
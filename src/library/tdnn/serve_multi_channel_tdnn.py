@@ -0,0 +1,135 @@
+import sys
+if len(sys.argv) < 5:
+	print('usage: python serve_multi_channel_tdnn.py network_config split_config '
+		'manifest model_file [hop] [interp] [engine]')
+	print('  manifest: a file with one "feature.mat outfile" job per line, or - to')
+	print('            read jobs from stdin (e.g. a named pipe) until it is closed')
+	sys.exit(1)
+network_config = sys.argv[1]
+split_config = sys.argv[2]
+manifest = sys.argv[3]
+model_file = sys.argv[4]
+hop = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+interp = sys.argv[6] if len(sys.argv) > 6 else 'linear'
+engine = sys.argv[7] if len(sys.argv) > 7 else 'window'
+
+seed_value=13003
+predictBatchSize=256
+
+import time
+start_time = time.time()
+
+# 1. Set `PYTHONHASHSEED` environment variable at a fixed value
+import os
+os.environ['PYTHONHASHSEED']=str(seed_value)
+os.environ['LD_LIBRARY_PATH']='/usr/local/cuda/lib64/'
+
+# 2. Set `python` built-in pseudo-random generator at a fixed value
+import random
+random.seed(seed_value)
+
+# 3. Set `numpy` pseudo-random generator at a fixed value
+import numpy as np
+np.random.seed(seed_value)
+
+# 4. Set `tensorflow` pseudo-random generator at a fixed value
+import tensorflow as tf
+tf.set_random_seed(seed_value)
+
+# 5. Configure a new global `tensorflow` session
+from keras import backend as K
+session_conf = tf.ConfigProto(intra_op_parallelism_threads=1, inter_op_parallelism_threads=1)
+session_conf.gpu_options.allow_growth = True
+sess = tf.Session(graph=tf.get_default_graph(), config=session_conf)
+K.set_session(sess)
+
+import scipy.io as sio
+
+from tdnn_inference import INTERP_MODES, ENGINES, parse_config, load_model, load_trunk_and_head, transcribe
+
+if hop < 1 or interp not in INTERP_MODES or engine not in ENGINES:
+	print('hop must be >= 1, interp one of '+str(INTERP_MODES)+' and engine one of '+str(ENGINES))
+	sys.exit(1)
+
+split_config = parse_config(split_config)
+network_config = parse_config(network_config)
+
+# models are built on the first job of each (feat_dim, num_channels) and
+# reused for every later job
+models = {}
+
+def get_model(feat_dim, num_channels):
+	key = (feat_dim, num_channels)
+	if key not in models:
+		if engine == 'shared':
+			models[key] = load_trunk_and_head(feat_dim, num_channels, network_config, model_file)
+		else:
+			models[key] = load_model(feat_dim, num_channels, network_config, model_file)
+	return models[key]
+
+def read_jobs(manifest):
+	# yields (feature, outfile) as lines arrive, so jobs can be queued
+	# through a pipe while earlier ones are running
+	f = sys.stdin if manifest == '-' else open(manifest)
+	for line in f:
+		fields = line.split()
+		if len(fields) == 0 or fields[0].startswith('#'):
+			continue
+		if len(fields) != 2:
+			print('bad job: '+line.strip())
+			continue
+		yield fields[0], fields[1]
+	if f is not sys.stdin:
+		f.close()
+
+def run_job(feature, outfile):
+	# returns the (load, build, transcribe, save) times in secs
+	t0 = time.time()
+	data = sio.loadmat(feature)['feature']
+	t1 = time.time()
+	model = get_model(data.shape[1], data.shape[0])
+	t2 = time.time()
+	seizure_probilities = transcribe(model, data, split_config, predictBatchSize, hop, interp)
+	t3 = time.time()
+	outdir = os.path.dirname(outfile)
+	if outdir and not os.path.isdir(outdir):
+		os.makedirs(outdir)
+	result_dict={}
+	result_dict['result'] = seizure_probilities;
+	sio.savemat(outfile,result_dict)
+	return t1-t0, t2-t1, t3-t2, time.time()-t3
+
+print('server ready in %.2f secs' % (time.time()-start_time))
+sys.stdout.flush()
+
+done = skipped = failed = 0
+latencies = []
+for feature, outfile in read_jobs(manifest):
+	n = done+skipped+failed+1
+	if os.path.exists(outfile):
+		skipped += 1
+		print('job %d: %s exists, skipped' % (n, outfile))
+		sys.stdout.flush()
+		continue
+	t0 = time.time()
+	try:
+		load, build, infer, save = run_job(feature, outfile)
+	except Exception as e:
+		failed += 1
+		print('job %d: %s failed (%s)' % (n, feature, str(e)))
+		sys.stdout.flush()
+		continue
+	latency = time.time()-t0
+	latencies.append(latency)
+	done += 1
+	print('job %d: %s -> %s %.3f secs (load %.3f build %.3f transcribe %.3f save %.3f)'
+		% (n, feature, outfile, latency, load, build, infer, save))
+	sys.stdout.flush()
+
+print('jobs: %d done, %d skipped, %d failed' % (done, skipped, failed))
+if latencies:
+	latencies = np.asarray(latencies)
+	print('latency: mean %.3f median %.3f max %.3f total %.3f secs' % (latencies.mean(),
+		np.median(latencies), latencies.max(), latencies.sum()))
+print('total time %.2f secs' % (time.time()-start_time))
+sys.exit(1 if failed else 0)
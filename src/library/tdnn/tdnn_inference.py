@@ -0,0 +1,175 @@
+import math
+import numpy as np
+
+from keras import losses
+from keras.optimizers import Adam
+
+from tdnn_models import get_multichannel_tdnn_lstm_model, get_multichannel_tdnn_lstm_trunk_and_head
+
+# ways of filling in the frames between evaluated windows when hop > 1
+INTERP_MODES = ['linear', 'hold']
+
+# 'window' runs the full model on every window; 'shared' runs the TDNN
+# trunk once per recording and only the head per window
+ENGINES = ['window', 'shared']
+
+# frames of context the trunk sees on each side (TDNN1: 2, TDNN2: 4). a
+# trunk output further than this from the edge of a window does not
+# depend on the window's zero padding.
+TRUNK_CONTEXT = 6
+
+# windows whose means are computed and passed to the head at once
+TRUNK_CHUNK = 4096
+
+def parse_config(config):
+	# '256,256,256,' -> [256, 256, 256]
+	return [int(x) for x in config.split(',')[:-1]]
+
+def load_model(feat_dim, num_channels, network_config, model_file):
+	model = get_multichannel_tdnn_lstm_model(feat_dim, 2, num_channels, network_config)
+	adam_opt = Adam(lr=0.001, clipvalue=1)
+	model.compile(loss=losses.categorical_crossentropy, optimizer=adam_opt,
+	              metrics=['accuracy'])
+	model.load_weights(model_file,by_name=True)
+	return model
+
+def load_trunk_and_head(feat_dim, num_channels, network_config, model_file):
+	trunk, head = get_multichannel_tdnn_lstm_trunk_and_head(feat_dim, 2, num_channels, network_config)
+	trunk.load_weights(model_file,by_name=True)
+	head.load_weights(model_file,by_name=True)
+	return trunk, head
+
+def split_EEG(data, split_frames):
+	# returns a read-only strided view of every window in the layout the
+	# model expects (windows, channels, split_frames, feat) without copying,
+	# and the start of the window centered at each frame. frames within
+	# half_split of either end use the first/last full window.
+	total_frames=data.shape[2]
+	half_split = math.floor(split_frames/2)
+	split_frames = min(half_split*2, total_frames)
+	num_windows = total_frames-split_frames+1
+	s_ch, s_feat, s_frame = data.strides
+	windows = np.lib.stride_tricks.as_strided(data,
+		shape=(num_windows, data.shape[0], split_frames, data.shape[1]),
+		strides=(s_frame, s_ch, s_frame, s_feat), writeable=False)
+	starts = np.clip(np.arange(total_frames)-half_split, 0, num_windows-1)
+	return windows, starts
+
+def generate_batches(windows, index, batch_size):
+	# copies only batch_size windows at a time
+	for i in range(0, len(index), batch_size):
+		yield windows[index[i:i+batch_size]]
+
+def hop_index(num_windows, hop):
+	# every hop-th window, plus the last one so interpolation covers the end
+	index = np.arange(0, num_windows, hop)
+	if index[-1] != num_windows-1:
+		index = np.append(index, num_windows-1)
+	return index
+
+def interpolate(positions, index, prediction, interp):
+	# maps predictions made at the windows in index back to every position
+	if interp not in INTERP_MODES:
+		raise ValueError('unknown interpolation: '+str(interp))
+	if interp == 'hold':
+		return prediction[np.searchsorted(index, positions, side='right')-1]
+	return np.stack([np.interp(positions, index, prediction[:,c])
+		for c in range(prediction.shape[1])], axis=1)
+
+def predict_frames(model, data, split_frames, batch_size, hop=1, interp='linear'):
+	# the frames within half_split of either end share the first/last
+	# window, so each window is evaluated at most once and its prediction
+	# is copied to every frame that uses it. with hop > 1 only every
+	# hop-th window is evaluated and the rest are interpolated.
+	windows, starts = split_EEG(data, split_frames)
+	index = hop_index(windows.shape[0], hop)
+	prediction = [model.predict(batch, batch_size=batch_size, verbose=0)
+		for batch in generate_batches(windows, index, batch_size)]
+	prediction = np.concatenate(prediction)
+	if hop == 1:
+		return prediction[starts]
+	return interpolate(starts, index, prediction, interp)
+
+def run_trunk(trunk, segments, batch_size):
+	# segments: (n, channels, frames, feat) -> (n, channels, frames, hidden)
+	n, num_channels, num_frames, feat_dim = segments.shape
+	outputs = trunk.predict(segments.reshape(n*num_channels, num_frames, feat_dim),
+		batch_size=batch_size, verbose=0)
+	return outputs.reshape(n, num_channels, num_frames, -1)
+
+def trunk_cache():
+	# the trunk outputs one recording shares between its split configs: the
+	# prefix sum of a single trunk pass over the whole recording, and the
+	# edge sums of the windows (see window_means) by start and end frame
+	return dict(csum=None, left={}, right={})
+
+def edge_sums(trunk, frames, keys, left, cache, batch_size):
+	# the sum of the TRUNK_CONTEXT trunk outputs at the left edge of the
+	# windows that start at keys, or at the right edge of those that end at
+	# keys. an edge only depends on the 2*TRUNK_CONTEXT frames next to it,
+	# so it is the same for every window size and is run once.
+	E = TRUNK_CONTEXT
+	missing = sorted(set(keys.tolist()).difference(cache))
+	for i in range(0, len(missing), batch_size):
+		block = missing[i:i+batch_size]
+		if left:
+			outputs = run_trunk(trunk, np.stack([frames[:,k:k+2*E] for k in block]), batch_size)[:,:,:E]
+		else:
+			outputs = run_trunk(trunk, np.stack([frames[:,k-2*E:k] for k in block]), batch_size)[:,:,E:]
+		cache.update(zip(block, outputs.sum(axis=2)))
+	return np.stack([cache[k] for k in keys.tolist()])
+
+def window_means(trunk, frames, starts, split_frames, batch_size, cache):
+	# the mean trunk output of each window, as the model's average layer
+	# computes it. the trunk runs once over the whole recording, and a
+	# prefix sum gives the sum over each window's interior. the
+	# TRUNK_CONTEXT frames at either end of a window see the window's
+	# zero padding, so they come from short segments run separately.
+	# windows too short to gain from this run the trunk directly.
+	E = TRUNK_CONTEXT
+	L = split_frames
+	if L <= 4*E:
+		segments = np.stack([frames[:,s:s+L] for s in starts])
+		return run_trunk(trunk, segments, batch_size).mean(axis=2)
+	if cache['csum'] is None:
+		outputs = trunk.predict(frames, batch_size=batch_size, verbose=0)
+		cache['csum'] = np.zeros((outputs.shape[0], outputs.shape[1]+1, outputs.shape[2]))
+		np.cumsum(outputs, axis=1, out=cache['csum'][:,1:])
+	csum = cache['csum']
+	sums = np.swapaxes(csum[:,starts+L-E] - csum[:,starts+E], 0, 1)
+	sums += edge_sums(trunk, frames, starts, True, cache['left'], batch_size) + \
+		edge_sums(trunk, frames, starts+L, False, cache['right'], batch_size)
+	return sums/L
+
+def predict_frames_shared(trunk, head, data, split_frames, batch_size, hop=1, interp='linear', cache=None):
+	# the same predictions as predict_frames (up to floating point
+	# rounding), with the trunk shared by overlapping windows. pass the
+	# same cache (see trunk_cache) for every split of a recording to share
+	# the trunk pass and the window edges between them.
+	windows, starts = split_EEG(data, split_frames)
+	index = hop_index(windows.shape[0], hop)
+	frames = np.swapaxes(data, 1, 2)
+	if cache is None:
+		cache = trunk_cache()
+	prediction = []
+	for i in range(0, len(index), TRUNK_CHUNK):
+		means = window_means(trunk, frames, index[i:i+TRUNK_CHUNK], windows.shape[2], batch_size, cache)
+		prediction.append(head.predict(means, batch_size=batch_size, verbose=0))
+	prediction = np.concatenate(prediction)
+	if hop == 1:
+		return prediction[starts]
+	return interpolate(starts, index, prediction, interp)
+
+def transcribe(model, data, split_config, batch_size, hop=1, interp='linear'):
+	# seizure probabilities, one row per split config. model is either the
+	# full model, or the (trunk, head) pair from load_trunk_and_head, whose
+	# trunk outputs are shared by all the split configs.
+	seizure_probilities=[]
+	cache = trunk_cache()
+	for s in split_config:
+		if isinstance(model, tuple):
+			prediction = predict_frames_shared(model[0], model[1], data, s, batch_size, hop, interp, cache)
+		else:
+			prediction = predict_frames(model, data, s, batch_size, hop, interp)
+		seizure_probilities.append(prediction[:,1])
+	return np.asarray(seizure_probilities)
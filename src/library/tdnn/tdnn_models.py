@@ -147,4 +147,31 @@ def get_multichannel_tdnn_lstm_model(feat_size, num_classes, num_channels, hidde
         model = keras.Model(inputs=inputs, outputs=d1)
     else:
         model = keras.Model(inputs=inputs, outputs=output)
-    return model
\ No newline at end of file
+    return model
+
+def get_multichannel_tdnn_lstm_trunk_and_head(feat_size, num_classes, num_channels, hidden_layer_config):
+    # the layers of get_multichannel_tdnn_lstm_model as two models, so the
+    # per-channel TDNN trunk can run once over a whole recording and the
+    # head only sees the window means. the layer names are the same, so
+    # load_weights(by_name=True) works with the weights of the full model.
+    frames = keras.Input(shape=(None, feat_size))
+    t1 = TDNN(int(hidden_layer_config[0]),
+                    input_context=(-2,0,2), padding='same',
+                     activation="sigmoid",
+                      name="TDNN1")(frames)
+    t2 = TDNN(int(hidden_layer_config[1]),
+                    input_context=(-4,-2,0,+2,+4), padding='same',
+                     activation="sigmoid", name="TDNN2")(t1)
+    t3 = TDNN(int(hidden_layer_config[2]),
+                    input_context=(0,), padding='same',
+                    activation="sigmoid", name="TDNN3")(t2)
+    trunk = keras.Model(inputs=frames, outputs=t3)
+
+    means = keras.Input(shape=(num_channels, int(hidden_layer_config[2])))
+    combined_rep = LSTM(hidden_layer_config[3],name="LSTM_Layer")(means)
+    d1 = Dense(hidden_layer_config[3], activation='sigmoid', name='x_vector')(combined_rep)
+    dd1 = Dropout(0.2)(d1)
+    d2 = Dense(hidden_layer_config[4], activation='sigmoid', name='x_vector_2')(dd1)
+    output = Dense(num_classes, activation='softmax', name='dense_2')(d2)
+    head = keras.Model(inputs=means, outputs=output)
+    return trunk, head
\ No newline at end of file
@@ -4,11 +4,15 @@ split_config = sys.argv[2]
 feature = sys.argv[3]
 outfile = sys.argv[4]
 model_file = sys.argv[5] 
+hop = int(sys.argv[6]) if len(sys.argv) > 6 else 1
+interp = sys.argv[7] if len(sys.argv) > 7 else 'linear'
+engine = sys.argv[8] if len(sys.argv) > 8 else 'window'
 
 seed_value=13003
 miniBatchSize=64
 
 halfMiniBS=int(miniBatchSize/2);
+predictBatchSize=256
 
 # 1. Set `PYTHONHASHSEED` environment variable at a fixed value
 import os
@@ -42,6 +46,7 @@ from keras import losses
 
 from tdnn_utils import load_training_data
 from tdnn_models import get_multichannel_tdnn_model, get_multichannel_tdnn_lstm_model
+from tdnn_inference import INTERP_MODES, ENGINES, load_model, load_trunk_and_head, transcribe
 from keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau, LearningRateScheduler
 from keras.utils.generic_utils import get_custom_objects
 from keras.optimizers import Adam
@@ -59,6 +64,10 @@ network_config = network_config.split(',')[:-1]
 network_config = [int(x) for x in network_config]
 #print(split_config)
 
+if hop < 1 or interp not in INTERP_MODES or engine not in ENGINES:
+	print('hop must be >= 1, interp one of '+str(INTERP_MODES)+' and engine one of '+str(ENGINES))
+	sys.exit(1)
+
 data = sio.loadmat(feature)
 data = data['feature'];
 
@@ -66,37 +75,14 @@ num_channels=data.shape[0]
 feat_dim=data.shape[1]
 #print([num_channels, feat_dim])
 
-def split_EEG(data, split_frames):
-	total_frames=data.shape[2]
-	split_data=[]
-	half_split = math.floor(split_frames/2)
-	split_frames = half_split*2
-	for i in range(total_frames):
-		if i - half_split < 0:
-			split_data.append(data[:,:,:split_frames])
-		elif i - half_split >= 0 and i+half_split<=total_frames:
-			split_data.append(data[:,:,i-half_split:i+half_split])
-		else:
-			split_data.append(data[:,:,-split_frames:])
-	return split_data
-
-
-model = get_multichannel_tdnn_lstm_model(feat_dim, 2, num_channels, network_config)
-adam_opt = Adam(lr=0.001, clipvalue=1)
-model.compile(loss=losses.categorical_crossentropy, optimizer=adam_opt,
-              metrics=['accuracy'])
+if engine == 'shared':
+	model = load_trunk_and_head(feat_dim, num_channels, network_config, model_file)
+else:
+	model = load_model(feat_dim, num_channels, network_config, model_file)
 #model.summary()
-model.load_weights(model_file,by_name=True)
-seizure_probilities=[]
-for s in split_config:
-	split_data=split_EEG(data,s)
-	split_data = np.asarray(split_data)
-	split_data = np.swapaxes(split_data,2,3)
-	prediction = model.predict(split_data,batch_size = 256, verbose = 0)
-	seizure_prob = prediction[:,1]
-	seizure_probilities.append(seizure_prob)
-
-seizure_probilities = np.asarray(seizure_probilities)
+seizure_probilities = transcribe(model, data, split_config, predictBatchSize,
+	hop, interp)
+
 result_dict={}
 result_dict['result'] = seizure_probilities;
 
@@ -28,6 +28,42 @@ function [] = transcribe_EEG_using_multi_channel_tdnn(config,subset)
 	end
 
 	subjects = get_all_sub_dir(features_dir);
+
+	if config.transcription_server
+		transcription_dir = strcat(model_dir,'/transcription/');
+		if ~exist(transcription_dir,'dir')
+			mkdir(transcription_dir)
+		end
+		manifest = strcat(transcription_dir,subset,'_manifest.txt');
+		fId = fopen(manifest,'w');
+		for i = 1:length(subjects)
+			subject_dir = strcat(features_dir,'/',subjects{i});
+			subject_save_dir = strcat(model_dir,'/transcription/',subset,'/',subjects{i});
+			recordings = dir([subject_dir,'/*.mat']);
+			recordings = {recordings(:).name};
+			for r = 1:length(recordings)
+				EEG_filename = recordings{r};
+				EEG_g_filename=strsplit(EEG_filename,'.');
+				EEG_g_filename=EEG_g_filename{1};
+				EEG_g_filename=strsplit(EEG_g_filename,'_');
+				EEG_g_filename=strcat(EEG_g_filename{1},'_',EEG_g_filename{2},'_',EEG_g_filename{3});
+				fprintf(fId,'%s %s\n',strcat(subject_dir,'/',EEG_g_filename,'.mat'),...
+					strcat(subject_save_dir,'/',EEG_g_filename,'_tdnn_trans.mat'));
+			end
+		end
+		fclose(fId);
+		python3_server_command=strcat('bash src/library/tdnn/serve_multi_channel_tdnn.bash',...
+			{' '},network_config,{' '},splits_config,{' '},manifest,...
+			{' '},model_dir,'/keras.model',{' '},num2str(config.GPU_Number),{' '},...
+			num2str(config.transcription_hop),{' '},config.transcription_interp,{' '},...
+			config.transcription_engine);
+		status=system(string(python3_server_command),'-echo');
+		if status ~= 0
+			disp('EEG transcription failed for some recordings');
+			disp(python3_server_command);
+		end
+		return;
+	end
 	if ~isempty(gcp('nocreate'))
 		delete(gcp('nocreate'))
 	end
@@ -56,7 +92,9 @@ function [] = transcribe_EEG_using_multi_channel_tdnn(config,subset)
 				subject_dir,'/',EEG_g_filename,'.mat',{' '},...
 				subject_save_dir,'/',EEG_g_filename,'_tdnn_trans.mat',....
 				{' '},model_dir,'/keras.model',{' '},...
-				num2str(mod(r,2)));
+				num2str(mod(r,2)),{' '},...
+				num2str(config.transcription_hop),{' '},config.transcription_interp,{' '},...
+				config.transcription_engine);
 			
 			[status,cmdout]=system(python3_inference_command);
 			if status == 1